@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Import-time benchmark guarding the startup budget of the CLI and API server.
+
+Each module is imported in a fresh interpreter with ``-X importtime``. The
+check fails if a heavy dependency is imported eagerly or if the self time
+of our own modules exceeds the budget.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 50] [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules that must stay out of a bare import of each entry point
+HEAVY_MODULES = ("pandas", "numpy", "openai", "yaml", "dotenv", "pyarrow")
+ENTRY_POINTS = ("prompt_optimizer", "prompt_optimizer.cli", "prompt_optimizer.entrypoint")
+
+
+def measure(module: str) -> tuple:
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+        Tuple of (self time of prompt_optimizer modules in ms, set of imported top-level packages)
+    """
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    own_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if not self_us.strip().isdigit():
+            continue
+        imported.add(name.split(".")[0])
+        if name.startswith("prompt_optimizer"):
+            own_us += int(self_us)
+    return own_us / 1000.0, imported
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Maximum self import time of prompt_optimizer modules per entry point")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Imports per entry point; the fastest run is reported")
+    args = parser.parse_args()
+
+    failed = False
+    for module in ENTRY_POINTS:
+        runs = [measure(module) for _ in range(args.repeat)]
+        own_ms = min(own for own, _ in runs)
+        eager = sorted(set(HEAVY_MODULES) & runs[0][1])
+        ok = own_ms <= args.budget_ms and not eager
+        failed |= not ok
+        status = "ok" if ok else "FAIL"
+        print(f"{status:4} {module:32} own {own_ms:7.1f} ms (budget {args.budget_ms:.0f} ms)"
+              + (f", eager imports: {', '.join(eager)}" if eager else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
-from prompt_optimizer.entrypoint import app
+import os
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=6000)
-
+    # Each worker is a separate process; set coordination.broker in config.yaml
+    # so they share one provider budget.
+    workers = int(os.environ.get("WORKERS", "1"))
+    uvicorn.run("prompt_optimizer.entrypoint:app", host="0.0.0.0", port=6000, workers=workers)
@@ -0,0 +1,208 @@
+"""Optimize many system prompts in one job, sharing datasets, the LLM client and its scheduler."""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from prompt_optimizer.model import BaseModel
+from prompt_optimizer.helper.dataloader import DataLoader
+from prompt_optimizer.prompt_optimizer import PromptOptimizer
+
+
+@dataclass
+class BulkJob:
+    """One (prompt, dataset) pair of a bulk run."""
+    job_id: str
+    system_prompt: str
+    dataset: str
+    config_dict: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BulkManifest:
+    """Jobs of a bulk run and the datasets they refer to."""
+    jobs: List[BulkJob]
+    # Dataset name -> file path or inline list of records
+    datasets: Dict[str, Union[str, List[Dict[str, Any]]]] = field(default_factory=dict)
+
+
+def parse_manifest(manifest: Union[Dict[str, Any], List[Dict[str, Any]]],
+                   base_dir: Optional[str] = None) -> BulkManifest:
+    """
+    Build a BulkManifest from plain data.
+
+    The manifest is either a list of jobs or ``{"datasets": {...}, "jobs": [...]}``.
+    Each job has a ``prompt`` (or ``system_prompt`` / ``prompt_file``), a
+    ``dataset`` (a name from ``datasets`` or a file path) and optionally an
+    ``id``, ``iterations``, ``chunk_size``, ``chunk_token_budget`` and a ``config`` dict of further
+    optimizer settings.
+
+    Args:
+        manifest: Manifest data
+        base_dir: Directory that relative file paths are resolved against
+
+    Returns:
+        The parsed manifest
+    """
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    base = Path(base_dir) if base_dir else None
+
+    def _resolve(path: str) -> str:
+        return str(base / path) if base is not None and not Path(path).is_absolute() else path
+
+    datasets = {
+        name: _resolve(source) if isinstance(source, str) else source
+        for name, source in manifest.get("datasets", {}).items()
+    }
+
+    jobs = []
+    for i, entry in enumerate(manifest.get("jobs", [])):
+        if "prompt_file" in entry:
+            with open(_resolve(entry["prompt_file"]), "r", encoding="utf-8") as f:
+                system_prompt = f.read().strip()
+        else:
+            system_prompt = entry.get("prompt") or entry.get("system_prompt")
+        if not system_prompt:
+            raise ValueError(f"Job {i} has no prompt")
+        if "dataset" not in entry:
+            raise ValueError(f"Job {i} has no dataset")
+
+        dataset = entry["dataset"]
+        if dataset not in datasets:
+            dataset = _resolve(dataset)
+
+        config_dict = dict(entry.get("config", {}))
+        if entry.get("iterations") is not None:
+            config_dict["max_iterations"] = entry["iterations"]
+        if entry.get("chunk_size") is not None:
+            config_dict["chunk_size"] = entry["chunk_size"]
+        if entry.get("chunk_token_budget") is not None:
+            config_dict["chunk_token_budget"] = entry["chunk_token_budget"]
+
+        jobs.append(BulkJob(
+            job_id=str(entry.get("id", i)),
+            system_prompt=system_prompt,
+            dataset=dataset,
+            config_dict=config_dict
+        ))
+    return BulkManifest(jobs=jobs, datasets=datasets)
+
+
+def load_manifest(path: str) -> BulkManifest:
+    """
+    Load a manifest from a JSON file, or a JSONL file with one job per line.
+
+    Args:
+        path: Path to the manifest
+
+    Returns:
+        The parsed manifest
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            manifest = [json.loads(line) for line in f if line.strip()]
+        else:
+            manifest = json.load(f)
+    return parse_manifest(manifest, base_dir=str(Path(path).parent))
+
+
+class DatasetCache:
+    """
+    Loads every dataset of a bulk run once and shares the DataLoader between its jobs.
+    """
+
+    def __init__(self,
+                 datasets: Dict[str, Union[str, List[Dict[str, Any]]]],
+                 allow_paths: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            datasets: Dataset name -> file path or inline list of records
+            allow_paths: Whether jobs may refer to files that are not named in datasets
+        """
+        self.datasets = datasets
+        self.allow_paths = allow_paths
+        self._loaders: Dict[Tuple, DataLoader] = {}
+        self._locks: Dict[Tuple, asyncio.Lock] = {}
+
+    async def get(self,
+                  dataset: str,
+                  coreset_size: Optional[int] = None,
+                  coreset_method: str = "kmeans") -> DataLoader:
+        """Get the DataLoader of a dataset, loading it on first use."""
+        key = (dataset, coreset_size, coreset_method)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._loaders:
+                source = self.datasets.get(dataset)
+                if source is None:
+                    if not self.allow_paths:
+                        raise ValueError(f"Unknown dataset: {dataset}")
+                    source = dataset
+                if not isinstance(source, str):
+                    import pandas as pd
+
+                    source = pd.DataFrame(source)
+                # Parsing and coreset selection are CPU-bound; keep the event loop free
+                self._loaders[key] = await asyncio.to_thread(
+                    DataLoader, source, coreset_size=coreset_size, coreset_method=coreset_method
+                )
+        return self._loaders[key]
+
+
+async def run_bulk(llm_client: BaseModel,
+                   manifest: BulkManifest,
+                   max_parallel_jobs: int = 8,
+                   allow_paths: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Optimize every job of a manifest, yielding each result as soon as it finishes.
+
+    All jobs share one LLM client, so they draw from the same connection pool,
+    rate limits and call scheduler. Jobs run at "bulk" priority unless their
+    config says otherwise, so interactive runs in the same process go first.
+
+    Args:
+        llm_client: LLM client shared by every job
+        manifest: Jobs to run
+        max_parallel_jobs: Maximum number of jobs running at once
+        allow_paths: Whether jobs may load datasets from file paths
+
+    Yields:
+        {"id", "status", "optimized_prompt" and "iterations_completed" or "error", "elapsed"} per job
+    """
+    cache = DatasetCache(manifest.datasets, allow_paths=allow_paths)
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(max_parallel_jobs)
+
+    async def _run(job: BulkJob) -> Dict[str, Any]:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                config_dict = {"priority": "bulk", "job_id": f"bulk-{run_id}-{job.job_id}", **job.config_dict}
+                optimizer = PromptOptimizer(llm_client, config_dict)
+                data_loader = await cache.get(job.dataset, optimizer.coreset_size, optimizer.coreset_method)
+                optimized_prompt = await optimizer.run(data_loader, job.system_prompt)
+                result = {"id": job.job_id,
+                          "status": "ok",
+                          "optimized_prompt": optimized_prompt,
+                          "iterations_completed": optimizer.iterations_completed}
+            except Exception as e:
+                logging.error(f"Bulk job {job.job_id} failed: {e}")
+                result = {"id": job.job_id, "status": "error", "error": str(e)}
+            result["elapsed"] = round(time.monotonic() - start, 3)
+            return result
+
+    tasks = [asyncio.ensure_future(_run(job)) for job in manifest.jobs]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
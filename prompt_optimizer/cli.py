@@ -2,12 +2,18 @@
 import argparse
 import sys
 import os
-import pandas as pd
-from pathlib import Path
 import asyncio
+import contextlib
+import json
+import logging
+from prompt_optimizer import config
 from prompt_optimizer.model import BaseModel, GPTModel
 from prompt_optimizer.prompt_optimizer import run_optimizer
-from prompt_optimizer.config import OPTIMIZER_CONFIG
+from prompt_optimizer.bulk import load_manifest, run_bulk
+from prompt_optimizer.evaluator import Evaluator, EvaluationStats, EvaluationWriter, iter_rows
+from prompt_optimizer.helper.ingest import iter_dataset_file
+from prompt_optimizer.helper.result_store import get_result_store
+from prompt_optimizer.helper.profiling import PROFILE_MODES, profile
 
 
 def read_prompt_from_file(file_path):
@@ -20,8 +26,79 @@ def read_prompt_from_file(file_path):
         sys.exit(1)
 
 
+async def run_bulk_from_manifest(model: BaseModel, args) -> None:
+    """Run every job of a manifest and write one JSON line per job as it finishes."""
+    manifest = load_manifest(args.manifest)
+    if args.verbose:
+        print(f"Starting bulk optimization of {len(manifest.jobs)} prompts", file=sys.stderr)
+
+    output = sys.stdout
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        output = open(args.output, 'w', encoding='utf-8')
+    try:
+        async for result in run_bulk(model, manifest, max_parallel_jobs=args.max_parallel_jobs):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+async def run_evaluation(model: BaseModel, initial_prompt: str, args) -> None:
+    """Evaluate a prompt on every row of the input file, writing one result per row as it finishes."""
+    EVALUATION_CONFIG = config.EVALUATION_CONFIG
+    OPTIMIZER_CONFIG = config.OPTIMIZER_CONFIG
+    output_store = None
+    if OPTIMIZER_CONFIG.reuse_outputs:
+        output_store = get_result_store(OPTIMIZER_CONFIG.store_path, OPTIMIZER_CONFIG.store_max_entries)
+    evaluator = Evaluator(model,
+                          concurrency=args.eval_concurrency,
+                          pass_threshold=EVALUATION_CONFIG.pass_threshold,
+                          output_char_budget=OPTIMIZER_CONFIG.output_char_budget,
+                          output_token_budget=OPTIMIZER_CONFIG.output_token_budget,
+                          output_store=output_store)
+    
+    stats = EvaluationStats()
+    writer = None
+    if args.output:
+        writer = EvaluationWriter(args.output, resume=args.resume, settings=evaluator.run_settings(initial_prompt))
+    skip_ids = set()
+    if writer is not None:
+        for result in writer.open():
+            stats.add(result, resumed=True)
+            skip_ids.add(result["row_id"])
+        if args.verbose and skip_ids:
+            print(f"Resuming after {len(skip_ids)} completed rows", file=sys.stderr)
+    
+    rows = iter_rows(iter_dataset_file(args.input_csv, rows_per_block=EVALUATION_CONFIG.rows_per_block))
+    try:
+        async for result in evaluator.evaluate(rows, initial_prompt, skip_ids=skip_ids,
+                                               priority=EVALUATION_CONFIG.priority):
+            stats.add(result)
+            if writer is not None:
+                writer.write(result)
+            else:
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+            if args.verbose and stats.rows % 100 == 0:
+                print(f"Evaluated {stats.rows} rows", file=sys.stderr)
+    except BaseException:
+        # Completed rows stay in the output, so the run can be resumed
+        if writer is not None:
+            writer.close()
+        raise
+    
+    summary = stats.summary()
+    if writer is not None:
+        writer.finish(summary)
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+
+
 async def main():
     """Main entry point for the prompt optimizer CLI."""
+    OPTIMIZER_CONFIG = config.OPTIMIZER_CONFIG
     parser = argparse.ArgumentParser(
         description="Prompt Optimizer - Improve your system prompts automatically",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
@@ -29,11 +106,10 @@ async def main():
     
     parser.add_argument(
         "--input-csv", "-i",
-        required=True,
-        help="Path to CSV file with input and ground_truth columns"
+        help="Path to CSV, JSONL or Parquet file (optionally .gz) with input and ground_truth columns, and optionally precomputed llm_output"
     )
     
-    prompt_group = parser.add_mutually_exclusive_group(required=True)
+    prompt_group = parser.add_mutually_exclusive_group()
     prompt_group.add_argument(
         "--prompt", "-p",
         help="Initial system prompt text"
@@ -43,9 +119,47 @@ async def main():
         help="Path to file containing initial system prompt"
     )
     
+    parser.add_argument(
+        "--manifest", "-m",
+        help="JSON/JSONL manifest of (prompt, dataset) jobs to optimize in one bulk run"
+    )
+    
     parser.add_argument(
         "--output", "-o",
-        help="Output file to save the optimized prompt (default: print to stdout)"
+        help="Output file to save the optimized prompt, or the JSONL results of a bulk run (default: print to stdout)"
+    )
+    
+    parser.add_argument(
+        "--evaluate",
+        action="store_true",
+        help="Score the prompt on every row of the input file without optimizing it; "
+             "--output is a .jsonl or .parquet file of per-row results (default: JSONL to stdout)"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="With --evaluate, keep the completed rows of an interrupted run in --output and skip them"
+    )
+    
+    parser.add_argument(
+        "--eval-concurrency",
+        type=int,
+        default=config.EVALUATION_CONFIG.concurrency,
+        help="Maximum number of rows generated and judged at once with --evaluate"
+    )
+    
+    parser.add_argument(
+        "--max-parallel-jobs",
+        type=int,
+        default=OPTIMIZER_CONFIG.max_parallel_jobs,
+        help="Maximum number of prompts optimized at once in a bulk run"
+    )
+    
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        help="Maximum number of LLM calls in flight across all jobs (default: llm.max_concurrency from config)"
     )
     
     parser.add_argument(
@@ -62,6 +176,82 @@ async def main():
         help="Number of examples to process in each chunk"
     )
     
+    parser.add_argument(
+        "--chunk-token-budget",
+        type=int,
+        default=OPTIMIZER_CONFIG.chunk_token_budget,
+        help="Pack examples into chunks of about this many tokens instead of --chunk-size rows"
+    )
+    
+    parser.add_argument(
+        "--coreset-size",
+        type=int,
+        default=OPTIMIZER_CONFIG.coreset_size,
+        help="Optimize on a representative subset of this many rows (default: use every row)"
+    )
+    
+    parser.add_argument(
+        "--coreset-method",
+        choices=["kmeans", "fps"],
+        default=OPTIMIZER_CONFIG.coreset_method,
+        help="Coreset selection method: k-means representatives or farthest-point sampling"
+    )
+    
+    parser.add_argument(
+        "--output-char-budget",
+        type=int,
+        default=OPTIMIZER_CONFIG.output_char_budget,
+        help="Stop generating an output for valuation after this many characters"
+    )
+    
+    parser.add_argument(
+        "--output-token-budget",
+        type=int,
+        default=OPTIMIZER_CONFIG.output_token_budget,
+        help="Stop generating an output for valuation after this many tokens"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=OPTIMIZER_CONFIG.incremental,
+        help="Reuse stored valuations of unchanged rows and only valuate new or changed ones"
+    )
+    
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=OPTIMIZER_CONFIG.deadline_seconds,
+        help="Time budget in seconds; stops early with the best prompt so far"
+    )
+    
+    parser.add_argument(
+        "--memoize",
+        action=argparse.BooleanOptionalAction,
+        default=OPTIMIZER_CONFIG.memoize,
+        help="Return the stored result of an identical earlier run instead of optimizing again"
+    )
+    
+    parser.add_argument(
+        "--reuse-outputs",
+        action=argparse.BooleanOptionalAction,
+        default=OPTIMIZER_CONFIG.reuse_outputs,
+        help="Store generated outputs and reuse them when the same prompt is valuated again"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Profile the run and write it to PATH (pstats file, or folded stacks with --profile-mode sampling)"
+    )
+    
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        default="cprofile",
+        help="cProfile of the main thread, or stack sampling of all threads"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -75,9 +265,20 @@ async def main():
     )
     
     args = parser.parse_args()
+    # Progress goes to stderr, so stdout only carries results (e.g. the JSON lines of a bulk run)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+    if args.evaluate and not (args.input_csv and (args.prompt or args.prompt_file)):
+        parser.error("--evaluate requires --input-csv with --prompt or --prompt-file")
+    if args.resume and not (args.evaluate and args.output):
+        parser.error("--resume requires --evaluate and --output")
+    if not args.manifest and not (args.input_csv and (args.prompt or args.prompt_file)):
+        parser.error("either --manifest, or --input-csv with --prompt or --prompt-file is required")
     
     # Verify input file exists
-    if not os.path.exists(args.input_csv):
+    if args.manifest and not os.path.exists(args.manifest):
+        print(f"Error: Manifest file not found: {args.manifest}", file=sys.stderr)
+        sys.exit(1)
+    if args.input_csv and not os.path.exists(args.input_csv):
         print(f"Error: Input CSV file not found: {args.input_csv}", file=sys.stderr)
         sys.exit(1)
     
@@ -87,9 +288,21 @@ async def main():
     else:
         initial_prompt = args.prompt
     
+    if args.max_concurrency is not None:
+        config.LLM_CONFIG.max_concurrency = args.max_concurrency
+    
     # Configure optimizer
     OPTIMIZER_CONFIG.max_iterations = args.iterations
     OPTIMIZER_CONFIG.chunk_size = args.chunk_size
+    OPTIMIZER_CONFIG.chunk_token_budget = args.chunk_token_budget
+    OPTIMIZER_CONFIG.coreset_size = args.coreset_size
+    OPTIMIZER_CONFIG.coreset_method = args.coreset_method
+    OPTIMIZER_CONFIG.output_char_budget = args.output_char_budget
+    OPTIMIZER_CONFIG.output_token_budget = args.output_token_budget
+    OPTIMIZER_CONFIG.incremental = args.incremental
+    OPTIMIZER_CONFIG.reuse_outputs = args.reuse_outputs
+    OPTIMIZER_CONFIG.memoize = args.memoize
+    OPTIMIZER_CONFIG.deadline_seconds = args.deadline
     
     # Initialize and run optimizer
     try:
@@ -98,14 +311,30 @@ async def main():
         else:
             raise ValueError(f"Invalid LLM client: {args.llm_client}")
         
+        if args.profile:
+            profiling = profile(args.profile, mode=args.profile_mode)
+        else:
+            profiling = contextlib.nullcontext()
+        
+        if args.manifest:
+            with profiling:
+                await run_bulk_from_manifest(model, args)
+            return
+        
+        if args.evaluate:
+            with profiling:
+                await run_evaluation(model, initial_prompt, args)
+            return
+        
         if args.verbose:
             print(f"Starting prompt optimization with {args.iterations} iterations")
             print(f"Initial prompt: {initial_prompt[:100]}...")
-        optimized_prompt = await run_optimizer(
-            llm_client=model,
-            input_ground_truth_csv=args.input_csv,
-            initial_prompt=initial_prompt
-        )
+        with profiling:
+            optimized_prompt = await run_optimizer(
+                llm_client=model,
+                input_ground_truth_csv=args.input_csv,
+                initial_prompt=initial_prompt
+            )
         
         # Output the result
         if args.output:
@@ -129,4 +358,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        # Ctrl+C cancels the main task, which cancels every in-flight LLM call
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        sys.exit(130)
\ No newline at end of file
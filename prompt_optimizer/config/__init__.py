@@ -1,79 +1,123 @@
 import os
-from dotenv import load_dotenv
-import yaml
+import sys
 from typing import Dict, Any, Optional
 
 from .llm_config import LLMConfig
 from .optimizer_config import OptimizerConfig
+from .coordination_config import CoordinationConfig
+from .server_config import ServerConfig
+from .evaluation_config import EvaluationConfig
 
-# Load environment variables
-load_dotenv()
+# Config objects are created on first access (see __getattr__), so importing
+# the package does not read the environment, parse YAML or import yaml/dotenv.
+# Access them as attributes of this module at use time, e.g.
+# `config.OPTIMIZER_CONFIG.chunk_size`, to always see the current values.
 
 # Default config file path
 DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.yaml")
 CLASS_CONFIG_MAP = {
     "llm": LLMConfig,
-    "optimizer": OptimizerConfig
+    "optimizer": OptimizerConfig,
+    "coordination": CoordinationConfig,
+    "server": ServerConfig,
+    "evaluation": EvaluationConfig
 }
+CONFIG_ATTRIBUTES = {
+    "LLM_CONFIG": "llm",
+    "OPTIMIZER_CONFIG": "optimizer",
+    "COORDINATION_CONFIG": "coordination",
+    "SERVER_CONFIG": "server",
+    "EVALUATION_CONFIG": "evaluation"
+}
+
+_yaml_config: Optional[Dict[str, Any]] = None
+_configs: Dict[str, Any] = {}
 
 def load_yaml_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     """Load configuration from a YAML file."""
+    import yaml
+
     if config_path is None:
         config_path = DEFAULT_CONFIG_PATH
-        
+
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"Config file not found: {config_path}")
-    
+
     with open(config_path, 'r') as f:
         config = yaml.safe_load(f)
-    
+
     return config
 
 def create_config(config_dict: Dict[str, Any], config_name: str) -> Any:
     """Create a config object with values from config dict and environment variables."""
     config_values = config_dict.get(config_name, {})
     config_class = CLASS_CONFIG_MAP[config_name]
-    
+
     kwargs = {}
-    
+
     # Get default values from an empty instance
     defaults = config_class().__dict__
-    
+
     for key in defaults:
         if key in config_values:
             kwargs[key] = config_values[key]
-    
+
     # Special handling for API key from environment variables
     if config_name == "llm":
+        from dotenv import load_dotenv
+
+        load_dotenv()
         api_key = os.environ.get("OPENAI_API_KEY")
         if api_key:
             kwargs["api_key"] = api_key
         else:
-            print("Warning: OPENAI_API_KEY not found in environment variables")
-    
+            # stderr, so the warning does not end up in JSON written to stdout
+            print("Warning: OPENAI_API_KEY not found in environment variables", file=sys.stderr)
+
+    if config_name == "server":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        admin_token = os.environ.get("ADMIN_TOKEN")
+        if admin_token:
+            kwargs["admin_token"] = admin_token
+
     # Create and return a config instance
     return config_class(**kwargs)
 
-# Load YAML configuration once
-yaml_config = load_yaml_config()
-
-# Create config objects
-LLM_CONFIG = create_config(yaml_config, "llm")
-OPTIMIZER_CONFIG = create_config(yaml_config, "optimizer")
+def get_config(config_name: str) -> Any:
+    """Get a config object, loading the YAML configuration on first use."""
+    global _yaml_config
+    if config_name not in _configs:
+        if _yaml_config is None:
+            _yaml_config = load_yaml_config()
+        _configs[config_name] = create_config(_yaml_config, config_name)
+    return _configs[config_name]
 
 def reload_config(config_path: Optional[str] = None) -> None:
     """Reload configuration from a specified file."""
-    global LLM_CONFIG, OPTIMIZER_CONFIG, yaml_config
-    yaml_config = load_yaml_config(config_path)
-    LLM_CONFIG = create_config(yaml_config, "llm") 
-    OPTIMIZER_CONFIG = create_config(yaml_config, "optimizer")
+    global _yaml_config
+    _yaml_config = load_yaml_config(config_path)
+    _configs.clear()
+
+def __getattr__(name: str) -> Any:
+    if name in CONFIG_ATTRIBUTES:
+        return get_config(CONFIG_ATTRIBUTES[name])
+    if name == "yaml_config":
+        get_config("optimizer")
+        return _yaml_config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "LLM_CONFIG",
     "OPTIMIZER_CONFIG",
+    "COORDINATION_CONFIG",
+    "SERVER_CONFIG",
+    "EVALUATION_CONFIG",
+    "get_config",
     "reload_config"
 ]
 
 if __name__ == "__main__":
-    print(LLM_CONFIG.__dict__)
-    print(OPTIMIZER_CONFIG)
\ No newline at end of file
+    print(get_config("llm").__dict__)
+    print(get_config("optimizer"))
@@ -0,0 +1,22 @@
+"""Configuration settings for coordinating work across processes."""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CoordinationConfig:
+    """Configuration for the cross-process coordination layer."""
+    # Broker backend: None (single process), "sqlite" or a registered custom broker
+    broker: Optional[str] = None
+    broker_path: str = ".prompt_optimizer_broker.sqlite"
+
+    # Global provider budget shared by every process using the broker
+    rpm_limit: Optional[int] = None
+    tpm_limit: Optional[int] = None
+
+    # Shard chunk valuation across worker processes
+    shard_chunks: bool = False
+    lease_seconds: float = 300.0
+    max_task_attempts: int = 3
+    poll_interval: float = 0.5
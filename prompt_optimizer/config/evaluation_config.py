@@ -0,0 +1,18 @@
+"""Configuration settings for standalone evaluation."""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class EvaluationConfig:
+    """Configuration for evaluating a prompt over a whole dataset."""
+    # Maximum number of rows generated and judged at once
+    concurrency: int = 32
+    # Rows read from the dataset at a time; only this many are held in memory
+    rows_per_block: int = 1000
+
+    # Judge scores (1-10) at or above the threshold count as passed
+    pass_threshold: int = 7
+
+    # Scheduling of the evaluation's LLM calls against concurrent optimizations ("interactive" or "bulk")
+    priority: str = "bulk"
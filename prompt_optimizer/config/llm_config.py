@@ -15,3 +15,21 @@ class LLMConfig:
     # Retry settings
     retry_attempts: int = 3
     retry_delay: float = 1.0
+    retry_max_delay: float = 30.0
+
+    # Circuit breaker settings
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    # Seconds a single provider request may take before it is retried (None for the SDK default)
+    request_timeout: Optional[float] = None
+
+    # Maximum number of async calls in flight across the process, shared fairly between jobs (None for unbounded)
+    max_concurrency: Optional[int] = 64
+    # Slots of max_concurrency kept free for interactive jobs while bulk jobs run
+    reserved_interactive_slots: int = 8
+
+    # Hedging settings
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95
+    hedge_max_rate: float = 0.1
+    hedge_min_samples: int = 20
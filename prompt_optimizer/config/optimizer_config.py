@@ -10,3 +10,36 @@ class OptimizerConfig:
     # Optimization settings
     max_iterations: int = 1
     chunk_size: int = 2
+    # Pack rows into chunks of about this many tokens instead of chunk_size rows (None disables)
+    chunk_token_budget: Optional[int] = None
+
+    # Time budget of a run in seconds; later iterations are skipped and in-flight calls cancelled (None disables)
+    deadline_seconds: Optional[float] = None
+
+    # Maximum number of prompts optimized at once in a bulk run
+    max_parallel_jobs: int = 8
+
+    # Scheduling of a run's LLM calls against other concurrent runs ("interactive" or "bulk")
+    priority: str = "interactive"
+    job_weight: float = 1.0
+
+    # Coreset settings (None keeps every row)
+    coreset_size: Optional[int] = None
+    coreset_method: str = "kmeans"
+
+    # Stream outputs for valuation and stop once a budget is reached (None disables)
+    output_char_budget: Optional[int] = None
+    output_token_budget: Optional[int] = None
+
+    # Incremental mode: reuse stored per-row valuations for unchanged prompts and rows
+    incremental: bool = False
+    store_path: str = ".prompt_optimizer_store.sqlite"
+    store_max_entries: Optional[int] = 1000000
+
+    # Return the stored result of an identical earlier run and join identical running ones
+    memoize: bool = False
+    memo_max_entries: Optional[int] = 10000
+    memo_ttl_seconds: Optional[float] = 7 * 24 * 3600
+
+    # Store generated outputs per (prompt, input) and reuse them when the same prompt is valuated again
+    reuse_outputs: bool = False
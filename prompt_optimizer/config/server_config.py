@@ -0,0 +1,27 @@
+"""Configuration settings for the API server."""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class ServerConfig:
+    """Configuration for the API server."""
+    # Upload ingestion limits
+    max_upload_bytes: int = 512 * 1024 * 1024
+    max_decompressed_bytes: int = 2 * 1024 * 1024 * 1024
+    # Optimization keeps every row in memory, so /optimize/upload also caps the number of rows
+    max_upload_rows: int = 1000000
+    upload_rows_per_block: int = 50000
+
+    # Seconds between checks whether the client of a running optimization disconnected
+    disconnect_poll_interval: float = 1.0
+
+    # Event-loop lag monitor: stalls longer than the threshold are logged with their stack
+    loop_monitor_enabled: bool = True
+    loop_lag_threshold: float = 0.1
+    loop_lag_interval: float = 0.05
+
+    # Admin endpoints are disabled unless a token is set (ADMIN_TOKEN environment variable)
+    admin_token: Optional[str] = None
+    profile_max_seconds: float = 60.0
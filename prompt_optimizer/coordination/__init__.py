@@ -0,0 +1,16 @@
+from .broker import Broker, Task, create_broker, get_broker, register_broker
+from .sqlite_broker import SQLiteBroker
+from .rate_limiter import GlobalRateLimiter, get_rate_limiter
+from .sharding import ShardedExecutor
+
+__all__ = [
+    "Broker",
+    "Task",
+    "create_broker",
+    "get_broker",
+    "register_broker",
+    "SQLiteBroker",
+    "GlobalRateLimiter",
+    "get_rate_limiter",
+    "ShardedExecutor",
+]
@@ -0,0 +1,168 @@
+"""Broker interface shared by every process taking part in a deployment."""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from prompt_optimizer import config
+
+
+@dataclass
+class Task:
+    """A unit of work claimed from the broker."""
+    task_id: str
+    job_id: str
+    position: int
+    payload: Dict[str, Any]
+    attempts: int
+    # Worker holding the lease; only it may renew the lease or report the outcome
+    worker_id: str
+
+
+class Broker(ABC):
+    """
+    Abstract base class for coordination brokers.
+
+    A broker holds the state that must be shared by all worker processes:
+    the global request/token budget and the queue of sharded tasks.
+    Implementations must make every method atomic across processes. Methods
+    are synchronous; async callers run them in a thread.
+    """
+
+    @abstractmethod
+    def acquire_capacity(self,
+                         key: str,
+                         requests: int,
+                         tokens: int,
+                         rpm_limit: Optional[int],
+                         tpm_limit: Optional[int]) -> float:
+        """
+        Try to take requests and tokens from the budget of the last 60 seconds.
+
+        Args:
+            key: Budget identifier (e.g. the model name)
+            requests: Number of requests to take
+            tokens: Number of tokens to take
+            rpm_limit: Requests per minute allowed across all processes
+            tpm_limit: Tokens per minute allowed across all processes
+
+        Returns:
+            0 if the capacity was granted, otherwise seconds to wait before retrying
+        """
+        pass
+
+    @abstractmethod
+    def submit_tasks(self, job_id: str, payloads: List[Dict[str, Any]]) -> List[str]:
+        """
+        Enqueue the tasks of a job.
+
+        Returns:
+            Task ids, in the order of the payloads
+        """
+        pass
+
+    @abstractmethod
+    def claim_task(self,
+                   worker_id: str,
+                   lease_seconds: float,
+                   job_id: Optional[str] = None) -> Optional[Task]:
+        """
+        Claim the oldest pending task, or a task whose lease has expired.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            lease_seconds: How long the task stays reserved for the worker
+            job_id: Only claim tasks of this job
+
+        Returns:
+            The claimed task, or None if there is nothing to do
+        """
+        pass
+
+    @abstractmethod
+    def renew_lease(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Extend the lease of a running task, so it is not reclaimed while it is still being worked on.
+
+        Returns:
+            False if the worker no longer holds the task, e.g. its lease expired and another worker claimed it
+        """
+        pass
+
+    @abstractmethod
+    def complete_task(self, task_id: str, worker_id: str, result: Any) -> bool:
+        """
+        Store the result of a task, unless another worker has taken it over.
+
+        Returns:
+            Whether the result was stored
+        """
+        pass
+
+    @abstractmethod
+    def fail_task(self, task_id: str, worker_id: str, error: str) -> bool:
+        """
+        Mark a task failed, unless another worker has taken it over.
+
+        Returns:
+            Whether the failure was stored
+        """
+        pass
+
+    @abstractmethod
+    def get_job_results(self, job_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the state of every task of a job.
+
+        Returns:
+            List of {"position", "status", "result", "error"} dicts ordered by position
+        """
+        pass
+
+    @abstractmethod
+    def delete_job(self, job_id: str) -> None:
+        pass
+
+
+_BROKER_FACTORIES: Dict[str, Callable[..., Broker]] = {}
+
+
+def register_broker(name: str, factory: Callable[..., Broker]) -> None:
+    """
+    Register a broker backend, e.g. one backed by Redis or a database.
+
+    Args:
+        name: Name used in the ``coordination.broker`` config setting
+        factory: Callable receiving the CoordinationConfig and returning a Broker
+    """
+    _BROKER_FACTORIES[name] = factory
+
+
+def create_broker(config) -> Optional[Broker]:
+    """
+    Create the broker configured in a CoordinationConfig.
+
+    Returns:
+        The broker, or None when coordination is disabled
+    """
+    if not config.broker:
+        return None
+    if config.broker not in _BROKER_FACTORIES:
+        raise ValueError(f"Unknown broker: {config.broker}. Registered brokers: {list(_BROKER_FACTORIES)}")
+    return _BROKER_FACTORIES[config.broker](config)
+
+
+_BROKER: Optional[Broker] = None
+
+
+def get_broker() -> Optional[Broker]:
+    """
+    Get the process-wide broker built from the coordination config.
+
+    Returns:
+        The broker, or None when coordination is disabled
+    """
+    global _BROKER
+    if _BROKER is None:
+        _BROKER = create_broker(config.COORDINATION_CONFIG)
+    return _BROKER
@@ -0,0 +1,72 @@
+"""Global requests/tokens per minute budget enforced through the broker."""
+
+import asyncio
+import time
+from typing import Optional
+
+from prompt_optimizer import config
+from prompt_optimizer.helper.metrics import METRICS
+from .broker import Broker, get_broker
+
+
+class GlobalRateLimiter:
+    """
+    Rate limiter whose budget is shared by every process connected to the same broker.
+    """
+
+    def __init__(self,
+                 broker: Broker,
+                 key: str,
+                 rpm_limit: Optional[int] = None,
+                 tpm_limit: Optional[int] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            broker: Broker holding the shared budget
+            key: Budget identifier (e.g. the model name)
+            rpm_limit: Requests per minute across all processes
+            tpm_limit: Tokens per minute across all processes
+        """
+        if (rpm_limit is not None and rpm_limit < 1) or (tpm_limit is not None and tpm_limit < 1):
+            raise ValueError("rpm_limit and tpm_limit must be positive, or null for no limit")
+        self.broker = broker
+        self.key = key
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+
+    async def acquire_async(self, tokens: int) -> None:
+        """Wait until one request with the given token cost fits in the global budget."""
+        while True:
+            wait = await asyncio.to_thread(
+                self.broker.acquire_capacity, self.key, 1, tokens, self.rpm_limit, self.tpm_limit
+            )
+            if wait <= 0:
+                return
+            METRICS.observe("coordination.rate_limit_wait", wait)
+            await asyncio.sleep(wait)
+
+    def acquire(self, tokens: int) -> None:
+        """Blocking variant of acquire_async."""
+        while True:
+            wait = self.broker.acquire_capacity(self.key, 1, tokens, self.rpm_limit, self.tpm_limit)
+            if wait <= 0:
+                return
+            METRICS.observe("coordination.rate_limit_wait", wait)
+            time.sleep(wait)
+
+
+def get_rate_limiter(key: str) -> Optional[GlobalRateLimiter]:
+    """
+    Get the global rate limiter of an endpoint.
+
+    Returns:
+        The rate limiter, or None when no broker or no limit is configured
+    """
+    coordination_config = config.COORDINATION_CONFIG
+    if coordination_config.rpm_limit is None and coordination_config.tpm_limit is None:
+        return None
+    broker = get_broker()
+    if broker is None:
+        return None
+    return GlobalRateLimiter(broker, key, coordination_config.rpm_limit, coordination_config.tpm_limit)
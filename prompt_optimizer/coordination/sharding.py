@@ -0,0 +1,153 @@
+"""Shard chunk valuation across worker processes through the broker."""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Dict, List
+
+from prompt_optimizer.helper.deadline import DeadlineExceededError, check_deadline, deadline_scope, time_remaining
+from .broker import Broker, Task
+
+VALUATE_CHUNK = "valuate_chunk"
+
+# Error recorded for a task stopped by the submitter's deadline, raised as DeadlineExceededError again on the submitter
+DEADLINE_EXCEEDED = "Deadline exceeded"
+
+
+def make_worker_id() -> str:
+    """Identifier unique to this process, readable in the broker's tables."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+async def execute_task(task: Task, valuator) -> Any:
+    """
+    Execute a claimed task with the given valuator.
+
+    Args:
+        task: Claimed task
+        valuator: Valuator used for chunk valuation
+
+    Returns:
+        The task result
+    """
+    from prompt_optimizer.valuator.valuator import get_precomputed_outputs
+
+    payload = task.payload
+    if payload["type"] == VALUATE_CHUNK:
+        llm_outputs = get_precomputed_outputs(payload["chunk"]) if payload.get("use_precomputed_outputs") else None
+        # The submitter's remaining time budget bounds the work on every worker
+        with deadline_scope(payload.get("timeout")):
+            return await valuator.valuates(payload["chunk"], payload["system_prompt"], llm_outputs)
+    raise ValueError(f"Unknown task type: {payload['type']}")
+
+
+async def _renew_lease(broker: Broker, task: Task, lease_seconds: float) -> None:
+    """Keep renewing the lease of a running task until cancelled or the lease was lost."""
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        if not await asyncio.to_thread(broker.renew_lease, task.task_id, task.worker_id, lease_seconds):
+            logging.warning(f"Lost the lease of task {task.task_id}; its result will be discarded")
+            return
+
+
+async def run_claimed_task(broker: Broker, task: Task, valuator, lease_seconds: float) -> None:
+    """
+    Execute a task and report its outcome to the broker.
+
+    The lease is renewed while the task runs, so a slow task is not
+    reclaimed and executed a second time by another worker. A task
+    stopped by the submitter's deadline is failed with DEADLINE_EXCEEDED,
+    so the submitter returns its partial result instead of an error.
+    """
+    heartbeat = asyncio.ensure_future(_renew_lease(broker, task, lease_seconds))
+    try:
+        result = await execute_task(task, valuator)
+    except DeadlineExceededError:
+        logging.info(f"Task {task.task_id} stopped at the submitter's deadline")
+        await asyncio.to_thread(broker.fail_task, task.task_id, task.worker_id, DEADLINE_EXCEEDED)
+        return
+    except Exception as e:
+        logging.error(f"Task {task.task_id} failed: {e}")
+        await asyncio.to_thread(broker.fail_task, task.task_id, task.worker_id, str(e))
+        return
+    finally:
+        heartbeat.cancel()
+    if not await asyncio.to_thread(broker.complete_task, task.task_id, task.worker_id, result):
+        logging.warning(f"Result of task {task.task_id} discarded: another worker took it over")
+
+
+class ShardedExecutor:
+    """
+    Submits the chunks of an iteration to the broker and collects their results.
+
+    The submitting process works on its own chunks too, so sharding never
+    makes a run slower than without workers; idle workers on any node
+    connected to the broker pick up the remaining chunks.
+    """
+
+    def __init__(self,
+                 broker: Broker,
+                 lease_seconds: float = 300.0,
+                 poll_interval: float = 0.5):
+        self.broker = broker
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = make_worker_id()
+
+    async def valuate_chunks(self,
+                             valuator,
+                             chunks: List[List[Dict[str, Any]]],
+                             system_prompt: str,
+                             use_precomputed_outputs: bool = False) -> List[Any]:
+        """
+        Valuate chunks across all workers.
+
+        Args:
+            valuator: Valuator used for the chunks executed locally
+            chunks: Data chunks to valuate
+            system_prompt: System prompt being valuated
+            use_precomputed_outputs: Valuate the rows' ``llm_output`` instead of generating outputs
+
+        Returns:
+            Chunk valuation results, in the order of the chunks
+
+        Raises:
+            DeadlineExceededError: If the current deadline passed before every chunk was valuated
+        """
+        job_id = uuid.uuid4().hex
+        payloads = [
+            {"type": VALUATE_CHUNK,
+             "system_prompt": system_prompt,
+             "chunk": chunk,
+             "use_precomputed_outputs": use_precomputed_outputs,
+             # Workers valuate with the submitter's model and settings, not their own config
+             "valuator": valuator.settings(),
+             "timeout": time_remaining()}
+            for chunk in chunks
+        ]
+        await asyncio.to_thread(self.broker.submit_tasks, job_id, payloads)
+        try:
+            while True:
+                # Without this a dead worker would hold the submitter until its lease expired
+                check_deadline()
+                task = await asyncio.to_thread(self.broker.claim_task, self.worker_id, self.lease_seconds, job_id)
+                if task is not None:
+                    await run_claimed_task(self.broker, task, valuator, self.lease_seconds)
+                    continue
+
+                results = await asyncio.to_thread(self.broker.get_job_results, job_id)
+                failed = [result for result in results if result["status"] == "failed"]
+                errors = [result for result in failed if result["error"] != DEADLINE_EXCEEDED]
+                if errors:
+                    raise RuntimeError(f"Chunk {errors[0]['position']} failed: {errors[0]['error']}")
+                if failed:
+                    raise DeadlineExceededError(DEADLINE_EXCEEDED)
+                if all(result["status"] == "done" for result in results):
+                    return [result["result"] for result in results]
+                remaining = time_remaining()
+                await asyncio.sleep(self.poll_interval if remaining is None
+                                    else max(min(self.poll_interval, remaining), 0))
+        finally:
+            await asyncio.to_thread(self.broker.delete_job, job_id)
@@ -0,0 +1,206 @@
+"""Broker backed by a local SQLite file, shared by processes on one node or a shared volume."""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .broker import Broker, Task, register_broker
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_events (
+    key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    requests INTEGER NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rate_events_key_ts ON rate_events (key, ts);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker_id TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, created_at, position);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id, position);
+"""
+
+WINDOW_SECONDS = 60.0
+
+
+class SQLiteBroker(Broker):
+    """
+    Broker storing rate budgets and tasks in a SQLite database.
+
+    Every mutation runs in a ``BEGIN IMMEDIATE`` transaction, so concurrent
+    processes are serialized by SQLite's file lock.
+    """
+
+    def __init__(self, path: str, max_task_attempts: int = 3):
+        """
+        Initialize the broker.
+
+        Args:
+            path: Path of the SQLite database file
+            max_task_attempts: Times a task may be claimed before it is marked failed
+        """
+        self.path = path
+        self.max_task_attempts = max_task_attempts
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def acquire_capacity(self,
+                         key: str,
+                         requests: int,
+                         tokens: int,
+                         rpm_limit: Optional[int],
+                         tpm_limit: Optional[int]) -> float:
+        now = time.time()
+        if tpm_limit is not None:
+            # A single request larger than the whole budget could never be granted
+            tokens = min(tokens, tpm_limit)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM rate_events WHERE key = ? AND ts <= ?", (key, now - WINDOW_SECONDS))
+            used_requests, used_tokens, oldest = conn.execute(
+                "SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(tokens), 0), MIN(ts) "
+                "FROM rate_events WHERE key = ?",
+                (key,)
+            ).fetchone()
+            over_rpm = rpm_limit is not None and used_requests + requests > rpm_limit
+            over_tpm = tpm_limit is not None and used_tokens + tokens > tpm_limit
+            if over_rpm or over_tpm:
+                if oldest is None:
+                    # Nothing in the window to wait for: the request can never fit, e.g. rpm_limit is 0
+                    raise ValueError(f"Request exceeds the rate limits of '{key}' "
+                                     f"(rpm_limit={rpm_limit}, tpm_limit={tpm_limit})")
+                return max(oldest + WINDOW_SECONDS - now, 0.05)
+            conn.execute(
+                "INSERT INTO rate_events (key, ts, requests, tokens) VALUES (?, ?, ?, ?)",
+                (key, now, requests, tokens)
+            )
+        return 0.0
+
+    def submit_tasks(self, job_id: str, payloads: List[Dict[str, Any]]) -> List[str]:
+        now = time.time()
+        task_ids = [uuid.uuid4().hex for _ in payloads]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO tasks (task_id, job_id, position, payload, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?)",
+                [
+                    (task_id, job_id, position, json.dumps(payload, default=str), now)
+                    for position, (task_id, payload) in enumerate(zip(task_ids, payloads))
+                ]
+            )
+        return task_ids
+
+    def claim_task(self,
+                   worker_id: str,
+                   lease_seconds: float,
+                   job_id: Optional[str] = None) -> Optional[Task]:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', error = 'Lease expired too many times' "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, self.max_task_attempts)
+            )
+            query = (
+                "SELECT task_id, job_id, position, payload, attempts FROM tasks "
+                "WHERE (status = 'pending' OR (status = 'running' AND lease_until < ?))"
+            )
+            params = [now]
+            if job_id is not None:
+                query += " AND job_id = ?"
+                params.append(job_id)
+            row = conn.execute(query + " ORDER BY created_at, position LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            task_id, task_job_id, position, payload, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker_id = ?, lease_until = ?, attempts = ? "
+                "WHERE task_id = ?",
+                (worker_id, now + lease_seconds, attempts + 1, task_id)
+            )
+        return Task(task_id, task_job_id, position, json.loads(payload), attempts + 1, worker_id)
+
+    def renew_lease(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE task_id = ? AND worker_id = ? AND status = 'running'",
+                (time.time() + lease_seconds, task_id, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def complete_task(self, task_id: str, worker_id: str, result: Any) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_until = NULL "
+                "WHERE task_id = ? AND worker_id = ? AND status = 'running'",
+                (json.dumps(result, default=str), task_id, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def fail_task(self, task_id: str, worker_id: str, error: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'failed', error = ?, lease_until = NULL "
+                "WHERE task_id = ? AND worker_id = ? AND status = 'running'",
+                (error, task_id, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def get_job_results(self, job_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT position, status, result, error FROM tasks WHERE job_id = ? ORDER BY position",
+            (job_id,)
+        ).fetchall()
+        return [
+            {
+                "position": position,
+                "status": status,
+                "result": json.loads(result) if result is not None else None,
+                "error": error,
+            }
+            for position, status, result, error in rows
+        ]
+
+    def delete_job(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks WHERE job_id = ?", (job_id,))
+
+
+register_broker(
+    "sqlite",
+    lambda config: SQLiteBroker(config.broker_path, max_task_attempts=config.max_task_attempts)
+)
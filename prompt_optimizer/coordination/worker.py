@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""Worker process executing sharded tasks from the broker."""
+
+import argparse
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from prompt_optimizer import config
+from prompt_optimizer.model import BaseModel, GPTModel
+from prompt_optimizer.helper.profiling import LoopLagMonitor
+from prompt_optimizer.helper.result_store import get_result_store
+from prompt_optimizer.valuator import Valuator
+from .broker import Broker, create_broker
+from .sharding import make_worker_id, run_claimed_task
+
+
+# LLM client classes a worker can build for the settings sent with a task
+LLM_CLIENTS = {"GPTModel": GPTModel}
+
+
+class ValuatorPool:
+    """
+    Valuators of a worker, one per distinct set of submitter settings.
+
+    Tasks carry the settings of the submitting run (see Valuator.settings),
+    so a chunk is valuated with the same model, budgets and reuse options
+    whether it runs locally or on a worker. Stored valuations and outputs
+    live in the worker's own store (optimizer.store_path).
+    """
+
+    def __init__(self, llm_client: BaseModel):
+        """
+        Initialize the pool.
+
+        Args:
+            llm_client: Client used for tasks whose model matches it, and for tasks without settings
+        """
+        self.llm_client = llm_client
+        self._clients: Dict[Tuple, BaseModel] = {}
+        self._valuators: Dict[str, Valuator] = {}
+
+    def _client(self, settings: Dict[str, Any]) -> BaseModel:
+        key = (settings.get("llm_client"), settings.get("model_name"),
+               settings.get("temperature"), settings.get("max_tokens"))
+        default = self.llm_client
+        if key == (type(default).__name__, default.model_name, default.temperature, default.max_tokens):
+            return default
+        if key not in self._clients:
+            client_class = LLM_CLIENTS.get(settings.get("llm_client"))
+            if client_class is None:
+                raise ValueError(f"Worker cannot build LLM client {settings.get('llm_client')}")
+            self._clients[key] = client_class(model_name=settings["model_name"],
+                                              temperature=settings["temperature"],
+                                              max_tokens=settings["max_tokens"])
+        return self._clients[key]
+
+    def get(self, settings: Optional[Dict[str, Any]] = None) -> Valuator:
+        """Get the valuator for the settings sent with a task, or one from the worker's config without them."""
+        if settings is None:
+            optimizer_config = config.OPTIMIZER_CONFIG
+            settings = {
+                "llm_client": type(self.llm_client).__name__,
+                "model_name": self.llm_client.model_name,
+                "temperature": self.llm_client.temperature,
+                "max_tokens": self.llm_client.max_tokens,
+                "output_char_budget": optimizer_config.output_char_budget,
+                "output_token_budget": optimizer_config.output_token_budget,
+                "incremental": optimizer_config.incremental,
+                "reuse_outputs": optimizer_config.reuse_outputs,
+            }
+        key = json.dumps(settings, sort_keys=True)
+        if key not in self._valuators:
+            optimizer_config = config.OPTIMIZER_CONFIG
+            result_store = None
+            if settings.get("incremental") or settings.get("reuse_outputs"):
+                result_store = get_result_store(optimizer_config.store_path, optimizer_config.store_max_entries)
+            self._valuators[key] = Valuator(self._client(settings),
+                                            output_char_budget=settings.get("output_char_budget"),
+                                            output_token_budget=settings.get("output_token_budget"),
+                                            result_store=result_store if settings.get("incremental") else None,
+                                            output_store=result_store if settings.get("reuse_outputs") else None)
+        return self._valuators[key]
+
+
+async def run_worker(broker: Broker,
+                     llm_client: BaseModel,
+                     concurrency: int = 1,
+                     stop_event: asyncio.Event = None) -> None:
+    """
+    Claim and execute tasks until stopped.
+
+    Args:
+        broker: Broker to claim tasks from
+        llm_client: LLM client used for tasks whose model matches it
+        concurrency: Number of tasks executed at the same time
+        stop_event: Event that stops the worker when set
+    """
+    stop_event = stop_event or asyncio.Event()
+    valuators = ValuatorPool(llm_client)
+
+    async def _loop():
+        worker_id = make_worker_id()
+        lease_seconds = config.COORDINATION_CONFIG.lease_seconds
+        while not stop_event.is_set():
+            task = await asyncio.to_thread(broker.claim_task, worker_id, lease_seconds)
+            if task is None:
+                await asyncio.sleep(config.COORDINATION_CONFIG.poll_interval)
+                continue
+            try:
+                valuator = valuators.get(task.payload.get("valuator"))
+            except Exception as e:
+                logging.error(f"Task {task.task_id} failed: {e}")
+                await asyncio.to_thread(broker.fail_task, task.task_id, worker_id, str(e))
+                continue
+            await run_claimed_task(broker, task, valuator, lease_seconds)
+
+    await asyncio.gather(*[_loop() for _ in range(concurrency)])
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Prompt Optimizer worker - execute sharded chunk valuations",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--concurrency", "-c",
+        type=int,
+        default=4,
+        help="Number of tasks executed at the same time"
+    )
+    args = parser.parse_args()
+
+    broker = create_broker(config.COORDINATION_CONFIG)
+    if broker is None:
+        raise SystemExit("No broker configured. Set coordination.broker in config.yaml.")
+    logging.basicConfig(level=logging.INFO)
+    server_config = config.SERVER_CONFIG
+    if server_config.loop_monitor_enabled:
+        LoopLagMonitor(threshold=server_config.loop_lag_threshold,
+                       interval=server_config.loop_lag_interval).start()
+    await run_worker(broker, GPTModel(), concurrency=args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
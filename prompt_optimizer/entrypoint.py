@@ -1,15 +1,67 @@
-from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Optional, TypeVar
+from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException, Depends, Header
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+import hmac
+import json
 from http import HTTPStatus
-import pandas as pd
-from io import StringIO
-from prompt_optimizer.helper.schema import OptimizeResponse, OptimizeFileUploadRequest
-from prompt_optimizer.model import GPTModel
-from prompt_optimizer.config import OPTIMIZER_CONFIG
-from prompt_optimizer.prompt_optimizer import run_optimizer
+from prompt_optimizer.helper.schema import OptimizeResponse, OptimizeFileUploadRequest, BulkOptimizeRequest, EvaluateFileUploadRequest
+from prompt_optimizer.helper.ingest import detect_format, iter_dataset, UploadTooLargeError, UnsupportedFormatError
+from prompt_optimizer.model import BaseModel, GPTModel, circuit_breaker_states
+from prompt_optimizer import config
+from prompt_optimizer.prompt_optimizer import PromptOptimizer
+from prompt_optimizer.helper.deadline import DeadlineExceededError
+from prompt_optimizer.bulk import parse_manifest, run_bulk
+from prompt_optimizer.evaluator import Evaluator, EvaluationStats, iter_rows
+from prompt_optimizer.helper.metrics import METRICS
+from prompt_optimizer.helper.profiling import LoopLagMonitor, ProfilerBusyError, check_profile_options, profile_running_loop
 
-app = FastAPI()
+T = TypeVar("T")
+
+# Status used by nginx and others for requests the client abandoned
+CLIENT_CLOSED_REQUEST = 499
+
+loop_monitor: Optional[LoopLagMonitor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global loop_monitor
+    server_config = config.SERVER_CONFIG
+    if server_config.loop_monitor_enabled:
+        loop_monitor = LoopLagMonitor(threshold=server_config.loop_lag_threshold,
+                                      interval=server_config.loop_lag_interval)
+        loop_monitor.start()
+    try:
+        yield
+    finally:
+        if loop_monitor is not None:
+            loop_monitor.stop()
+            loop_monitor = None
+
+
+app = FastAPI(lifespan=lifespan)
+
+# One client per LLM type for the whole process, so concurrent requests share
+# its connection pool, rate limits and call scheduler
+_llm_clients = {}
+
+
+def get_llm_client(llm_client: str) -> BaseModel:
+    """Get the process-wide client of an LLM type."""
+    if llm_client not in _llm_clients:
+        if llm_client == "gpt":
+            _llm_clients[llm_client] = GPTModel()
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid LLM client. Only 'gpt' is supported for now."
+            )
+    return _llm_clients[llm_client]
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,12 +72,110 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized bodies before the multipart parser spools them
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > config.SERVER_CONFIG.max_upload_bytes:
+        return JSONResponse(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            content={"message": f"Request body exceeds {config.SERVER_CONFIG.max_upload_bytes} bytes"}
+        )
+    return await call_next(request)
+
+
 @app.get("/")
 async def root():
     return {
         "status": HTTPStatus.OK,
     }
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "status": HTTPStatus.OK,
+        "metrics": METRICS.snapshot(),
+        "circuit_breakers": circuit_breaker_states(),
+    }
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client closed the connection before the response was ready."""
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await a long-running operation, cancelling it if the client disconnects.
+    
+    The cancellation reaches every in-flight LLM call of the operation, so an
+    abandoned request stops spending quota and frees its scheduler slots.
+    
+    Raises:
+        ClientDisconnectedError: If the client went away first
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=config.SERVER_CONFIG.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                METRICS.increment("api.client_disconnects")
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.wait({task})
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Dependency that guards admin endpoints with the ADMIN_TOKEN.
+    
+    Admin endpoints do not exist (404) unless a token is configured.
+    """
+    admin_token = config.SERVER_CONFIG.admin_token
+    if not admin_token:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="Invalid admin token")
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(seconds: float = 10.0, mode: str = "cprofile", sort: str = "cumulative", limit: int = 50):
+    """
+    Profile the server for a number of seconds while it keeps serving requests.
+    
+    Args:
+        seconds: Duration of the profile, capped at server.profile_max_seconds
+        mode: "cprofile" for a pstats summary of the event loop thread, or
+            "sampling" for folded stacks of all threads (for flame graphs)
+        sort: pstats sort key (cprofile only)
+        limit: Number of pstats entries returned (cprofile only)
+    
+    Returns:
+        The profile as plain text
+    """
+    try:
+        # Rejected before the profiling window starts, not after it
+        check_profile_options(mode, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    seconds = min(max(seconds, 0.0), config.SERVER_CONFIG.profile_max_seconds)
+    try:
+        report = await profile_running_loop(seconds, mode=mode, sort=sort, limit=limit)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=str(e))
+    return PlainTextResponse(report)
+
+@app.get("/admin/event-loop", dependencies=[Depends(require_admin)])
+async def admin_event_loop():
+    """
+    Recent event-loop stalls with the coroutine and stack that caused them.
+    """
+    return {
+        "status": HTTPStatus.OK,
+        "enabled": loop_monitor is not None,
+        "stalls": loop_monitor.stalls() if loop_monitor is not None else [],
+    }
+
 @app.post("/optimize")
 async def optimize(request: Request):
     data = await request.json()
@@ -37,70 +187,232 @@ async def get_optimize_request_form(
     system_prompt: str = Form(...),
     iterations: int = Form(None),
     chunk_size: int = Form(None),
-    llm_client: str = Form(...)
+    chunk_token_budget: int = Form(None),
+    llm_client: str = Form(...),
+    coreset_size: int = Form(None),
+    coreset_method: str = Form(None),
+    incremental: bool = Form(None),
+    reuse_outputs: bool = Form(None),
+    memoize: bool = Form(None),
+    deadline_seconds: float = Form(None)
 ) -> OptimizeFileUploadRequest:
     """
     Dependency that creates an OptimizeFileUploadRequest from form data.
+    
+    Invalid values (e.g. an unknown coreset_method) are rejected with 422
+    before the optimization starts.
     """
-    return OptimizeFileUploadRequest(
-        system_prompt=system_prompt,
-        iterations=iterations,
-        chunk_size=chunk_size,
-        llm_client=llm_client
-    )
+    try:
+        return OptimizeFileUploadRequest(
+            system_prompt=system_prompt,
+            iterations=iterations,
+            chunk_size=chunk_size,
+            chunk_token_budget=chunk_token_budget,
+            llm_client=llm_client,
+            coreset_size=coreset_size,
+            coreset_method=coreset_method or config.OPTIMIZER_CONFIG.coreset_method,
+            incremental=config.OPTIMIZER_CONFIG.incremental if incremental is None else incremental,
+            reuse_outputs=config.OPTIMIZER_CONFIG.reuse_outputs if reuse_outputs is None else reuse_outputs,
+            memoize=config.OPTIMIZER_CONFIG.memoize if memoize is None else memoize,
+            deadline_seconds=deadline_seconds if deadline_seconds else config.OPTIMIZER_CONFIG.deadline_seconds
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
 
 @app.post("/optimize/upload", response_model=OptimizeResponse)
 async def optimize_with_csv_upload(
+    http_request: Request,
     file: UploadFile = File(...),
     request: OptimizeFileUploadRequest = Depends(get_optimize_request_form)
 ):
     """
-    Endpoint that accepts a CSV file upload and returns an optimized prompt.
+    Endpoint that accepts a dataset upload and returns an optimized prompt.
+    
+    The upload is parsed block by block from the spooled file in a worker
+    thread, so the raw bytes are never copied and other requests are not
+    blocked while it loads. The parsed rows are kept in memory for the
+    whole optimization, so uploads over ``server.max_upload_rows`` rows are
+    rejected with 413. The optimization is
+    cancelled if the client disconnects, and stops at the request's deadline
+    with the prompt of the last finished iteration.
     
     Args:
-        file: Uploaded CSV file with input and ground_truth columns
+        http_request: Incoming request, watched for client disconnects
+        file: Uploaded CSV, JSONL or Parquet file (optionally gzip-compressed)
+            with input and ground_truth columns, and optionally precomputed llm_output
         request: Request object containing optimization parameters
     
     Returns:
         JSON response with optimized prompt
     """
-    # Validate file extension
-    if file.content_type != "text/csv":
-        return {"error": "Invalid file type. Please upload a CSV file."}
+    # Validate file format
+    try:
+        file_format, compressed = detect_format(file.filename, file.content_type)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, detail=str(e))
 
-    # Read CSV file into Pandas DataFrame
-    content = await file.read()
-    df = pd.read_csv(StringIO(content.decode("utf-8")))
+    # Parsed block by block when the optimizer loads its data
+    dataset = iter_dataset(file.file,
+                           file_format,
+                           compressed=compressed,
+                           rows_per_block=config.SERVER_CONFIG.upload_rows_per_block,
+                           max_bytes=config.SERVER_CONFIG.max_upload_bytes,
+                           max_decompressed_bytes=config.SERVER_CONFIG.max_decompressed_bytes,
+                           max_rows=config.SERVER_CONFIG.max_upload_rows)
     config_dict = {
-        "max_iterations": request.iterations if request.iterations else OPTIMIZER_CONFIG.max_iterations,
-        "chunk_size": request.chunk_size if request.chunk_size else OPTIMIZER_CONFIG.chunk_size
+        "max_iterations": request.iterations if request.iterations else config.OPTIMIZER_CONFIG.max_iterations,
+        "chunk_size": request.chunk_size if request.chunk_size else config.OPTIMIZER_CONFIG.chunk_size,
+        "chunk_token_budget": request.chunk_token_budget if request.chunk_token_budget else config.OPTIMIZER_CONFIG.chunk_token_budget,
+        "coreset_size": request.coreset_size if request.coreset_size else config.OPTIMIZER_CONFIG.coreset_size,
+        "coreset_method": request.coreset_method,
+        "incremental": request.incremental,
+        "reuse_outputs": request.reuse_outputs,
+        "memoize": request.memoize,
+        "deadline_seconds": request.deadline_seconds
     }
+    model = get_llm_client(request.llm_client)
+    optimizer = PromptOptimizer(model, config_dict)
     try:
-        if request.llm_client == "gpt":
-            model = GPTModel()
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid LLM client. Only 'gpt' is supported for now."
-            )
-        optimized_prompt = await run_optimizer(llm_client=model, 
-                                        initial_prompt=request.system_prompt, 
-                                        input_ground_truth_csv=df,
-                                        config_dict=config_dict)
+        optimized_prompt = await cancel_on_disconnect(
+            http_request,
+            optimizer.run(input_ground_truth_csv=dataset, initial_system_prompt=request.system_prompt)
+        )
                 
         # Return the result
-        return {
+        response = {
             "status": HTTPStatus.OK,
             "optimized_prompt": optimized_prompt,
-            "iterations_completed": config_dict["max_iterations"]
+            "iterations_completed": optimizer.iterations_completed
         }
+        if optimizer.iterations_completed < config_dict["max_iterations"]:
+            response["message"] = (f"Deadline reached after {optimizer.iterations_completed} "
+                                   f"of {config_dict['max_iterations']} iterations")
+        return response
     
+    except ClientDisconnectedError:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed the request")
+    except DeadlineExceededError:
+        raise HTTPException(status_code=HTTPStatus.GATEWAY_TIMEOUT,
+                            detail="Deadline reached before the first iteration finished")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred during optimization: {str(e)}"
         )
 
+@app.post("/optimize/bulk")
+async def optimize_bulk(request: BulkOptimizeRequest):
+    """
+    Endpoint that optimizes many prompts against shared datasets in one request.
+    
+    Results are streamed as newline-delimited JSON, one line per job in the
+    order the jobs finish.
+    
+    Args:
+        request: Datasets and the (prompt, dataset) jobs to run on them
+    
+    Returns:
+        NDJSON stream of {"id", "status", "optimized_prompt" or "error", "elapsed"}
+    """
+    model = get_llm_client(request.llm_client)
+    manifest = parse_manifest({
+        "datasets": request.datasets,
+        "jobs": [
+            {"id": job.id if job.id is not None else i,
+             "prompt": job.system_prompt,
+             "dataset": job.dataset,
+             "iterations": job.iterations,
+             "chunk_size": job.chunk_size,
+             "chunk_token_budget": job.chunk_token_budget}
+            for i, job in enumerate(request.jobs)
+        ]
+    })
+    max_parallel_jobs = request.max_parallel_jobs or config.OPTIMIZER_CONFIG.max_parallel_jobs
+
+    async def _stream():
+        async for result in run_bulk(model, manifest, max_parallel_jobs=max_parallel_jobs, allow_paths=False):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+async def get_evaluate_request_form(
+    system_prompt: str = Form(...),
+    llm_client: str = Form("gpt"),
+    concurrency: int = Form(None),
+    pass_threshold: int = Form(None)
+) -> EvaluateFileUploadRequest:
+    """
+    Dependency that creates an EvaluateFileUploadRequest from form data.
+    """
+    try:
+        return EvaluateFileUploadRequest(
+            system_prompt=system_prompt,
+            llm_client=llm_client,
+            concurrency=concurrency if concurrency else config.EVALUATION_CONFIG.concurrency,
+            pass_threshold=pass_threshold if pass_threshold else config.EVALUATION_CONFIG.pass_threshold
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+@app.post("/evaluate/upload")
+async def evaluate_with_upload(
+    file: UploadFile = File(...),
+    request: EvaluateFileUploadRequest = Depends(get_evaluate_request_form)
+):
+    """
+    Endpoint that scores a system prompt on an uploaded dataset without rewriting it.
+    
+    Every row's output (generated, or its precomputed llm_output) is judged
+    against its ground truth. Results are streamed as newline-delimited JSON,
+    one line per row in the order the rows finish, followed by a
+    {"summary": {...}} line with the aggregate metrics. The upload is read
+    block by block while rows are evaluated, and the evaluation stops when
+    the client disconnects.
+    
+    Args:
+        file: Uploaded CSV, JSONL or Parquet file (optionally gzip-compressed)
+            with input and ground_truth columns, and optionally id and llm_output
+        request: Request object containing evaluation parameters
+    
+    Returns:
+        NDJSON stream of row results and the summary
+    """
+    try:
+        file_format, compressed = detect_format(file.filename, file.content_type)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+    model = get_llm_client(request.llm_client)
+    evaluator = Evaluator(model,
+                          concurrency=request.concurrency,
+                          pass_threshold=request.pass_threshold)
+    dataset = iter_dataset(file.file,
+                           file_format,
+                           compressed=compressed,
+                           rows_per_block=config.EVALUATION_CONFIG.rows_per_block,
+                           max_bytes=config.SERVER_CONFIG.max_upload_bytes,
+                           max_decompressed_bytes=config.SERVER_CONFIG.max_decompressed_bytes)
+
+    async def _stream():
+        stats = EvaluationStats()
+        try:
+            # Closing the response (e.g. on disconnect) closes this generator, which cancels rows in flight
+            async for result in evaluator.evaluate(iter_rows(dataset),
+                                                   request.system_prompt,
+                                                   priority=config.EVALUATION_CONFIG.priority):
+                stats.add(result)
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except (UploadTooLargeError, UnsupportedFormatError) as e:
+            # The status line is already sent, so the error ends the stream instead
+            yield json.dumps({"error": str(e)}) + "\n"
+        yield json.dumps({"summary": stats.summary()}) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):
     return JSONResponse(
@@ -0,0 +1,4 @@
+from .evaluator import Evaluator, EvaluationStats, iter_rows
+from .results import EvaluationWriter, ResumeMismatchError
+
+__all__ = ["Evaluator", "EvaluationStats", "EvaluationWriter", "ResumeMismatchError", "iter_rows"]
@@ -0,0 +1,317 @@
+"""Generate and judge the outputs of a system prompt over a whole dataset."""
+
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, AsyncIterator, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from prompt_optimizer import prompt_template
+from prompt_optimizer.model import BaseModel, job_context
+from prompt_optimizer.helper.deadline import DeadlineExceededError
+from prompt_optimizer.helper.fingerprint import JOB_ROW_FIELDS, fingerprint_prompt, fingerprint_row, fingerprint_text
+from prompt_optimizer.helper.metrics import METRICS
+from prompt_optimizer.helper.result_store import ResultStore
+from prompt_optimizer.valuator.valuator import OUTPUTS_NAMESPACE, Valuator
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+_SCORE = re.compile(r"\bscore\b\D{0,10}(\d+)", re.IGNORECASE)
+
+
+def parse_judgement(response: str) -> Tuple[Optional[int], str]:
+    """
+    Extract the score and reason from a judge response.
+
+    The judge is asked for a JSON object; when the response is not valid JSON
+    the score is looked up as ``score: <n>`` in the text.
+
+    Returns:
+        Tuple of (score clamped to 1-10, or None if none was found, reason)
+    """
+    score, reason = None, ""
+    match = _JSON_OBJECT.search(response)
+    if match:
+        try:
+            judgement = json.loads(match.group(0))
+            score, reason = judgement.get("score"), str(judgement.get("reason", ""))
+        except (ValueError, AttributeError):
+            pass
+    if score is None:
+        match = _SCORE.search(response)
+        if match:
+            score = match.group(1)
+        reason = reason or response.strip()
+    try:
+        return min(max(int(score), 1), 10), reason
+    except (TypeError, ValueError):
+        return None, reason
+
+
+def row_id(item: Dict[str, Any]) -> str:
+    """Identifier of a row: its ``id`` column if it has one, else the fingerprint of its content."""
+    value = item.get("id")
+    # Missing ids parse as NaN, which is not equal to itself
+    if value is not None and value == value:
+        return str(value)
+    return fingerprint_row(item, JOB_ROW_FIELDS)
+
+
+async def iter_rows(frames: Iterable["DataFrame"]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield the rows of DataFrame blocks, parsing each block in a worker thread.
+
+    Only one block is held in memory at a time, so datasets larger than memory
+    can be evaluated. Empty ``llm_output`` cells are dropped, so those outputs are generated.
+    """
+    blocks: Iterator["DataFrame"] = iter(frames)
+    while True:
+        block = await asyncio.to_thread(next, blocks, None)
+        if block is None:
+            return
+        for item in block.to_dict(orient="records"):
+            if "llm_output" in item and not isinstance(item["llm_output"], str):
+                del item["llm_output"]
+            yield item
+
+
+class EvaluationStats:
+    """Aggregate metrics of an evaluation, updated one row result at a time."""
+
+    def __init__(self):
+        self.rows = 0
+        self.resumed = 0
+        self.errors = 0
+        self.passed = 0
+        self.scores: List[int] = []
+        self.latencies: List[float] = []
+        self._start = time.monotonic()
+
+    def add(self, result: Dict[str, Any], resumed: bool = False) -> None:
+        """
+        Count a row result.
+
+        Args:
+            result: Row result, see Evaluator.evaluate_row
+            resumed: Whether the row was completed by an earlier run, so it does not count towards throughput
+        """
+        self.rows += 1
+        self.resumed += resumed
+        if result.get("error") is not None:
+            self.errors += 1
+            return
+        if result.get("score") is not None:
+            self.scores.append(result["score"])
+        if result.get("passed"):
+            self.passed += 1
+        if result.get("latency") is not None:
+            self.latencies.append(result["latency"])
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the rows counted so far.
+
+        Returns:
+            {"rows", "resumed", "evaluated", "errors", "mean_score", "pass_rate",
+            "latency_p50", "latency_p95", "elapsed", "rows_per_second"}
+        """
+        evaluated = self.rows - self.errors
+        latencies = sorted(self.latencies)
+
+        def _percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(q * len(latencies)), len(latencies) - 1)], 3)
+
+        elapsed = time.monotonic() - self._start
+        return {
+            "rows": self.rows,
+            "resumed": self.resumed,
+            "evaluated": evaluated,
+            "errors": self.errors,
+            "mean_score": round(sum(self.scores) / len(self.scores), 3) if self.scores else None,
+            "pass_rate": round(self.passed / evaluated, 4) if evaluated else None,
+            "latency_p50": _percentile(0.5),
+            "latency_p95": _percentile(0.95),
+            "elapsed": round(elapsed, 3),
+            "rows_per_second": round((self.rows - self.resumed) / elapsed, 3) if elapsed > 0 else None,
+        }
+
+
+class Evaluator:
+    """
+    Scores a system prompt on a dataset without rewriting it.
+
+    Each row's output is taken from its ``llm_output`` column, the output
+    store, or generated with the system prompt, and then scored against the
+    ground truth by an LLM judge. Rows are processed with bounded concurrency
+    and results are yielded as they complete.
+    """
+
+    def __init__(self,
+                 llm_client: BaseModel,
+                 concurrency: int = 32,
+                 pass_threshold: int = 7,
+                 output_char_budget: Optional[int] = None,
+                 output_token_budget: Optional[int] = None,
+                 output_store: Optional[ResultStore] = None):
+        """
+        Initialize the Evaluator.
+
+        Args:
+            llm_client: LLM client used for generation and judging
+            concurrency: Maximum number of rows in flight at once
+            pass_threshold: Minimum judge score of a passing row
+            output_char_budget: Stop generating an output once it reaches this many characters
+            output_token_budget: Stop generating an output once it reaches this many tokens
+            output_store: If set, generated outputs are read from and written to the store,
+                shared with the optimizer's reused outputs
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        self.llm_client = llm_client
+        self.concurrency = concurrency
+        self.pass_threshold = pass_threshold
+        self.output_store = output_store
+        self.valuator = Valuator(llm_client,
+                                 output_char_budget=output_char_budget,
+                                 output_token_budget=output_token_budget,
+                                 output_store=output_store)
+
+    def run_settings(self, system_prompt: str) -> Dict[str, Any]:
+        """Settings that determine the results of evaluating a prompt, used to check that a resumed run matches."""
+        return {
+            "prompt": fingerprint_prompt(system_prompt),
+            "model": getattr(self.llm_client, "model_name", type(self.llm_client).__name__),
+            "generation": self.valuator.generation_fingerprint(),
+            "judge_template": fingerprint_text(prompt_template.JUDGE_PROMPT),
+            "pass_threshold": self.pass_threshold,
+        }
+
+    def prepare_judge_prompt(self,
+                             system_prompt: str,
+                             input_data: str,
+                             llm_output: str,
+                             ground_truth: str) -> str:
+        """Fill in the judge template."""
+        return prompt_template.JUDGE_PROMPT.format(
+            system_prompt=system_prompt,
+            input=input_data,
+            llm_generated_output=llm_output,
+            ground_truth_output=ground_truth
+        )
+
+    async def get_output(self, item: Dict[str, Any], system_prompt: str, prompt_fingerprint: str) -> str:
+        """Get the output of a row: precomputed, stored or newly generated."""
+        if item.get("llm_output") is not None:
+            return item["llm_output"]
+        if self.output_store is None:
+            return await self.valuator.generate_output(str(item["input"]), system_prompt)
+
+        key = self.valuator.output_key(prompt_fingerprint, item["input"])
+        output = await asyncio.to_thread(self.output_store.get, OUTPUTS_NAMESPACE, key)
+        if output is not None:
+            METRICS.increment("evaluation.reused_outputs")
+            return output
+        output = await self.valuator.generate_output(str(item["input"]), system_prompt)
+        await asyncio.to_thread(self.output_store.put, OUTPUTS_NAMESPACE, key, output)
+        return output
+
+    async def evaluate_row(self, item: Dict[str, Any], system_prompt: str, prompt_fingerprint: str) -> Dict[str, Any]:
+        """
+        Generate and judge one row.
+
+        A failure of the row is recorded in its result instead of being raised,
+        so one bad row does not stop the evaluation.
+
+        Returns:
+            {"row_id", "input", "ground_truth", "output", "score", "passed", "reason", "latency", "error"}
+        """
+        start = time.monotonic()
+        result = {
+            "row_id": row_id(item),
+            "input": str(item.get("input")),
+            "ground_truth": str(item.get("ground_truth")),
+            "output": None,
+            "score": None,
+            "passed": None,
+            "reason": None,
+            "latency": None,
+            "error": None,
+        }
+        try:
+            output = await self.get_output(item, system_prompt, prompt_fingerprint)
+            result["output"] = output
+            response = await self.llm_client.generate_async(self.prepare_judge_prompt(
+                system_prompt=system_prompt,
+                input_data=result["input"],
+                llm_output=output,
+                ground_truth=result["ground_truth"]
+            ))
+            score, reason = parse_judgement(response)
+            if score is None:
+                raise ValueError(f"Judge response has no score: {response[:200]}")
+            result.update(score=score, passed=score >= self.pass_threshold, reason=reason)
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            logging.warning(f"Evaluation of row {result['row_id']} failed: {e}")
+            METRICS.increment("evaluation.errors")
+            result["error"] = str(e)
+        result["latency"] = round(time.monotonic() - start, 3)
+        METRICS.observe("evaluation.row_latency", result["latency"])
+        return result
+
+    async def evaluate(self,
+                       rows: AsyncIterator[Dict[str, Any]],
+                       system_prompt: str,
+                       skip_ids: Optional[Collection[str]] = None,
+                       priority: str = "bulk") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Evaluate rows as they are read, yielding each result as soon as it completes.
+
+        At most ``concurrency`` rows are in flight and no more rows are read
+        from ``rows`` until one completes, so memory stays bounded and a slow
+        consumer slows down reading instead of buffering results. Results are
+        yielded in completion order. Closing the generator cancels the rows in flight.
+
+        Args:
+            rows: Rows with input and ground_truth, and optionally id and llm_output
+            system_prompt: System prompt to evaluate
+            skip_ids: Row ids to skip, e.g. the rows completed by an interrupted run
+            priority: Scheduling priority of the LLM calls ("interactive" or "bulk")
+
+        Yields:
+            Row results, see evaluate_row
+        """
+        skip_ids = skip_ids or ()
+        prompt_fingerprint = fingerprint_prompt(system_prompt)
+        job_id = f"eval-{uuid.uuid4().hex[:8]}"
+
+        async def _evaluate_row(item: Dict[str, Any]) -> Dict[str, Any]:
+            # Set inside the task, so the job context does not leak into the consumer between yields
+            with job_context(job_id, priority):
+                return await self.evaluate_row(item, system_prompt, prompt_fingerprint)
+
+        pending = set()
+        try:
+            async for item in rows:
+                if skip_ids and row_id(item) in skip_ids:
+                    continue
+                pending.add(asyncio.ensure_future(_evaluate_row(item)))
+                if len(pending) < self.concurrency:
+                    continue
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
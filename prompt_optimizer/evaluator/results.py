@@ -0,0 +1,214 @@
+"""Resumable output of evaluation results."""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+# Key of the first JSONL line (and of the Parquet metadata) describing the run that wrote the results
+HEADER_KEY = "evaluation"
+RESULT_FIELDS = ("row_id", "input", "ground_truth", "output", "score", "passed", "reason", "latency", "error")
+
+
+class ResumeMismatchError(ValueError):
+    """Raised when resuming results written by a different evaluation."""
+
+
+def summary_path(path: str) -> str:
+    """Path of the summary written next to a results file, e.g. results.jsonl -> results.summary.json."""
+    name = Path(path).name
+    for suffix in (".jsonl", ".parquet"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return str(Path(path).with_name(f"{name}.summary.json"))
+
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # The last line of an interrupted run may be cut off
+                continue
+
+
+def _read_jsonl_header(path: str) -> Optional[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            first = json.loads(f.readline() or "null")
+        except ValueError:
+            return None
+    return first.get(HEADER_KEY) if isinstance(first, dict) else None
+
+
+class EvaluationWriter:
+    """
+    Writes row results to a JSONL or Parquet file as they complete.
+
+    Rows are appended to a JSONL file and flushed one by one, so an
+    interrupted run loses nothing that completed. A Parquet file is written
+    at the end from a ``<path>.partial.jsonl`` checkpoint kept while running.
+    With ``resume``, the rows completed without error by an earlier run are
+    kept and returned by ``open``; rows that failed are dropped,
+    so they are evaluated again.
+
+    The first JSONL line (the file metadata for Parquet) holds the settings
+    of the run, e.g. the prompt fingerprint, model and pass threshold, and
+    resuming a file written with other settings is refused.
+    """
+
+    def __init__(self, path: str, resume: bool = False, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            path: Output file, ending in .jsonl or .parquet
+            resume: Keep the results of an earlier run instead of overwriting them
+            settings: Settings of the run, see Evaluator.run_settings
+        """
+        if path.endswith(".parquet"):
+            self.format = "parquet"
+            self.rows_path = f"{path}.partial.jsonl"
+        elif path.endswith(".jsonl"):
+            self.format = "jsonl"
+            self.rows_path = path
+        else:
+            raise ValueError(f"Unsupported evaluation output: {path}. Expected a .jsonl or .parquet file")
+        self.path = path
+        self.resume = resume
+        self.settings = settings or {}
+        self._file: Optional[TextIO] = None
+
+    def open(self) -> List[Dict[str, Any]]:
+        """
+        Open the output, keeping the successful results of an earlier run when resuming.
+
+        Returns:
+            The kept results, in file order
+
+        Raises:
+            ResumeMismatchError: If the earlier results were written with other settings
+        """
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        completed: Dict[str, Dict[str, Any]] = {}
+        if self.resume:
+            source = self.rows_path
+            if not os.path.exists(source) and self.format == "parquet" and os.path.exists(self.path):
+                # The earlier run finished; continue from its Parquet file
+                source = None
+                self._check_settings(self._read_parquet_header(self.path))
+                completed = {row["row_id"]: row for row in self._read_parquet(self.path)}
+            if source is not None and os.path.exists(source):
+                self._check_settings(_read_jsonl_header(source))
+                for row in _read_jsonl(source):
+                    if "row_id" not in row:
+                        continue
+                    # Later lines supersede earlier ones of the same row
+                    completed[row["row_id"]] = row
+            completed = {key: row for key, row in completed.items() if row.get("error") is None}
+
+        # Rewrite the kept rows, so the file never holds failed or duplicate rows
+        tmp_path = f"{self.rows_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({HEADER_KEY: self.settings}, ensure_ascii=False) + "\n")
+            for row in completed.values():
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.rows_path)
+        self._file = open(self.rows_path, "a", encoding="utf-8")
+        return list(completed.values())
+
+    def _check_settings(self, previous: Optional[Dict[str, Any]]) -> None:
+        if previous is None:
+            raise ResumeMismatchError(f"Cannot resume {self.path}: it has no evaluation header. "
+                                      "Run again without --resume to overwrite it.")
+        differing = sorted(key for key in set(previous) | set(self.settings)
+                           if previous.get(key) != self.settings.get(key))
+        if differing:
+            raise ResumeMismatchError(f"Cannot resume {self.path}: it was written with different "
+                                      f"{', '.join(differing)}. Run again without --resume to overwrite it.")
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """Append one row result."""
+        if self._file is None:
+            raise RuntimeError("EvaluationWriter.open must be called before writing")
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the output without finishing it, e.g. when the run was interrupted."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        """
+        Close the output, convert it to Parquet if requested and write the summary file.
+
+        Args:
+            summary: Aggregate metrics of the whole evaluation
+        """
+        self.close()
+        if self.format == "parquet":
+            self._write_parquet()
+            os.remove(self.rows_path)
+        with open(summary_path(self.path), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    def _write_parquet(self, batch_size: int = 10000) -> None:
+        """Convert the JSONL checkpoint to Parquet in batches, so it is never loaded at once."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Writing Parquet requires pyarrow to be installed")
+
+        schema = pa.schema([
+            ("row_id", pa.string()),
+            ("input", pa.string()),
+            ("ground_truth", pa.string()),
+            ("output", pa.string()),
+            ("score", pa.int64()),
+            ("passed", pa.bool_()),
+            ("reason", pa.string()),
+            ("latency", pa.float64()),
+            ("error", pa.string()),
+        ]).with_metadata({HEADER_KEY: json.dumps(self.settings)})
+        tmp_path = f"{self.path}.tmp"
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            batch = []
+            for row in _read_jsonl(self.rows_path):
+                if "row_id" not in row:
+                    continue
+                batch.append({field: row.get(field) for field in RESULT_FIELDS})
+                if len(batch) >= batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _read_parquet_header(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet requires pyarrow to be installed")
+        metadata = pq.ParquetFile(path).schema_arrow.metadata or {}
+        header = metadata.get(HEADER_KEY.encode())
+        return json.loads(header) if header is not None else None
+
+    @staticmethod
+    def _read_parquet(path: str) -> Iterator[Dict[str, Any]]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet requires pyarrow to be installed")
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
@@ -0,0 +1,177 @@
+"""Representative coreset selection for large evaluation datasets."""
+
+import re
+import zlib
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+CORESET_METHODS = ("kmeans", "fps")
+
+
+def hashing_features(texts: List[str], n_features: int = 256) -> np.ndarray:
+    """
+    Build L2-normalized TF-IDF features using the hashing trick.
+
+    Unigrams and bigrams are hashed into ``n_features`` signed buckets, so the
+    memory footprint is ``len(texts) * n_features`` floats regardless of the
+    vocabulary size.
+
+    Args:
+        texts: Texts to featurize
+        n_features: Number of hash buckets
+
+    Returns:
+        Array of shape (len(texts), n_features)
+    """
+    row_ids, col_ids, signs = [], [], []
+    for i, text in enumerate(texts):
+        tokens = _TOKEN_PATTERN.findall(str(text).lower())
+        terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for term in terms:
+            h = zlib.crc32(term.encode("utf-8"))
+            row_ids.append(i)
+            col_ids.append(h % n_features)
+            signs.append(1.0 if (h >> 31) & 1 else -1.0)
+
+    counts = np.zeros((len(texts), n_features), dtype=np.float32)
+    np.add.at(counts, (np.asarray(row_ids, dtype=np.int64), np.asarray(col_ids, dtype=np.int64)), signs)
+
+    # Sublinear TF scaled by smoothed IDF
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0
+    features = np.sign(counts) * np.log1p(np.abs(counts)) * idf.astype(np.float32)
+
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
+
+
+def _squared_distances(X: np.ndarray, centers: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+    """Squared euclidean distances between rows of X and centers, computed in batches."""
+    center_norms = np.einsum("ij,ij->i", centers, centers)
+    distances = np.empty((X.shape[0], centers.shape[0]), dtype=np.float32)
+    for start in range(0, X.shape[0], batch_size):
+        batch = X[start:start + batch_size]
+        batch_norms = np.einsum("ij,ij->i", batch, batch)[:, None]
+        distances[start:start + batch_size] = np.maximum(
+            batch_norms - 2.0 * batch @ centers.T + center_norms, 0.0
+        )
+    return distances
+
+
+def farthest_point_sampling(X: np.ndarray, k: int, seed: int = 42) -> np.ndarray:
+    """
+    Greedily pick k points that maximize coverage of the feature space.
+
+    Args:
+        X: Feature matrix
+        k: Number of points to select
+        seed: Seed for the first pick
+
+    Returns:
+        Indices of the selected rows
+    """
+    rng = np.random.default_rng(seed)
+    selected = [int(rng.integers(X.shape[0]))]
+    min_distances = _squared_distances(X, X[selected])[:, 0]
+    for _ in range(1, k):
+        next_index = int(np.argmax(min_distances))
+        if min_distances[next_index] <= 0:
+            # Every remaining row duplicates an already selected one
+            break
+        selected.append(next_index)
+        min_distances = np.minimum(min_distances, _squared_distances(X, X[[next_index]])[:, 0])
+    return np.asarray(selected)
+
+
+def kmeans(X: np.ndarray, k: int, n_iter: int = 10, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster rows with k-means++ initialization followed by Lloyd iterations.
+
+    Args:
+        X: Feature matrix
+        k: Number of clusters
+        n_iter: Maximum number of Lloyd iterations
+        seed: Random seed
+
+    Returns:
+        Tuple of (centers, labels)
+    """
+    rng = np.random.default_rng(seed)
+    center_ids = [int(rng.integers(X.shape[0]))]
+    min_distances = _squared_distances(X, X[center_ids])[:, 0]
+    for _ in range(1, k):
+        total = float(min_distances.sum())
+        if total <= 0:
+            break
+        next_index = int(rng.choice(X.shape[0], p=min_distances / total))
+        center_ids.append(next_index)
+        min_distances = np.minimum(min_distances, _squared_distances(X, X[[next_index]])[:, 0])
+    centers = X[center_ids].copy()
+
+    labels = np.full(X.shape[0], -1)
+    for _ in range(n_iter):
+        new_labels = np.argmin(_squared_distances(X, centers), axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, X)
+        sizes = np.bincount(labels, minlength=centers.shape[0])
+        non_empty = sizes > 0
+        centers[non_empty] = sums[non_empty] / sizes[non_empty, None]
+    return centers, labels
+
+
+def select_coreset(texts: List[str],
+                   budget: int,
+                   method: str = "kmeans",
+                   seed: int = 42,
+                   n_features: int = 256) -> Tuple[List[int], List[float]]:
+    """
+    Select a budgeted, representative subset of texts.
+
+    Each selected row stands in for the rows closest to it, and its weight is
+    the share of the full dataset it represents.
+
+    Args:
+        texts: Texts to select from
+        budget: Maximum number of rows to keep
+        method: "kmeans" (cluster representatives) or "fps" (farthest-point sampling)
+        seed: Random seed
+        n_features: Number of hashing features
+
+    Returns:
+        Tuple of (selected indices in ascending order, stratification weights)
+    """
+    if method not in CORESET_METHODS:
+        raise ValueError(f"Invalid coreset method: {method}. Expected one of {CORESET_METHODS}")
+    if budget < 1:
+        raise ValueError("Coreset budget must be at least 1")
+
+    n = len(texts)
+    if n <= budget:
+        return list(range(n)), [1.0 / n] * n if n else []
+
+    X = hashing_features(texts, n_features)
+    if method == "kmeans":
+        centers, labels = kmeans(X, budget, seed=seed)
+        # Representative of each cluster is the member closest to its centroid
+        distances = np.sum((X - centers[labels]) ** 2, axis=1)
+        representatives = {}
+        for index in np.argsort(distances, kind="stable"):
+            representatives.setdefault(int(labels[index]), int(index))
+        selected = np.asarray(sorted(representatives.values()))
+        assignments = np.argmin(_squared_distances(X, X[selected]), axis=1)
+    else:
+        selected = np.sort(farthest_point_sampling(X, budget, seed))
+        assignments = np.argmin(_squared_distances(X, X[selected]), axis=1)
+
+    sizes = np.bincount(assignments, minlength=len(selected))
+    weights = (sizes / n).tolist()
+    logging.info(f"Selected coreset of {len(selected)} rows out of {n} using {method}")
+    return selected.tolist(), weights
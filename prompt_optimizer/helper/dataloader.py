@@ -1,11 +1,15 @@
-from typing import List, Dict, Any, Iterator, Optional, Union
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Union
 import json
 import os
-import pandas as pd
 import logging
 from pathlib import Path
 import random
-from pandas import DataFrame
+
+from prompt_optimizer.helper.ingest import iter_dataset_file
+from prompt_optimizer.helper.tokens import count_tokens
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 class DataLoader:
     """
@@ -13,28 +17,44 @@ class DataLoader:
     """
     
     def __init__(self, 
-                 data: Union[str, DataFrame] = None, 
+                 data: Union[str, "DataFrame", Iterable["DataFrame"]] = None, 
                  shuffle: bool = True,
-                 seed: int = 42):
+                 seed: int = 42,
+                 coreset_size: Optional[int] = None,
+                 coreset_method: str = "kmeans"):
         """
         Initialize the DataLoader with either a path to data file or direct data.
         
         Args:
-            data_path: Path to the data file (JSON)
-            data: Direct data input as a list of dictionaries
+            data: Path to a CSV/JSONL/Parquet file (optionally .gz), a DataFrame,
+                or an iterable of DataFrame blocks consumed one block at a time.
+                An optional ``llm_output`` column holds precomputed model outputs.
+            coreset_size: If set, keep only this many representative rows
+            coreset_method: Coreset selection method ("kmeans" or "fps")
         """
+        # pandas is imported on first use to keep package imports fast
+        import pandas as pd
+
         if isinstance(data, str):
-            self.data = self._load_data_from_csv(data, shuffle, seed)
-        elif isinstance(data, DataFrame):
+            self.data = self._load_data_from_file(data, shuffle, seed)
+        elif isinstance(data, pd.DataFrame):
             self.data = self._load_data_from_df(data, shuffle, seed)
+        elif isinstance(data, Iterable):
+            self.data = self._load_data_from_frames(data, shuffle, seed)
         else:
             raise ValueError("Invalid data type")
             
         self._validate_data()
+        self._clean_precomputed_outputs()
+        if coreset_size is not None:
+            self.data = self._select_coreset(coreset_size, coreset_method, seed)
         self.current_index = 0
+        # Token cost of each row per tokenizer model, computed on first use; compute it in a
+        # worker thread (see PromptOptimizer._load_data) before building chunks on the event loop
+        self._row_tokens: Dict[Optional[str], List[int]] = {}
 
     def _load_data_from_df(self, 
-                            data: DataFrame,
+                            data: "DataFrame",
                             shuffle: bool,
                             seed: int) -> List[Dict[str, Any]]:
         """
@@ -46,10 +66,25 @@ class DataLoader:
             random.shuffle(data)
         return data
     
-    def _load_data_from_csv(self, 
-                            data_path: str, 
-                            shuffle: bool, 
-                            seed: int) -> List[Dict[str, Any]]:
+    def _load_data_from_frames(self,
+                               frames: Iterable["DataFrame"],
+                               shuffle: bool,
+                               seed: int) -> List[Dict[str, Any]]:
+        """
+        Load data from DataFrame blocks, converting each block as soon as it is parsed.
+        """
+        data = []
+        for frame in frames:
+            data.extend(frame.to_dict(orient='records'))
+        if shuffle:
+            random.seed(seed)
+            random.shuffle(data)
+        return data
+    
+    def _load_data_from_file(self, 
+                             data_path: str, 
+                             shuffle: bool, 
+                             seed: int) -> List[Dict[str, Any]]:
         """
         Load data from a file.
         
@@ -63,8 +98,7 @@ class DataLoader:
         if not path.exists():
             raise FileNotFoundError(f"Data file not found: {data_path}")
             
-        data = pd.read_csv(path)
-        return self._load_data_from_df(data, shuffle, seed)
+        return self._load_data_from_frames(iter_dataset_file(data_path), shuffle, seed)
     
     def _validate_data(self):
         """Validate that data contains required fields."""
@@ -74,6 +108,35 @@ class DataLoader:
             missing_fields = [field for field in required_fields if field not in item]
             if missing_fields:
                 logging.warning(f"Item {i} is missing required fields: {missing_fields}")
+
+    def _clean_precomputed_outputs(self):
+        """Drop empty ``llm_output`` cells (missing values parse as NaN), so those outputs are generated."""
+        for item in self.data:
+            if "llm_output" in item and not isinstance(item["llm_output"], str):
+                del item["llm_output"]
+
+    def _select_coreset(self,
+                        coreset_size: int,
+                        coreset_method: str,
+                        seed: int) -> List[Dict[str, Any]]:
+        """
+        Reduce the data to a representative subset.
+
+        Each kept item gets a ``coreset_weight`` field with the share of the
+        full dataset it represents.
+
+        Args:
+            coreset_size: Number of rows to keep
+            coreset_method: Coreset selection method
+
+        Returns:
+            List of selected data items
+        """
+        from prompt_optimizer.helper.coreset import select_coreset
+
+        texts = [f"{item.get('input', '')}\n{item.get('ground_truth', '')}" for item in self.data]
+        indices, weights = select_coreset(texts, coreset_size, method=coreset_method, seed=seed)
+        return [{**self.data[index], "coreset_weight": weight} for index, weight in zip(indices, weights)]
     
     def get_chunk(self, chunk_size: int) -> List[Dict[str, Any]]:
         """
@@ -92,21 +155,60 @@ class DataLoader:
         self.current_index += chunk_size
         return chunk
     
-    def get_chunks(self, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    def row_tokens(self, model_name: Optional[str] = None) -> List[int]:
+        """
+        Get the estimated token cost of each row: its input, ground truth and precomputed output.
+        
+        Args:
+            model_name: Model whose tokenizer is used
+            
+        Returns:
+            Token cost per row, in the order of the data
+        """
+        if model_name not in self._row_tokens:
+            self._row_tokens[model_name] = [
+                sum(count_tokens(str(item[field]), model_name)
+                    for field in ("input", "ground_truth", "llm_output") if item.get(field) is not None)
+                for item in self.data
+            ]
+        return self._row_tokens[model_name]
+    
+    def get_chunks(self,
+                   chunk_size: int,
+                   token_budget: Optional[int] = None,
+                   model_name: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
         """
         Get an iterator that yields chunks of data.
         
+        With a token budget, consecutive rows are packed into a chunk until the
+        next row would exceed the budget, so every chunk carries a similar
+        amount of text regardless of row length. A row larger than the budget
+        forms a chunk on its own.
+        
         Args:
-            chunk_size: Size of each chunk
+            chunk_size: Size of each chunk, ignored when a token budget is set
+            token_budget: Target number of tokens per chunk
+            model_name: Model whose tokenizer estimates the tokens of a row
             
         Yields:
             Chunks of data
         """
-        self.current_index = 0
-        while True:
-            chunk = self.get_chunk(chunk_size)
-            if not chunk:
-                break
+        # Independent of current_index, so concurrent jobs can share one loader
+        if token_budget is None:
+            for start in range(0, len(self.data), chunk_size):
+                yield self.data[start:start + chunk_size]
+            return
+        
+        chunk, chunk_tokens = [], 0
+        for item, tokens in zip(self.data, self.row_tokens(model_name)):
+            if chunk and chunk_tokens + tokens > token_budget:
+                yield chunk
+                chunk, chunk_tokens = [], 0
+            if tokens > token_budget:
+                logging.warning(f"Row of {tokens} tokens exceeds the chunk token budget of {token_budget}")
+            chunk.append(item)
+            chunk_tokens += tokens
+        if chunk:
             yield chunk
             
     def reset(self):
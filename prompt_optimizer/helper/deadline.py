@@ -0,0 +1,86 @@
+"""Deadlines that propagate from a request down to individual LLM calls."""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Absolute deadline of the current request on the time.monotonic() clock
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the deadline of the current request has passed."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Set a deadline for the work done inside the block (and tasks it starts).
+
+    A nested scope can only shorten the deadline of the enclosing one.
+
+    Args:
+        seconds: Time budget from now, or None to keep the current deadline
+    """
+    current = _deadline.get()
+    if seconds is None:
+        yield current
+        return
+    deadline = time.monotonic() + seconds
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Clear the deadline inside the block, e.g. to start a task shared by callers with different deadlines."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left until the current deadline, or None without a deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """Raise DeadlineExceededError if the current deadline has passed."""
+    remaining = time_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError("Deadline exceeded")
+
+
+async def with_deadline(awaitable: Awaitable[T]) -> T:
+    """
+    Await, cancelling the awaitable when the current deadline passes.
+
+    Raises:
+        DeadlineExceededError: If the deadline passed first
+    """
+    remaining = time_remaining()
+    if remaining is None:
+        return await awaitable
+    timeout = asyncio.timeout(max(remaining, 0))
+    try:
+        async with timeout:
+            return await awaitable
+    except TimeoutError:
+        # Timeouts raised by the awaitable itself are not deadline expiries
+        if timeout.expired():
+            raise DeadlineExceededError("Deadline exceeded") from None
+        raise
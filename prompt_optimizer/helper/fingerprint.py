@@ -0,0 +1,42 @@
+"""Stable content fingerprints for prompts, rows and datasets."""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Sequence
+
+# Fields of a row that affect its valuation
+ROW_FIELDS = ("input", "ground_truth")
+# Fields of a row that affect a whole optimization run
+JOB_ROW_FIELDS = ("input", "ground_truth", "llm_output")
+
+
+def fingerprint_text(text: str) -> str:
+    """Hex digest identifying a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fingerprint_prompt(prompt: str) -> str:
+    """Hex digest identifying a system prompt."""
+    return fingerprint_text(prompt)
+
+
+def fingerprint_row(item: Dict[str, Any], fields: Sequence[str] = ROW_FIELDS) -> str:
+    """
+    Hex digest identifying a data row by the given fields, by default its input and ground truth.
+
+    Other columns (e.g. coreset weights) do not change the fingerprint.
+    """
+    return fingerprint_text(json.dumps([str(item.get(field)) for field in fields], ensure_ascii=False))
+
+
+def fingerprint_rows(items: Iterable[Dict[str, Any]], fields: Sequence[str] = ROW_FIELDS) -> str:
+    """Hex digest identifying an ordered collection of rows."""
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(fingerprint_row(item, fields).encode("ascii"))
+    return digest.hexdigest()
+
+
+def fingerprint_config(values: Dict[str, Any]) -> str:
+    """Hex digest identifying a flat dict of settings, independent of key order."""
+    return fingerprint_text(json.dumps(values, sort_keys=True, default=str))
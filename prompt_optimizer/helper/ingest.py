@@ -0,0 +1,178 @@
+"""Incremental ingestion of dataset files and uploads."""
+
+import gzip
+import io
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+SUPPORTED_FORMATS = ("csv", "jsonl", "parquet")
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+}
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+    "application/x-jsonlines": "jsonl",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+_GZIP_CONTENT_TYPES = {"application/gzip", "application/x-gzip"}
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when a dataset exceeds the configured size limit."""
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a dataset is not in a supported format."""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Detect the dataset format from the file name, falling back to the content type.
+
+    Args:
+        filename: Name of the file, e.g. "data.csv.gz"
+        content_type: MIME type sent with the upload
+
+    Returns:
+        Tuple of (format, gzip-compressed)
+    """
+    name = (filename or "").lower()
+    compressed = name.endswith(".gz") or content_type in _GZIP_CONTENT_TYPES
+    if name.endswith(".gz"):
+        name = name[:-3]
+
+    file_format = _EXTENSIONS.get(Path(name).suffix) or _CONTENT_TYPES.get(content_type or "")
+    if file_format is None:
+        raise UnsupportedFormatError(
+            f"Unsupported dataset format: {filename or content_type}. "
+            "Expected CSV, JSONL or Parquet, optionally gzip-compressed."
+        )
+    if file_format == "parquet" and compressed:
+        raise UnsupportedFormatError("Parquet files are compressed internally and cannot be gzipped")
+    return file_format, compressed
+
+
+class _LimitedReader(io.RawIOBase):
+    """Binary reader that fails as soon as more than ``limit`` bytes were read."""
+
+    def __init__(self, raw: BinaryIO, limit: int):
+        self._raw = raw
+        self._limit = limit
+        self._read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        self._read += len(data)
+        if self._read > self._limit:
+            raise UploadTooLargeError(f"Decompressed dataset exceeds {self._limit} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _file_size(fileobj: BinaryIO) -> int:
+    position = fileobj.tell()
+    fileobj.seek(0, io.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def iter_dataset(fileobj: BinaryIO,
+                 file_format: str,
+                 compressed: bool = False,
+                 rows_per_block: int = 50000,
+                 max_bytes: Optional[int] = None,
+                 max_decompressed_bytes: Optional[int] = None,
+                 max_rows: Optional[int] = None) -> Iterator["DataFrame"]:
+    """
+    Parse a dataset incrementally, yielding blocks of rows.
+
+    The file is read in bounded blocks by the parser itself, so neither the raw
+    bytes nor a decoded copy of the whole file is ever held in memory.
+
+    Args:
+        fileobj: Seekable binary file positioned at the start of the dataset
+        file_format: One of SUPPORTED_FORMATS
+        compressed: Whether the file is gzip-compressed
+        rows_per_block: Number of rows per yielded DataFrame
+        max_bytes: Maximum size of the file as stored
+        max_decompressed_bytes: Maximum size of the decompressed content
+        max_rows: Maximum number of rows, checked as each block is parsed
+
+    Yields:
+        DataFrames of at most rows_per_block rows
+    """
+    blocks = _iter_blocks(fileobj, file_format, compressed, rows_per_block, max_bytes, max_decompressed_bytes)
+    if max_rows is None:
+        yield from blocks
+        return
+    rows = 0
+    for block in blocks:
+        rows += len(block)
+        if rows > max_rows:
+            raise UploadTooLargeError(f"Dataset exceeds {max_rows} rows")
+        yield block
+
+
+def _iter_blocks(fileobj: BinaryIO,
+                 file_format: str,
+                 compressed: bool,
+                 rows_per_block: int,
+                 max_bytes: Optional[int],
+                 max_decompressed_bytes: Optional[int]) -> Iterator["DataFrame"]:
+    import pandas as pd
+
+    if max_bytes is not None and _file_size(fileobj) > max_bytes:
+        raise UploadTooLargeError(f"Dataset exceeds {max_bytes} bytes")
+
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise UnsupportedFormatError("Reading Parquet requires pyarrow to be installed")
+        for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=rows_per_block):
+            yield batch.to_pandas()
+        return
+
+    stream = gzip.GzipFile(fileobj=fileobj, mode="rb") if compressed else fileobj
+    if max_decompressed_bytes is not None:
+        stream = io.BufferedReader(_LimitedReader(stream, max_decompressed_bytes))
+
+    if file_format == "csv":
+        yield from pd.read_csv(stream, chunksize=rows_per_block, encoding="utf-8")
+    elif file_format == "jsonl":
+        yield from pd.read_json(stream, lines=True, chunksize=rows_per_block, encoding="utf-8")
+    else:
+        raise UnsupportedFormatError(f"Unsupported dataset format: {file_format}")
+
+
+def iter_dataset_file(path: str, rows_per_block: int = 50000) -> Iterator["DataFrame"]:
+    """
+    Parse a dataset file incrementally, detecting its format from the file name.
+
+    Args:
+        path: Path to a CSV, JSONL or Parquet file, optionally ending in .gz
+        rows_per_block: Number of rows per yielded DataFrame
+
+    Yields:
+        DataFrames of at most rows_per_block rows
+    """
+    file_format, compressed = detect_format(Path(path).name)
+    with open(path, "rb") as f:
+        yield from iter_dataset(f, file_format, compressed, rows_per_block)
@@ -0,0 +1,69 @@
+"""Process-wide counters and latency samples for monitoring."""
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any, Deque, Optional
+
+
+class Metrics:
+    """
+    A thread-safe registry of counters and bounded sample windows.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        """
+        Initialize the registry.
+
+        Args:
+            max_samples: Number of recent samples kept per observed metric
+        """
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Increase a counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a sample (e.g. a latency in seconds)."""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """
+        Get a percentile of the recent samples of a metric.
+
+        Args:
+            name: Metric name
+            q: Quantile between 0 and 1
+
+        Returns:
+            The percentile, or None if there are no samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return counters and sample summaries as plain data."""
+        with self._lock:
+            counters = dict(self._counters)
+            names = list(self._samples)
+        summaries = {}
+        for name in names:
+            with self._lock:
+                count = len(self._samples[name])
+            summaries[name] = {
+                "count": count,
+                "p50": self.percentile(name, 0.5),
+                "p95": self.percentile(name, 0.95),
+                "p99": self.percentile(name, 0.99),
+            }
+        return {"counters": counters, "samples": summaries}
+
+
+METRICS = Metrics()
@@ -0,0 +1,287 @@
+"""Profiling hooks and event-loop lag monitoring."""
+
+import asyncio
+import inspect
+import io
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional
+
+from prompt_optimizer.helper.metrics import METRICS
+
+if TYPE_CHECKING:
+    from cProfile import Profile
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+def check_profile_options(mode: str, sort: str = "cumulative") -> None:
+    """
+    Validate the profile mode and pstats sort key before profiling starts.
+
+    Raises:
+        ValueError: If the mode or sort key is unknown
+    """
+    import pstats
+
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}. Expected one of {PROFILE_MODES}")
+    sort_keys = [key.value for key in pstats.SortKey]
+    if sort not in sort_keys:
+        raise ValueError(f"Unknown sort key: {sort}. Expected one of {sort_keys}")
+
+
+def format_stats(profile: "Profile", sort: str = "cumulative", limit: int = 30) -> str:
+    """Render the top entries of a cProfile profile as text."""
+    import pstats
+
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class StackSampler:
+    """
+    Samples the stacks of all threads from a background thread.
+
+    Samples are aggregated in the "folded" format (``frame;frame;frame count``)
+    read by flame graph tools. Unlike cProfile it adds no overhead to the
+    profiled code and also sees threads started by ``asyncio.to_thread``.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = [f"{entry.name} ({entry.filename}:{entry.lineno})"
+                         for entry in traceback.extract_stack(frame)]
+                self.samples[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+
+    def folded(self) -> str:
+        """Return the samples in folded format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+@contextmanager
+def profile(path: Optional[str] = None,
+            mode: str = "cprofile",
+            sort: str = "cumulative",
+            limit: int = 30,
+            stream=None) -> Iterator[None]:
+    """
+    Profile the enclosed block.
+
+    With ``cprofile`` the pstats file is written to ``path`` (if set) and the
+    top entries are printed to ``stream``. With ``sampling`` the folded stacks
+    are written to ``path`` (or ``stream``).
+
+    Args:
+        path: File to write the profile to
+        mode: One of PROFILE_MODES
+        sort: pstats sort key of the printed summary
+        limit: Number of entries in the printed summary
+        stream: Text stream for the summary (default: stderr)
+    """
+    stream = stream or sys.stderr
+    check_profile_options(mode, sort)
+    if mode == "sampling":
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            if path:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(sampler.folded())
+            else:
+                stream.write(sampler.folded())
+        return
+    # Imported on first use; profiling is rare and pstats is slow to import
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        stream.write(format_stats(profiler, sort, limit))
+
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+async def profile_running_loop(seconds: float,
+                               mode: str = "cprofile",
+                               sort: str = "cumulative",
+                               limit: int = 50) -> str:
+    """
+    Profile everything the current event loop runs for a number of seconds.
+
+    cProfile only traces the thread it is enabled in, which is the event loop
+    thread here, so it covers every request handled meanwhile. Sampling covers
+    all threads.
+
+    Args:
+        seconds: Duration of the profile
+        mode: One of PROFILE_MODES
+        sort: pstats sort key (cprofile only)
+        limit: Number of entries returned (cprofile only)
+
+    Returns:
+        The profile as text: pstats summary or folded stacks
+    """
+    check_profile_options(mode, sort)
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        stream = io.StringIO()
+        with profile(mode=mode, sort=sort, limit=limit, stream=stream):
+            await asyncio.sleep(seconds)
+        return stream.getvalue()
+    finally:
+        _profile_lock.release()
+
+
+def _innermost_coroutine(frame) -> Optional[str]:
+    """Name of the innermost coroutine on a stack, which is the one blocking the loop."""
+    while frame is not None:
+        if frame.f_code.co_flags & inspect.CO_COROUTINE:
+            return f"{frame.f_code.co_qualname} ({frame.f_code.co_filename}:{frame.f_lineno})"
+        frame = frame.f_back
+    return None
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up and reports stalls.
+
+    A heartbeat coroutine sleeps ``interval`` seconds at a time; the delay of
+    each wake-up is the loop lag, exported as the ``event_loop.lag`` sample.
+    A watchdog thread notices a missing heartbeat while the loop is still
+    blocked and captures the loop thread's stack, so a stall above
+    ``threshold`` is logged with the coroutine that caused it.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.1,
+                 interval: float = 0.05,
+                 max_stalls: int = 20):
+        """
+        Initialize the monitor.
+
+        Args:
+            threshold: Lag in seconds above which a stall is reported
+            interval: Seconds between heartbeats
+            max_stalls: Number of recent stalls kept for inspection
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.recent_stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self._last_beat = time.monotonic()
+        self._captured: Optional[Dict[str, Any]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop monitoring."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            METRICS.observe("event_loop.lag", lag)
+            captured, self._captured = self._captured, None
+            if lag >= self.threshold:
+                self._report(lag, captured)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            blocked_for = time.monotonic() - beat - self.interval
+            if blocked_for < self.threshold or self._captured is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._captured = {
+                "coroutine": _innermost_coroutine(frame),
+                "stack": "".join(traceback.format_stack(frame)),
+            }
+            del frame
+
+    def _report(self, lag: float, captured: Optional[Dict[str, Any]]) -> None:
+        stall = {
+            "lag": round(lag, 4),
+            "at": time.time(),
+            "coroutine": captured["coroutine"] if captured else None,
+            "stack": captured["stack"] if captured else None,
+        }
+        self.recent_stalls.append(stall)
+        METRICS.increment("event_loop.stalls")
+        METRICS.observe("event_loop.stall_duration", lag)
+        if captured:
+            logging.warning(f"Event loop blocked for {lag:.3f}s in {stall['coroutine']}:\n{stall['stack']}")
+        else:
+            logging.warning(f"Event loop blocked for {lag:.3f}s")
+
+    def stalls(self) -> List[Dict[str, Any]]:
+        """Return the recent stalls, oldest first."""
+        return list(self.recent_stalls)
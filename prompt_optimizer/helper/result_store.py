@@ -0,0 +1,190 @@
+"""Persistent key-value store for results that are expensive to recompute."""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (namespace, accessed_at);
+"""
+
+
+# Share of max_entries a namespace is trimmed to when it exceeds the limit
+EVICT_TO = 0.9
+
+
+class ResultStore:
+    """
+    SQLite-backed store of JSON values, grouped by namespace.
+
+    Each namespace keeps at most ``max_entries`` values; once it grows past
+    the limit, the least recently used values are evicted in one batch down
+    to ``EVICT_TO`` of the limit, so eviction is rare and never sorts the table. Values older than ``ttl_seconds`` are
+    treated as missing. Both limits can be overridden per namespace with
+    ``configure_namespace``.
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Initialize the store.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of values per namespace (None for unbounded)
+            ttl_seconds: Age after which values expire (None to never expire)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._limits: Dict[str, Tuple[Optional[int], Optional[float]]] = {}
+        # Upper bound of the number of values per namespace, so the table is only counted near the limit
+        self._counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def configure_namespace(self,
+                            namespace: str,
+                            max_entries: Optional[int] = None,
+                            ttl_seconds: Optional[float] = None) -> None:
+        """
+        Set the limits of one namespace instead of the store-wide ones.
+
+        Args:
+            namespace: Namespace to configure
+            max_entries: Maximum number of values in the namespace (None for unbounded)
+            ttl_seconds: Age after which values of the namespace expire (None to never expire)
+        """
+        self._limits[namespace] = (max_entries, ttl_seconds)
+
+    def _namespace_limits(self, namespace: str) -> Tuple[Optional[int], Optional[float]]:
+        return self._limits.get(namespace, (self.max_entries, self.ttl_seconds))
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several keys at once.
+
+        Returns:
+            Mapping of the keys that were found to their values
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        conn = self._connection()
+        now = time.time()
+        _, ttl_seconds = self._namespace_limits(namespace)
+        min_created = now - ttl_seconds if ttl_seconds is not None else float("-inf")
+        found = {}
+        # Stay below SQLite's limit on the number of bound parameters
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, value FROM results WHERE namespace = ? AND created_at >= ? AND key IN ({placeholders})",
+                [namespace, min_created, *batch]
+            ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+            if rows:
+                conn.execute(
+                    f"UPDATE results SET accessed_at = ? WHERE namespace = ? "
+                    f"AND key IN ({','.join('?' * len(rows))})",
+                    [now, namespace, *[key for key, _ in rows]]
+                )
+        return found
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        return self.get_many(namespace, [key]).get(key, default)
+
+    def put_many(self, namespace: str, items: Dict[str, Any]) -> None:
+        """Store several values at once and evict the least recently used ones over the limit."""
+        if not items:
+            return
+        now = time.time()
+        max_entries, _ = self._namespace_limits(namespace)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(namespace, key, json.dumps(value, default=str), now, now) for key, value in items.items()]
+            )
+            if max_entries is not None:
+                self._evict(conn, namespace, max_entries, len(items))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            with self._counts_lock:
+                self._counts.pop(namespace, None)
+            raise
+        conn.execute("COMMIT")
+    
+    def _count(self, conn: sqlite3.Connection, namespace: str) -> int:
+        return conn.execute("SELECT COUNT(*) FROM results WHERE namespace = ?", (namespace,)).fetchone()[0]
+    
+    def _evict(self, conn: sqlite3.Connection, namespace: str, max_entries: int, added: int) -> None:
+        """Trim the namespace to the low-water mark once it may hold more than max_entries values."""
+        with self._counts_lock:
+            estimate = self._counts.get(namespace)
+            # Replaced keys and other processes' writes make this an estimate; it is corrected below
+            self._counts[namespace] = estimate + added if estimate is not None else None
+        if estimate is not None and estimate + added <= max_entries:
+            return
+        count = self._count(conn, namespace)
+        if count > max_entries:
+            excess = count - int(max_entries * EVICT_TO)
+            # Walks the (namespace, accessed_at) index from the oldest entry
+            conn.execute(
+                "DELETE FROM results WHERE namespace = ? AND key IN ("
+                "SELECT key FROM results WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (namespace, namespace, excess)
+            )
+            count -= excess
+        with self._counts_lock:
+            self._counts[namespace] = count
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        self.put_many(namespace, {key: value})
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute("DELETE FROM results WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+_STORES: Dict[str, ResultStore] = {}
+
+
+def get_result_store(path: str, max_entries: Optional[int] = None) -> ResultStore:
+    """
+    Get the process-wide store for a database file.
+
+    Args:
+        path: Path of the SQLite database file
+        max_entries: Maximum number of values per namespace, used when the store is first opened
+
+    Returns:
+        The result store
+    """
+    if path not in _STORES:
+        _STORES[path] = ResultStore(path, max_entries=max_entries)
+    return _STORES[path]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Union, List
+from typing import Any, Dict, Literal, Optional, Union, List
 import os
 
 
@@ -16,15 +16,46 @@ class OptimizeFileUploadRequest(BaseModel):
         default="gpt",
         description="LLM client to use for optimization"
     )
-    iterations: int = Field(
-        default=1, 
+    iterations: Optional[int] = Field(
+        default=None, 
         ge=1, 
-        description="Number of optimization iterations to run"
+        description="Number of optimization iterations to run (default: optimizer.max_iterations from config)"
     )
-    chunk_size: int = Field(
-        default=10, 
+    chunk_size: Optional[int] = Field(
+        default=None, 
         ge=1, 
-        description="Number of examples to process in each chunk"
+        description="Number of examples to process in each chunk (default: optimizer.chunk_size from config)"
+    )
+    chunk_token_budget: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Pack examples into chunks of about this many tokens instead of chunk_size rows"
+    )
+    coreset_size: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Optimize on a representative subset of this many rows"
+    )
+    coreset_method: Literal["kmeans", "fps"] = Field(
+        default="kmeans",
+        description="Coreset selection method: 'kmeans' or 'fps'"
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Reuse stored valuations of unchanged rows and only valuate new or changed ones"
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Time budget of the run; stops early with the best prompt so far"
+    )
+    memoize: bool = Field(
+        default=False,
+        description="Return the stored result of an identical earlier run instead of optimizing again"
+    )
+    reuse_outputs: bool = Field(
+        default=False,
+        description="Store generated outputs and reuse them when the same prompt is valuated again"
     )
     
     @validator('system_prompt')
@@ -32,7 +63,8 @@ class OptimizeFileUploadRequest(BaseModel):
         if not v or not v.strip():
             raise ValueError("System prompt cannot be empty")
         return v.strip()
-    
+
+
     class Config:
         schema_extra = {
             "example": {
@@ -43,6 +75,121 @@ class OptimizeFileUploadRequest(BaseModel):
         }
 
 
+class EvaluateFileUploadRequest(BaseModel):
+    """
+    Schema for file upload evaluation requests.
+    """
+    # File upload is handled separately
+    system_prompt: str = Field(
+        ...,
+        description="System prompt to evaluate"
+    )
+    llm_client: str = Field(
+        default="gpt",
+        description="LLM client to use for generation and judging"
+    )
+    concurrency: int = Field(
+        default=32,
+        ge=1,
+        description="Maximum number of rows generated and judged at once"
+    )
+    pass_threshold: int = Field(
+        default=7,
+        ge=1,
+        le=10,
+        description="Minimum judge score (1-10) of a passing row"
+    )
+
+    @validator('system_prompt')
+    def validate_prompt(cls, v):
+        if not v or not v.strip():
+            raise ValueError("System prompt cannot be empty")
+        return v.strip()
+
+
+class BulkJobRequest(BaseModel):
+    """
+    Schema for one (prompt, dataset) job of a bulk optimization request.
+    """
+    id: Optional[str] = Field(
+        default=None,
+        description="Identifier echoed back with the job's result (default: its position)"
+    )
+    system_prompt: str = Field(
+        ...,
+        description="Initial system prompt to optimize"
+    )
+    dataset: str = Field(
+        ...,
+        description="Name of the dataset in `datasets` to optimize against"
+    )
+    iterations: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Number of optimization iterations to run"
+    )
+    chunk_size: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Number of examples to process in each chunk"
+    )
+    chunk_token_budget: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Pack examples into chunks of about this many tokens instead of chunk_size rows"
+    )
+
+    @validator('system_prompt')
+    def validate_prompt(cls, v):
+        if not v or not v.strip():
+            raise ValueError("System prompt cannot be empty")
+        return v.strip()
+
+
+class BulkOptimizeRequest(BaseModel):
+    """
+    Schema for optimizing many prompts in one request.
+    """
+    llm_client: str = Field(
+        default="gpt",
+        description="LLM client to use for optimization"
+    )
+    datasets: Dict[str, List[Dict[str, Any]]] = Field(
+        ...,
+        description="Dataset name -> records with input and ground_truth fields"
+    )
+    jobs: List[BulkJobRequest] = Field(
+        ...,
+        description="Prompts to optimize, each against one of the datasets"
+    )
+    max_parallel_jobs: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of prompts optimized at once"
+    )
+
+    @validator('jobs')
+    def validate_jobs(cls, v, values):
+        datasets = values.get('datasets', {})
+        for job in v:
+            if job.dataset not in datasets:
+                raise ValueError(f"Unknown dataset: {job.dataset}")
+        return v
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "datasets": {
+                    "history": [{"input": "When did WW2 end?", "ground_truth": "1945"}]
+                },
+                "jobs": [
+                    {"id": "concise", "system_prompt": "Answer briefly.", "dataset": "history"},
+                    {"id": "expert", "system_prompt": "You are a historian.", "dataset": "history"}
+                ]
+            }
+        }
+
+
 class OptimizeResponse(BaseModel):
     """
     Schema for optimization response.
@@ -0,0 +1,50 @@
+"""Fast local token counting for budgeting chunks and calls."""
+
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+CHARS_PER_TOKEN = 4
+DEFAULT_ENCODING = "o200k_base"
+
+
+def heuristic_tokens(text: str) -> int:
+    """Approximate token count of English text: one token per four characters."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: Optional[str]) -> Any:
+    """tiktoken encoding of a model, or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name) if model_name else tiktoken.get_encoding(DEFAULT_ENCODING)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # e.g. the encoding file cannot be downloaded in an offline environment
+        logging.warning(f"Falling back to estimated token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text.
+
+    Uses tiktoken when it is installed and falls back to heuristic_tokens.
+
+    Args:
+        text: Text to count
+        model_name: Model whose tokenizer is used (default: o200k_base)
+
+    Returns:
+        Number of tokens
+    """
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return heuristic_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
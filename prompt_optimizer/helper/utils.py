@@ -13,4 +13,25 @@ def run_async(async_func, *args, **kwargs):
         Result of the async function
     """
     loop = asyncio.get_event_loop()
-    return loop.run_until_complete(async_func(*args, **kwargs))
\ No newline at end of file
+    return loop.run_until_complete(async_func(*args, **kwargs))
+
+async def gather_or_cancel(*aws):
+    """
+    Run awaitables concurrently like asyncio.gather, but cancel the others as soon as one fails.
+    
+    Unlike asyncio.gather, a failure or cancellation never leaves sibling calls
+    running (and spending quota) in the background. The first error is raised
+    as is, not wrapped in an ExceptionGroup.
+    
+    Args:
+        *aws: Coroutines to run
+        
+    Returns:
+        Their results, in order
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(aw) for aw in aws]
+    except BaseExceptionGroup as e:
+        raise e.exceptions[0]
+    return [task.result() for task in tasks]
\ No newline at end of file
@@ -1,4 +1,6 @@
 from .base_model import BaseModel
 from .gpt_model import GPTModel
+from .retry import CircuitOpenError, circuit_breaker_states
+from .scheduler import job_context
 
-__all__ = ["BaseModel", "GPTModel"]
\ No newline at end of file
+__all__ = ["BaseModel", "GPTModel", "CircuitOpenError", "circuit_breaker_states", "job_context"]
\ No newline at end of file
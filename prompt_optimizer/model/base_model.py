@@ -1,12 +1,21 @@
 """Base class for LLM model implementations with synchronous and asynchronous support."""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Union, Tuple, Callable, Awaitable, TypeVar
+from typing import Dict, Any, List, Optional, Union, Tuple, Callable, Awaitable, AsyncIterator, TypeVar
 import time
 import json
 import asyncio
+from contextlib import asynccontextmanager
 from functools import wraps
 
+from prompt_optimizer.coordination import get_rate_limiter
+from prompt_optimizer.helper.deadline import DeadlineExceededError, check_deadline, time_remaining, with_deadline
+from prompt_optimizer.helper.metrics import METRICS
+from prompt_optimizer.helper.tokens import count_tokens, heuristic_tokens
+from .hedging import get_hedge_policy
+from .retry import RetryPolicy, get_circuit_breaker, is_retryable
+from .scheduler import get_call_scheduler
+
 # Type variable for generic return type
 T = TypeVar('T')
 
@@ -29,6 +38,16 @@ class BaseModel(ABC):
         max_tokens: Optional[int] = None,
         retry_attempts: int = 3,
         retry_delay: float = 0.5,
+        retry_max_delay: float = 30.0,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_timeout: float = 30.0,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_max_rate: float = 0.1,
+        hedge_min_samples: int = 20,
+        max_concurrency: Optional[int] = None,
+        reserved_interactive_slots: int = 0,
+        request_timeout: Optional[float] = None,
         **kwargs
     ):
         """
@@ -40,7 +59,17 @@ class BaseModel(ABC):
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum number of tokens to generate
             retry_attempts: Number of retry attempts for API calls
-            retry_delay: Delay between retry attempts in seconds
+            retry_delay: Base delay of the jittered exponential backoff in seconds
+            retry_max_delay: Upper bound of a single backoff in seconds
+            circuit_failure_threshold: Consecutive transient failures that open the circuit
+            circuit_reset_timeout: Seconds the circuit stays open before letting calls through again
+            hedge_enabled: Send a duplicate request when an async call is slower than usual
+            hedge_percentile: Latency quantile after which a hedge is sent
+            hedge_max_rate: Maximum fraction of async calls that may be hedged
+            hedge_min_samples: Number of latency samples required before hedging
+            max_concurrency: Maximum number of async calls in flight across the process
+            reserved_interactive_slots: Slots of max_concurrency that bulk jobs may not take
+            request_timeout: Seconds a single provider request may take before it is retried
             **kwargs: Additional model-specific parameters
         """
         self.model_name = model_name
@@ -49,7 +78,31 @@ class BaseModel(ABC):
         self.max_tokens = max_tokens
         self.retry_attempts = retry_attempts
         self.retry_delay = retry_delay
+        self.request_timeout = request_timeout
         self.model_params = kwargs
+        self.retry_policy = RetryPolicy(
+            max_attempts=retry_attempts,
+            base_delay=retry_delay,
+            max_delay=retry_max_delay
+        )
+        self.circuit_breaker = get_circuit_breaker(
+            model_name,
+            failure_threshold=circuit_failure_threshold,
+            reset_timeout=circuit_reset_timeout
+        )
+        # Shared requests/tokens budget across processes, if configured
+        self.rate_limiter = get_rate_limiter(model_name)
+        self.scheduler = None
+        if max_concurrency is not None:
+            self.scheduler = get_call_scheduler(model_name, max_concurrency, reserved_interactive_slots)
+        self.hedge_policy = None
+        if hedge_enabled:
+            self.hedge_policy = get_hedge_policy(
+                model_name,
+                percentile=hedge_percentile,
+                max_rate=hedge_max_rate,
+                min_samples=hedge_min_samples
+            )
         
         # Initialize the model client
         self._initialize_client()
@@ -70,32 +123,180 @@ class BaseModel(ABC):
     async def generate_async(self, messages: List[Dict[str, str]], **kwargs) -> str:
         pass
     
+    async def stream_async(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """
+        Yield the completion in pieces as they arrive.
+        
+        Providers without streaming support yield the whole completion at once.
+        """
+        yield await self.generate_async(messages, **kwargs)
+    
+    async def generate_streaming_async(self,
+                                       messages: List[Dict[str, str]],
+                                       max_chars: Optional[int] = None,
+                                       max_stream_tokens: Optional[int] = None,
+                                       truncation_marker: str = "",
+                                       **kwargs) -> str:
+        """
+        Generate a completion by streaming, stopping early once a budget is reached.
+        
+        Records time-to-first-token and total stream duration in the metrics.
+        Aborting closes the stream, so the provider stops generating tokens.
+        The token budget is also sent as ``max_tokens``, so the provider stops on
+        its own, and reading the stream is cancelled when the current deadline passes.
+        
+        Args:
+            messages: Messages to send
+            max_chars: Stop once this many characters were received
+            max_stream_tokens: Stop once this many tokens were received
+            truncation_marker: Text appended to the result when generation was aborted
+            **kwargs: Additional generation parameters
+            
+        Returns:
+            The (possibly truncated) completion
+        """
+        if max_stream_tokens is not None:
+            limit = kwargs.get("max_tokens", self.max_tokens)
+            kwargs["max_tokens"] = max_stream_tokens if limit is None else min(limit, max_stream_tokens)
+        start = time.monotonic()
+        pieces = []
+        aborted = False
+        stream = self.stream_async(messages, **kwargs)
+        
+        async def _consume() -> None:
+            nonlocal aborted
+            n_chars = 0
+            n_tokens = 0
+            async for piece in stream:
+                if not pieces:
+                    METRICS.observe("llm.time_to_first_token", time.monotonic() - start)
+                pieces.append(piece)
+                n_chars += len(piece)
+                if max_stream_tokens is not None:
+                    n_tokens += count_tokens(piece, self.model_name)
+                if ((max_chars is not None and n_chars >= max_chars)
+                        or (max_stream_tokens is not None and n_tokens >= max_stream_tokens)):
+                    aborted = True
+                    return
+        
+        try:
+            await with_deadline(_consume())
+        except DeadlineExceededError:
+            METRICS.increment("llm.deadline_exceeded")
+            raise
+        finally:
+            await stream.aclose()
+        METRICS.observe("llm.stream_duration", time.monotonic() - start)
+        
+        text = "".join(pieces)
+        if aborted:
+            METRICS.increment("llm.stream_early_aborts")
+            if max_chars is not None:
+                text = text[:max_chars]
+            text += truncation_marker
+        return text
+    
     def with_retries(self, func: Callable[..., T], *args, **kwargs) -> T:
         last_error = None  
-        for attempt in range(self.retry_attempts):
+        for attempt in range(self.retry_policy.max_attempts):
+            self.circuit_breaker.before_call()
             try:
-                return func(*args, **kwargs)
+                result = func(*args, **kwargs)
+                self.circuit_breaker.record_success()
+                return result
             except Exception as e:
                 last_error = e
-                if attempt == self.retry_attempts - 1:
+                if not self._handle_failure(attempt, e):
                     raise
-                time.sleep(self.retry_delay * (2 ** attempt))  # Exponential backoff
+                time.sleep(self.retry_policy.backoff(attempt, e))
         raise last_error if last_error else RuntimeError("Unknown error during retries")
     
     async def with_retries_async(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
         last_error = None
         
-        for attempt in range(self.retry_attempts):
+        for attempt in range(self.retry_policy.max_attempts):
+            # Fails fast, also between attempts, while the endpoint's circuit is open
+            self.circuit_breaker.before_call()
+            check_deadline()
             try:
-                return await func(*args, **kwargs)
+                # Cancelled when the deadline of the current request passes
+                result = await with_deadline(func(*args, **kwargs))
+                self.circuit_breaker.record_success()
+                return result
+            except DeadlineExceededError:
+                METRICS.increment("llm.deadline_exceeded")
+                raise
             except Exception as e:
                 last_error = e
-                if attempt == self.retry_attempts - 1:
+                if not self._handle_failure(attempt, e):
+                    raise
+                delay = self.retry_policy.backoff(attempt, e)
+                remaining = time_remaining()
+                if remaining is not None and delay >= remaining:
+                    # The retry could not finish in time; give up without waiting
                     raise
-                await asyncio.sleep(self.retry_delay * (2 ** attempt))  # Exponential backoff
+                await asyncio.sleep(delay)
         
         raise last_error if last_error else RuntimeError("Unknown error during async retries")
     
+    def _handle_failure(self, attempt: int, error: Exception) -> bool:
+        """
+        Record a failed attempt and decide whether to retry it.
+        
+        Only transient errors count towards the circuit breaker; fatal errors
+        such as bad requests or authentication failures are raised right away.
+        """
+        if not is_retryable(error):
+            METRICS.increment("llm.fatal_errors")
+            return False
+        self.circuit_breaker.record_failure()
+        if not self.retry_policy.should_retry(attempt, error):
+            return False
+        METRICS.increment("llm.retries")
+        return True
+    
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Rough token cost of a call: the heuristic prompt size plus the completion limit."""
+        if isinstance(messages, str):
+            text = messages
+        else:
+            text = " ".join(str(message.get("content", "")) for message in messages)
+        return heuristic_tokens(text) + (self.max_tokens or 0)
+    
+    def acquire_capacity(self, messages: List[Dict[str, str]]) -> None:
+        """Block until the call fits in the global rate budget."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._estimate_tokens(messages))
+    
+    async def acquire_capacity_async(self, messages: List[Dict[str, str]]) -> None:
+        """Wait until the call fits in the global rate budget."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(self._estimate_tokens(messages))
+    
+    @asynccontextmanager
+    async def call_slot(self, messages: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[None]:
+        """
+        Take the call's rate budget, then hold a slot of the call scheduler, if one is configured.
+        
+        The call is queued under the current job (see scheduler.job_context) and
+        charged its estimated token cost against the job's fair share. The rate
+        budget is taken first, so a call waiting for it does not keep a slot
+        from other jobs' calls.
+        """
+        if messages is not None:
+            await self.acquire_capacity_async(messages)
+        if self.scheduler is None:
+            yield
+            return
+        cost = self._estimate_tokens(messages) if messages is not None else 1
+        async with self.scheduler.slot(cost):
+            yield
+    
+    async def with_hedging_async(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        if self.hedge_policy is None:
+            return await func(*args, **kwargs)
+        return await self.hedge_policy.run(lambda: func(*args, **kwargs))
+    
     def format_prompt(self, template: str, **kwargs) -> str:
         """
         Format a prompt template with variables.
@@ -112,6 +313,7 @@ class BaseModel(ABC):
     def get_model_info(self) -> Dict[str, Any]:
         return {
             "model_name": self.model_name,
+            "circuit_breaker": self.circuit_breaker.snapshot(),
             "provider": self.get_provider_name(),
             "parameters": {
                 "temperature": self.temperature,
@@ -1,24 +1,39 @@
-import openai
-from openai import AsyncOpenAI
-from typing import Dict, Any, List, Optional
+import contextlib
+from typing import Dict, Any, List, Optional, AsyncIterator
 from .base_model import BaseModel  
 from prompt_optimizer.helper.utils import run_async
-from prompt_optimizer.config import LLM_CONFIG
+from prompt_optimizer import config
 
 class GPTModel(BaseModel):
-    def __init__(self):
-        init_params = LLM_CONFIG.__dict__
-        LLM_CONFIG.__dict__.pop("provider")
+    def __init__(self, **overrides):
+        """
+        Initialize the model from the LLM config.
+        
+        Args:
+            **overrides: Settings that replace the config values, e.g. model_name or temperature
+        """
+        init_params = {**config.LLM_CONFIG.__dict__, **overrides}
+        init_params.pop("provider")
         super().__init__(
             **init_params
         )
         self._initialize_async_client()
     
     def _initialize_client(self):
-        self.client = openai.OpenAI(api_key=self.api_key)
+        # Imported here: the openai package is slow to import
+        import openai
+
+        # Retries are handled by our own retry policy, not the SDK's
+        self.client = openai.OpenAI(api_key=self.api_key, max_retries=0, **self._client_options())
     
     def _initialize_async_client(self):
-        self.async_client = AsyncOpenAI(api_key=self.api_key)
+        from openai import AsyncOpenAI
+
+        self.async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0, **self._client_options())
+
+    def _client_options(self) -> Dict[str, Any]:
+        # A request that times out raises APITimeoutError, which is retried
+        return {"timeout": self.request_timeout} if self.request_timeout is not None else {}
 
     def _process_messages(self, raw_messages) -> List[Dict[str, str]]:
         messages = []
@@ -48,6 +63,7 @@ class GPTModel(BaseModel):
             params["max_tokens"] = self.max_tokens
 
         def _generate():
+            self.acquire_capacity(messages)
             response = self.client.chat.completions.create(
                 messages=messages,
                 **params
@@ -68,13 +84,50 @@ class GPTModel(BaseModel):
             params["max_tokens"] = self.max_tokens
 
         async def _generate_async():
-            response = await self.async_client.chat.completions.create(
-                messages=messages,
-                **params
-            )   
-            return response.choices[0].message.content
+            async with self.call_slot(messages):
+                response = await self.async_client.chat.completions.create(
+                    messages=messages,
+                    **params
+                )   
+                return response.choices[0].message.content
+        
+        return await self.with_hedging_async(self.with_retries_async, _generate_async)
+
+    async def stream_async(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        messages = self._process_messages(messages)
+        params = {
+            "model": self.model_name,
+            "temperature": self.temperature,
+        }
         
-        return await self.with_retries_async(_generate_async)
+        if self.max_tokens is not None:
+            params["max_tokens"] = self.max_tokens
+        # A tighter per-call limit, e.g. the token budget of generate_streaming_async, takes precedence
+        params.update(kwargs)
+
+        async def _open_stream():
+            async with contextlib.AsyncExitStack() as stack:
+                await stack.enter_async_context(self.call_slot(messages))
+                stream = await self.async_client.chat.completions.create(
+                    messages=messages,
+                    stream=True,
+                    **params
+                )
+                # Keep the slot while the stream is read; a failed attempt releases it before the backoff
+                return stream, stack.pop_all()
+
+        # Only opening the stream is retried; a stream that fails midway is not replayed
+        stream, slot = await self.with_retries_async(_open_stream)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing the connection stops generation on the provider side
+            try:
+                await stream.close()
+            finally:
+                await slot.aclose()
     
 
 if __name__ == "__main__":
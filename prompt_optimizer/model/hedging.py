@@ -0,0 +1,111 @@
+"""Request hedging to cut the tail latency of LLM calls."""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from prompt_optimizer.helper.metrics import METRICS
+
+T = TypeVar('T')
+
+
+class HedgePolicy:
+    """
+    Sends a duplicate request when a call outlives a percentile of recent latencies.
+
+    The first response wins and the other request is cancelled. The share of
+    hedged calls over the recent window is capped by ``max_rate``.
+    """
+
+    def __init__(self,
+                 percentile: float = 0.95,
+                 max_rate: float = 0.1,
+                 min_samples: int = 20,
+                 window: int = 500):
+        """
+        Initialize the hedge policy.
+
+        Args:
+            percentile: Latency quantile after which a hedge is sent
+            max_rate: Maximum fraction of calls that may be hedged
+            min_samples: Number of latency samples required before hedging
+            window: Number of recent calls used for latencies and the rate cap
+        """
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._hedged = deque(maxlen=window)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if there are too few samples."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+
+    def _allow_hedge(self) -> bool:
+        return sum(self._hedged) + 1 <= self.max_rate * len(self._hedged)
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a call with hedging.
+
+        Args:
+            func: Factory returning a fresh awaitable for each attempt
+
+        Returns:
+            Result of whichever attempt finishes successfully first
+        """
+        METRICS.increment("llm.hedgeable_calls")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        primary = asyncio.ensure_future(func())
+        pending = {primary}
+        hedged = False
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self._allow_hedge():
+                    hedged = True
+                    METRICS.increment("llm.hedges")
+                    pending.add(asyncio.ensure_future(func()))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            METRICS.increment("llm.hedge_wins")
+                        self._latencies.append(loop.time() - start)
+                        return task.result()
+                    error = error or task.exception()
+                if pending:
+                    logging.warning(f"Hedged attempt failed, waiting for the other one: {error}")
+            raise error
+        finally:
+            self._hedged.append(hedged)
+            for task in pending:
+                task.cancel()
+
+
+_POLICIES: Dict[str, HedgePolicy] = {}
+
+
+def get_hedge_policy(endpoint: str, **kwargs) -> HedgePolicy:
+    """
+    Get the shared hedge policy of an endpoint, so latency history survives across model instances.
+
+    Args:
+        endpoint: Endpoint identifier (e.g. the model name)
+        **kwargs: HedgePolicy arguments used when the policy is first created
+
+    Returns:
+        The hedge policy for the endpoint
+    """
+    if endpoint not in _POLICIES:
+        _POLICIES[endpoint] = HedgePolicy(**kwargs)
+    return _POLICIES[endpoint]
@@ -0,0 +1,240 @@
+"""Retry policy with error classification, Retry-After support and circuit breaking."""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from prompt_optimizer.helper.deadline import DeadlineExceededError
+from prompt_optimizer.helper.metrics import METRICS
+
+# Status codes worth retrying; every other 4xx will fail the same way again
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "InternalServerError", "RateLimitError"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the endpoint's circuit breaker is open."""
+
+
+def _get_status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Classify an error as retryable (transient) or fatal.
+
+    Args:
+        error: Exception raised by a provider call
+
+    Returns:
+        True if retrying the call may succeed
+    """
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = _get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Read the delay requested by the provider from the error's response headers.
+
+    Args:
+        error: Exception raised by a provider call
+
+    Returns:
+        Delay in seconds, or None if the provider did not ask for one
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(float(retry_after_ms) / 1000.0, 0.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether and when to retry a failed call.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0):
+        """
+        Initialize the retry policy.
+
+        Args:
+            max_attempts: Total number of attempts, including the first one
+            base_delay: Backoff base in seconds
+            max_delay: Upper bound of a single backoff in seconds
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, attempt: int, error: BaseException) -> bool:
+        """
+        Whether the failed attempt (0-based) should be retried.
+
+        A Retry-After longer than ``max_delay`` fails fast instead of
+        parking the caller until then.
+        """
+        if attempt >= self.max_attempts - 1 or not is_retryable(error):
+            return False
+        retry_after = get_retry_after(error)
+        return retry_after is None or retry_after <= self.max_delay
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Delay before the next attempt.
+
+        Honors Retry-After (capped at ``max_delay``) when present, otherwise
+        uses exponential backoff with full jitter so concurrent callers do
+        not retry in lockstep.
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            # Small jitter on top so callers told the same deadline spread out
+            return min(retry_after, self.max_delay) + random.uniform(0, min(1.0, self.base_delay))
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and calls fail fast with CircuitOpenError. Once ``reset_timeout``
+    has passed, a single probe call is let through (half-open) while the
+    others keep failing fast; its success closes the circuit and its failure
+    opens it again. A probe that never reports back (e.g. it was cancelled)
+    is replaced by a new one after another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._rejections = 0
+        # Start time of the call probing a half-open circuit, None while no probe runs
+        self._probe_started: Optional[float] = None
+
+    def _current_state(self) -> str:
+        """State of the circuit; the caller holds the lock."""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if calls to the endpoint are currently rejected."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if state == self.HALF_OPEN and (self._probe_started is None
+                                            or now - self._probe_started >= self.reset_timeout):
+                # This call probes whether the endpoint recovered
+                self._probe_started = now
+                return
+            self._rejections += 1
+        METRICS.increment("llm.circuit_rejections")
+        raise CircuitOpenError(f"Circuit breaker for '{self.name}' is {state}")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_started = None
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    METRICS.increment("llm.circuit_opened")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the breaker state for monitoring."""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "rejections": self._rejections,
+                "retry_in": max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+                if state == self.OPEN else 0.0,
+            }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(endpoint: str, **kwargs) -> CircuitBreaker:
+    """
+    Get the shared circuit breaker of an endpoint.
+
+    Args:
+        endpoint: Endpoint identifier (e.g. the model name)
+        **kwargs: CircuitBreaker arguments used when the breaker is first created
+
+    Returns:
+        The circuit breaker for the endpoint
+    """
+    if endpoint not in _BREAKERS:
+        _BREAKERS[endpoint] = CircuitBreaker(endpoint, **kwargs)
+    return _BREAKERS[endpoint]
+
+
+def circuit_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Return the state of every circuit breaker, keyed by endpoint."""
+    return {name: breaker.snapshot() for name, breaker in list(_BREAKERS.items())}
@@ -0,0 +1,240 @@
+"""Process-wide, fair and priority-aware scheduling of LLM calls."""
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional, Union
+
+from prompt_optimizer.helper.metrics import METRICS
+
+# Lower values are served first; calls of a lower class only run when no call of a higher class waits
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+@dataclass(frozen=True)
+class JobContext:
+    """The job an LLM call is made for."""
+    job_id: str
+    priority: int = PRIORITIES["interactive"]
+    weight: float = 1.0
+
+
+_current_job: ContextVar[JobContext] = ContextVar("current_job", default=JobContext("default"))
+
+
+def resolve_priority(priority: Union[int, str]) -> int:
+    """Convert a priority name ("interactive", "bulk") to its level."""
+    if isinstance(priority, str):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Expected one of {list(PRIORITIES)}")
+        return PRIORITIES[priority]
+    return priority
+
+
+@contextmanager
+def job_context(job_id: str,
+                priority: Union[int, str] = "interactive",
+                weight: float = 1.0) -> Iterator[JobContext]:
+    """
+    Attribute the LLM calls made inside the block (and tasks it starts) to a job.
+
+    Args:
+        job_id: Identifier of the job, calls of the same job share one queue
+        priority: Priority name or level of the job's calls
+        weight: Share of capacity relative to other jobs of the same priority
+    """
+    if weight <= 0:
+        raise ValueError("Job weight must be positive")
+    context = JobContext(job_id, resolve_priority(priority), weight)
+    token = _current_job.set(context)
+    try:
+        yield context
+    finally:
+        _current_job.reset(token)
+
+
+def current_job() -> JobContext:
+    """The job of the running task."""
+    return _current_job.get()
+
+
+class _JobQueue:
+    """Waiting calls of one job and its deficit-round-robin credit."""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.deficit = 0.0
+        self.in_turn = False
+        self.waiters: Deque = deque()
+
+    def drop_cancelled(self) -> None:
+        while self.waiters and self.waiters[0][0].done():
+            self.waiters.popleft()
+
+
+class CallScheduler:
+    """
+    Bounds the number of in-flight LLM calls shared by every job in the process.
+
+    Waiting calls are queued per job. Free slots go to the highest priority
+    class with waiting calls; within a class, jobs share slots by deficit
+    round-robin weighted by their ``weight`` and the estimated token cost of
+    each call, so a job with a large fan-out cannot starve the others.
+    ``reserved_slots`` are only used by the top priority class, which keeps
+    headroom for interactive calls while bulk jobs saturate the rest.
+    """
+
+    def __init__(self,
+                 max_concurrency: int,
+                 reserved_slots: int = 0,
+                 quantum: float = 1000.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency: Maximum number of calls in flight at once
+            reserved_slots: Slots that calls below the top priority may not take
+            quantum: Cost credited to a job per round-robin turn, per unit of weight
+        """
+        self.max_concurrency = max_concurrency
+        self.reserved_slots = min(reserved_slots, max_concurrency - 1)
+        self.quantum = quantum
+        self._in_flight = 0
+        # Priority level -> job id -> queue, in round-robin order
+        self._classes: Dict[int, "OrderedDict[str, _JobQueue]"] = {}
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 1.0) -> AsyncIterator[None]:
+        """
+        Hold one call slot for the duration of the block.
+
+        Args:
+            cost: Estimated cost of the call (e.g. tokens), charged to the job's fair share
+        """
+        job = current_job()
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        if self._in_flight < self._capacity(job.priority) and not self._has_waiters(job.priority):
+            self._in_flight += 1
+        else:
+            future = loop.create_future()
+            entry = (future, cost)
+            self._enqueue(job, entry)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was granted just before the cancellation
+                    self._release()
+                else:
+                    self._discard(job, entry)
+                raise
+        wait = loop.time() - queued_at
+        METRICS.observe("scheduler.queue_wait", wait)
+        METRICS.observe(f"scheduler.queue_wait.p{job.priority}", wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _capacity(self, priority: int) -> int:
+        if priority <= PRIORITIES["interactive"]:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_slots
+
+    def _has_waiters(self, priority: int) -> bool:
+        """Whether calls of the same or a higher priority are already waiting."""
+        return any(level <= priority for level in self._classes)
+
+    def _enqueue(self, job: JobContext, entry: tuple) -> None:
+        queues = self._classes.setdefault(job.priority, OrderedDict())
+        if job.job_id not in queues:
+            queues[job.job_id] = _JobQueue(job.weight)
+        queues[job.job_id].waiters.append(entry)
+        self._dispatch()
+
+    def _discard(self, job: JobContext, entry: tuple) -> None:
+        """Remove a cancelled call from its queue, so it does not hold up the job's other calls."""
+        queues = self._classes.get(job.priority, {})
+        queue = queues.get(job.job_id)
+        if queue is None:
+            return
+        try:
+            queue.waiters.remove(entry)
+        except ValueError:
+            return
+        if not queue.waiters:
+            del queues[job.job_id]
+            if not queues:
+                del self._classes[job.priority]
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting calls."""
+        while self._classes:
+            level = min(self._classes)
+            if self._in_flight >= self._capacity(level):
+                return
+            future = self._next_waiter(level)
+            if future is None:
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _next_waiter(self, level: int) -> Optional[asyncio.Future]:
+        """Pick the next call of a priority class by deficit round-robin."""
+        queues = self._classes[level]
+        while queues:
+            job_id, queue = next(iter(queues.items()))
+            queue.drop_cancelled()
+            if not queue.waiters:
+                # Idle jobs do not bank credit
+                del queues[job_id]
+                continue
+            if not queue.in_turn:
+                # A job's turn starts with one quantum of credit
+                queue.deficit += self.quantum * queue.weight
+                queue.in_turn = True
+            future, cost = queue.waiters[0]
+            if queue.deficit >= cost:
+                queue.deficit -= cost
+                queue.waiters.popleft()
+                return future
+            # Credit used up: the turn passes to the next job
+            queue.in_turn = False
+            queues.move_to_end(job_id)
+        del self._classes[level]
+        return None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue.waiters) for queues in self._classes.values() for queue in queues.values())
+
+
+_SCHEDULERS: Dict[str, CallScheduler] = {}
+
+
+def get_call_scheduler(endpoint: str, max_concurrency: int, reserved_slots: int = 0) -> CallScheduler:
+    """
+    Get the shared scheduler of an endpoint, so every model instance of a process draws from one pool.
+
+    Args:
+        endpoint: Endpoint identifier (e.g. the model name)
+        max_concurrency: Maximum number of calls in flight, used when the scheduler is first created
+        reserved_slots: Slots kept for interactive calls, used when the scheduler is first created
+
+    Returns:
+        The call scheduler for the endpoint
+    """
+    if endpoint not in _SCHEDULERS:
+        _SCHEDULERS[endpoint] = CallScheduler(max_concurrency, reserved_slots=reserved_slots)
+    return _SCHEDULERS[endpoint]
@@ -1,60 +1,293 @@
-from typing import List, Tuple, Union
-from pandas import DataFrame
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from prompt_optimizer.model import BaseModel, GPTModel
+from prompt_optimizer.model import BaseModel, GPTModel, job_context
 from prompt_optimizer.rewriter import Rewriter
 from prompt_optimizer.valuator import Valuator, Summarizer
+from prompt_optimizer.valuator.valuator import get_precomputed_outputs
 from prompt_optimizer.helper.dataloader import DataLoader
+from prompt_optimizer.helper.deadline import DeadlineExceededError, deadline_scope, no_deadline, time_remaining, with_deadline
+from prompt_optimizer.helper.fingerprint import JOB_ROW_FIELDS, fingerprint_config, fingerprint_prompt, fingerprint_rows
+from prompt_optimizer.helper.metrics import METRICS
+from prompt_optimizer.helper.result_store import get_result_store
 from prompt_optimizer.helper.utils import run_async
-from prompt_optimizer.config import OPTIMIZER_CONFIG
+from prompt_optimizer import config, prompt_template
+from prompt_optimizer.coordination import ShardedExecutor, get_broker
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+JOBS_NAMESPACE = "jobs"
+# Prompt templates whose wording changes the result of a run
+OPTIMIZER_TEMPLATES = ("VALUATOR_PROMPT", "SUMMARIZE_SUGGESTIONS_PROMPT", "REWRITER_PROMPT")
+
+@dataclass
+class _RunningJob:
+    """A run in progress and the number of callers waiting for its result."""
+    task: Optional["asyncio.Task"] = None
+    waiters: int = 0
+    # Result of the last finished iteration, returned to callers whose deadline passes first
+    progress: Optional[Dict[str, Any]] = None
+
+# Job fingerprint -> run currently producing its result in this process
+_RUNNING_JOBS: Dict[str, _RunningJob] = {}
 
 class PromptOptimizer:
     def __init__(self, 
                  llm_client: BaseModel,
                  config_dict: dict = {}):
         self.llm_client = llm_client
-        self.valuator = Valuator(self.llm_client)
+        self._load_config(config_dict)
+        self.result_store = None
+        if self.incremental or self.reuse_outputs or self.memoize:
+            self.result_store = get_result_store(self.store_path, self.store_max_entries)
+            self.result_store.configure_namespace(JOBS_NAMESPACE,
+                                                  max_entries=self.memo_max_entries,
+                                                  ttl_seconds=self.memo_ttl_seconds)
+        self.valuator = Valuator(self.llm_client,
+                                 output_char_budget=self.output_char_budget,
+                                 output_token_budget=self.output_token_budget,
+                                 result_store=self.result_store if self.incremental else None,
+                                 output_store=self.result_store if self.reuse_outputs else None)
         self.rewriter = Rewriter(self.llm_client)
         self.summarizer = Summarizer(self.llm_client)
-        self._load_config(config_dict)
+        self.sharded_executor = None
+        broker = get_broker()
+        coordination_config = config.COORDINATION_CONFIG
+        if coordination_config.shard_chunks and broker is not None:
+            self.sharded_executor = ShardedExecutor(broker,
+                                                    lease_seconds=coordination_config.lease_seconds,
+                                                    poll_interval=coordination_config.poll_interval)
 
     def _load_config(self, config_dict: dict) -> None:
-        self.max_iterations = config_dict.get("max_iterations", OPTIMIZER_CONFIG.max_iterations)
-        self.chunk_size = config_dict.get("chunk_size", OPTIMIZER_CONFIG.chunk_size)
+        optimizer_config = config.OPTIMIZER_CONFIG
+        self.max_iterations = config_dict.get("max_iterations", optimizer_config.max_iterations)
+        self.chunk_size = config_dict.get("chunk_size", optimizer_config.chunk_size)
+        self.chunk_token_budget = config_dict.get("chunk_token_budget", optimizer_config.chunk_token_budget)
+        self.coreset_size = config_dict.get("coreset_size", optimizer_config.coreset_size)
+        self.coreset_method = config_dict.get("coreset_method", optimizer_config.coreset_method)
+        self.output_char_budget = config_dict.get("output_char_budget", optimizer_config.output_char_budget)
+        self.output_token_budget = config_dict.get("output_token_budget", optimizer_config.output_token_budget)
+        self.incremental = config_dict.get("incremental", optimizer_config.incremental)
+        self.reuse_outputs = config_dict.get("reuse_outputs", optimizer_config.reuse_outputs)
+        # LLM calls of this run are scheduled as one job, fairly against other concurrent runs
+        self.job_id = config_dict.get("job_id") or uuid.uuid4().hex
+        self.priority = config_dict.get("priority", optimizer_config.priority)
+        self.job_weight = config_dict.get("job_weight", optimizer_config.job_weight)
+        self.store_path = config_dict.get("store_path", optimizer_config.store_path)
+        self.store_max_entries = config_dict.get("store_max_entries", optimizer_config.store_max_entries)
+        self.memoize = config_dict.get("memoize", optimizer_config.memoize)
+        self.memo_max_entries = config_dict.get("memo_max_entries", optimizer_config.memo_max_entries)
+        self.memo_ttl_seconds = config_dict.get("memo_ttl_seconds", optimizer_config.memo_ttl_seconds)
+        self.deadline_seconds = config_dict.get("deadline_seconds", optimizer_config.deadline_seconds)
+        # Set by run(); lower than max_iterations when the deadline cut the run short
+        self.iterations_completed = 0
+
+    def _load_data(self, input_ground_truth_csv: Union[str, "DataFrame", Iterable["DataFrame"], DataLoader]) -> DataLoader:
+        """
+        Build the DataLoader once so the coreset is selected a single time per run.
+        
+        With a chunk token budget, the token count of every row is computed here
+        too: tokenizing is CPU-bound (and may download the encoding), so it must
+        not run on the event loop when the chunks are built. Runs in a worker thread.
+        """
+        if isinstance(input_ground_truth_csv, DataLoader):
+            data_loader = input_ground_truth_csv
+        else:
+            data_loader = DataLoader(input_ground_truth_csv,
+                                     coreset_size=self.coreset_size,
+                                     coreset_method=self.coreset_method)
+        if self.chunk_token_budget is not None:
+            # Cached by the loader, so later iterations and jobs sharing it do not count again
+            data_loader.row_tokens(getattr(self.llm_client, "model_name", None))
+        return data_loader
 
     async def optimize(self, 
-                 input_ground_truth_csv: Union[str, DataFrame], 
-                 initial_system_prompt: str) -> str:
+                 input_ground_truth_csv: Union[str, "DataFrame", DataLoader], 
+                 initial_system_prompt: str,
+                 use_precomputed_outputs: bool = False) -> str:
+        """
+        Run one valuate-summarize-rewrite iteration.
         
+        Args:
+            input_ground_truth_csv: Data to valuate the prompt on
+            initial_system_prompt: Prompt to improve
+            use_precomputed_outputs: Valuate the rows' ``llm_output`` column instead of
+                generating outputs; only valid when it was produced by this prompt
+        """
         # Load the data
-        data_loader = DataLoader(input_ground_truth_csv)
-        suggestions = []
-        for chunk in data_loader.get_chunks(self.chunk_size):
-            # Rewrite the prompt
-            suggestion = await self.valuator.valuates(chunk, initial_system_prompt)
-            suggestions.append(suggestion)
+        data_loader = await asyncio.to_thread(self._load_data, input_ground_truth_csv)
+        chunks = data_loader.get_chunks(self.chunk_size,
+                                        token_budget=self.chunk_token_budget,
+                                        model_name=getattr(self.llm_client, "model_name", None))
+        if self.sharded_executor is not None:
+            # Spread the chunks over every worker connected to the broker
+            suggestions = await self.sharded_executor.valuate_chunks(
+                self.valuator,
+                list(chunks),
+                initial_system_prompt,
+                use_precomputed_outputs=use_precomputed_outputs
+            )
+        else:
+            suggestions = []
+            for chunk in chunks:
+                llm_outputs = get_precomputed_outputs(chunk) if use_precomputed_outputs else None
+                suggestion = await self.valuator.valuates(chunk, initial_system_prompt, llm_outputs)
+                suggestions.append(suggestion)
         
         # Summarize the suggestions
-        final_suggestion = self.summarizer.summarize(suggestions)
-        prompt_rewrite = self.rewriter.rewrite(initial_system_prompt, final_suggestion)
+        final_suggestion = await self.summarizer.summarize_async(suggestions)
+        prompt_rewrite = await self.rewriter.rewrite_async(initial_system_prompt, final_suggestion)
         return prompt_rewrite
         
+    def job_fingerprint(self, data_loader: DataLoader, initial_system_prompt: str) -> str:
+        """
+        Fingerprint of everything that determines the result of a run.
+        
+        Covers the prompt, the loaded rows (after shuffling and coreset
+        selection), the settings that change the result, the model and the
+        prompt templates. Settings that only affect speed or caching are left
+        out, so they do not prevent reuse.
+        """
+        return fingerprint_config({
+            "prompt": fingerprint_prompt(initial_system_prompt),
+            "dataset": fingerprint_rows(data_loader.data, JOB_ROW_FIELDS),
+            "max_iterations": self.max_iterations,
+            "chunk_size": None if self.chunk_token_budget is not None else self.chunk_size,
+            "chunk_token_budget": self.chunk_token_budget,
+            "coreset_size": self.coreset_size,
+            "coreset_method": self.coreset_method,
+            "output_char_budget": self.output_char_budget,
+            "output_token_budget": self.output_token_budget,
+            "model": getattr(self.llm_client, "model_name", type(self.llm_client).__name__),
+            "temperature": getattr(self.llm_client, "temperature", None),
+            "max_tokens": getattr(self.llm_client, "max_tokens", None),
+            "templates": fingerprint_config({name: getattr(prompt_template, name) for name in OPTIMIZER_TEMPLATES}),
+        })
+
     async def run(self, 
-            input_ground_truth_csv: str, 
+            input_ground_truth_csv: Union[str, "DataFrame", Iterable["DataFrame"]], 
             initial_system_prompt: str) -> str:
         """
         Run the prompt optimizer.
+        
+        With memoization, the stored result of an identical earlier run is
+        returned right away, and an identical run already in progress in this
+        process is joined instead of started again.
+        
+        With a deadline, every LLM call is cancelled once it passes. If at
+        least one iteration finished, its prompt is returned as a partial
+        result (see iterations_completed); otherwise DeadlineExceededError
+        is raised.
         """
+        with deadline_scope(self.deadline_seconds):
+            # Parsing, shuffling and coreset selection are CPU-bound; keep the event loop free
+            data_loader = await asyncio.to_thread(self._load_data, input_ground_truth_csv)
+            if self.memoize:
+                result = await self._run_memoized(data_loader, initial_system_prompt)
+            else:
+                result = await self._run(data_loader, initial_system_prompt)
+        self.iterations_completed = result["iterations"]
+        return result["optimized_prompt"]
+
+    async def _run_memoized(self, data_loader: DataLoader, initial_system_prompt: str) -> Dict[str, Any]:
+        fingerprint = await asyncio.to_thread(self.job_fingerprint, data_loader, initial_system_prompt)
+        stored = await asyncio.to_thread(self.result_store.get, JOBS_NAMESPACE, fingerprint)
+        if stored is not None:
+            METRICS.increment("optimizer.memo_hits")
+            logging.info(f"Reusing the stored result of job {fingerprint[:12]}")
+            return stored
+        
+        running = _RUNNING_JOBS.get(fingerprint)
+        if running is None:
+            running = _RunningJob()
+            # The shared run has no deadline of its own: each caller's deadline only bounds its own wait
+            with no_deadline():
+                running.task = asyncio.ensure_future(
+                    self._run_and_store(data_loader, initial_system_prompt, fingerprint, running)
+                )
+            _RUNNING_JOBS[fingerprint] = running
+            running.task.add_done_callback(lambda _: self._forget_running_job(fingerprint, running))
+        else:
+            METRICS.increment("optimizer.memo_joins")
+            logging.info(f"Joining the running job {fingerprint[:12]}")
+        
+        running.waiters += 1
+        try:
+            # Shielded: one caller going away must not cancel the run for the others
+            return await with_deadline(asyncio.shield(running.task))
+        except DeadlineExceededError:
+            if running.progress is None:
+                raise
+            METRICS.increment("optimizer.partial_results")
+            logging.warning(f"Deadline reached while waiting for job {fingerprint[:12]}; "
+                            f"returning the prompt of iteration {running.progress['iterations']}")
+            return dict(running.progress)
+        finally:
+            running.waiters -= 1
+            if running.waiters == 0 and not running.task.done():
+                # Every caller went away: stop spending quota on a result nobody waits for
+                self._forget_running_job(fingerprint, running)
+                running.task.cancel()
+
+    @staticmethod
+    def _forget_running_job(fingerprint: str, running: _RunningJob) -> None:
+        if _RUNNING_JOBS.get(fingerprint) is running:
+            del _RUNNING_JOBS[fingerprint]
+
+    async def _run_and_store(self,
+                             data_loader: DataLoader,
+                             initial_system_prompt: str,
+                             fingerprint: str,
+                             running: _RunningJob) -> Dict[str, Any]:
+        result = await self._run(data_loader, initial_system_prompt,
+                                 on_iteration=lambda progress: setattr(running, "progress", progress))
+        # Partial results of a run cut short by its deadline are not reused
+        if result["iterations"] == self.max_iterations:
+            await asyncio.to_thread(self.result_store.put, JOBS_NAMESPACE, fingerprint, result)
+        return result
+
+    async def _run(self,
+                   data_loader: DataLoader,
+                   initial_system_prompt: str,
+                   on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         optimized_prompt = initial_system_prompt
-        for iter in range(self.max_iterations):
-            optimized_prompt = await self.optimize(input_ground_truth_csv, optimized_prompt)
-            print(f"Iteration {iter+1}: {optimized_prompt}")
+        completed = 0
+        with job_context(self.job_id, self.priority, self.job_weight):
+            for iter in range(self.max_iterations):
+                started = time.monotonic()
+                try:
+                    # Precomputed outputs were produced by the initial prompt, so they only apply to the first iteration
+                    optimized_prompt = await self.optimize(data_loader, optimized_prompt, use_precomputed_outputs=iter == 0)
+                except DeadlineExceededError:
+                    if completed == 0:
+                        raise
+                    METRICS.increment("optimizer.partial_results")
+                    logging.warning(f"Deadline reached during iteration {iter+1}; "
+                                    f"returning the prompt of iteration {completed}")
+                    break
+                completed += 1
+                logging.info(f"Iteration {iter+1}: {optimized_prompt}")
+                if on_iteration is not None:
+                    on_iteration({"optimized_prompt": optimized_prompt, "iterations": completed})
+                
+                remaining = time_remaining()
+                if completed < self.max_iterations and remaining is not None and remaining < time.monotonic() - started:
+                    # Another iteration would not finish in time; stop before spending quota on it
+                    METRICS.increment("optimizer.partial_results")
+                    logging.warning(f"Stopping after {completed} of {self.max_iterations} iterations: "
+                                    f"{remaining:.1f}s left before the deadline")
+                    break
 
-        return optimized_prompt
+        return {"optimized_prompt": optimized_prompt, "iterations": completed}
 
 async def run_optimizer(llm_client: BaseModel,
                   initial_prompt: str, 
-                  input_ground_truth_csv: Union[str, DataFrame],
+                  input_ground_truth_csv: Union[str, "DataFrame", Iterable["DataFrame"]],
                   config_dict: dict = {}) -> str:
     optimizer = PromptOptimizer(llm_client, config_dict)
     optimized_prompt = await optimizer.run(
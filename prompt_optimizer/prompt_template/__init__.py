@@ -1,13 +1,23 @@
+from functools import lru_cache
 from pathlib import Path
 
-with (Path(__file__).parents[0] / Path('valuator_prompt.md')).open('r') as f:
-    VALUATOR_PROMPT = f.read()
+# Templates are read on first access, e.g. `prompt_template.VALUATOR_PROMPT`
+TEMPLATE_FILES = {
+    "VALUATOR_PROMPT": "valuator_prompt.md",
+    "REWRITER_PROMPT": "rewriter_prompt.md",
+    "SUMMARIZE_SUGGESTIONS_PROMPT": "summarize_suggestions.md",
+    "JUDGE_PROMPT": "judge_prompt.md",
+}
 
-with (Path(__file__).parents[0] / Path('rewriter_prompt.md')).open('r') as f:
-    REWRITER_PROMPT = f.read()
+@lru_cache(maxsize=None)
+def load_template(file_name: str) -> str:
+    """Read a prompt template file from this package."""
+    with (Path(__file__).parents[0] / Path(file_name)).open('r') as f:
+        return f.read()
 
-with (Path(__file__).parents[0] / Path('summarize_suggestions.md')).open('r') as f:
-    SUMMARIZE_SUGGESTIONS_PROMPT = f.read()
-
-__all__ = ["VALUATOR_PROMPT", "REWRITER_PROMPT", "SUMMARIZE_SUGGESTIONS_PROMPT"]
+def __getattr__(name: str) -> str:
+    if name in TEMPLATE_FILES:
+        return load_template(TEMPLATE_FILES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+__all__ = ["VALUATOR_PROMPT", "REWRITER_PROMPT", "SUMMARIZE_SUGGESTIONS_PROMPT", "JUDGE_PROMPT", "load_template"]
@@ -1,7 +1,7 @@
 import logging
 
 from prompt_optimizer.model import BaseModel
-from prompt_optimizer.prompt_template import REWRITER_PROMPT
+from prompt_optimizer import prompt_template
 
 class Rewriter:
     def __init__(self, 
@@ -11,7 +11,7 @@ class Rewriter:
     def prepare_rewriter_prompt(self, 
                                 original_system_prompt: str, 
                                 prompt_suggestion: str) -> str:
-        return REWRITER_PROMPT.format(
+        return prompt_template.REWRITER_PROMPT.format(
             original_system_prompt=original_system_prompt,
             prompt_suggestion=prompt_suggestion
         )
@@ -27,3 +27,15 @@ class Rewriter:
         except Exception as e:
             logging.error(f"Error during rewriting: {e}")
             raise
+
+    async def rewrite_async(self, 
+                            original_system_prompt: str, 
+                            prompt_suggestion: str) -> str:
+        prompt = self.prepare_rewriter_prompt(original_system_prompt, prompt_suggestion)
+
+        try:
+            response = await self.llm_client.generate_async(prompt)
+            return response
+        except Exception as e:
+            logging.error(f"Error during rewriting: {e}")
+            raise
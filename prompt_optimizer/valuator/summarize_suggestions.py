@@ -1,5 +1,5 @@
 from typing import List
-from prompt_optimizer.prompt_template import SUMMARIZE_SUGGESTIONS_PROMPT
+from prompt_optimizer import prompt_template
 from prompt_optimizer.model import BaseModel
 
 class Summarizer:
@@ -12,7 +12,7 @@ class Summarizer:
         """
         Prepare the summarize prompt.
         """
-        return SUMMARIZE_SUGGESTIONS_PROMPT.format(suggestions=valuate_results)
+        return prompt_template.SUMMARIZE_SUGGESTIONS_PROMPT.format(suggestions=valuate_results)
     
     def summarize(self, valuate_results: List[str]) -> str:
         """
@@ -21,5 +21,13 @@ class Summarizer:
         prompt = self._prepare_summarize_prompt(valuate_results)
         response = self.llm_client.generate(prompt)
         return response
+    
+    async def summarize_async(self, valuate_results: List[str]) -> str:
+        """
+        Summarize the valuate results without blocking the event loop.
+        """
+        prompt = self._prepare_summarize_prompt(valuate_results)
+        response = await self.llm_client.generate_async(prompt)
+        return response
         
         
\ No newline at end of file
@@ -1,25 +1,62 @@
 from typing import Dict, Any, List, Optional
 import logging
 import asyncio
-from prompt_optimizer.prompt_template import VALUATOR_PROMPT
+import json
+from prompt_optimizer import prompt_template
 from prompt_optimizer.model import BaseModel
+from prompt_optimizer.helper.fingerprint import fingerprint_prompt, fingerprint_row, fingerprint_text
+from prompt_optimizer.helper.metrics import METRICS
+from prompt_optimizer.helper.result_store import ResultStore
+from prompt_optimizer.helper.utils import gather_or_cancel
 from .summarize_suggestions import Summarizer
 
+VALUATIONS_NAMESPACE = "valuations"
+OUTPUTS_NAMESPACE = "outputs"
+SUMMARIES_NAMESPACE = "summaries"
+
+
+def get_precomputed_outputs(data_chunk: List[Dict[str, Any]]) -> Optional[List[Optional[str]]]:
+    """
+    Get the ``llm_output`` of each row, or None if no row of the chunk has one.
+    
+    Rows without a precomputed output get None, so only their output is generated.
+    """
+    outputs = [item.get("llm_output") for item in data_chunk]
+    if all(output is None for output in outputs):
+        return None
+    return outputs
+
+
 class Valuator:
     """
     A class that evaluates LLM outputs against ground truth using a structured analysis prompt.
     """
     
     def __init__(self, 
-                 llm_client: BaseModel):
+                 llm_client: BaseModel,
+                 output_char_budget: Optional[int] = None,
+                 output_token_budget: Optional[int] = None,
+                 result_store: Optional[ResultStore] = None,
+                 output_store: Optional[ResultStore] = None):
         """
         Initialize the Valuator with a prompt template.
         
         Args:
             prompt_template_path: Path to the valuation prompt template
             llm_client: LLM client for executing the valuation (if None, will only prepare prompts)
+            output_char_budget: Stop generating an output once it reaches this many characters
+            output_token_budget: Stop generating an output once it reaches this many tokens
+            result_store: If set, per-row valuations are stored and reused for unchanged
+                (prompt, row) pairs, so only new or changed rows are valuated, and the
+                summary of a chunk is reused when none of its suggestions changed
+            output_store: If set, generated outputs are stored per (prompt, input) and
+                reused instead of being generated again for the same prompt
         """
         self.llm_client = llm_client
+        self.output_char_budget = output_char_budget
+        self.output_token_budget = output_token_budget
+        self.result_store = result_store
+        self.output_store = output_store
         
     def prepare_valuation_prompt(self,
                                  system_prompt: str,
@@ -32,13 +69,34 @@ class Valuator:
         Returns:
             The complete valuation prompt with all input data
         """  
-        return VALUATOR_PROMPT.format(
+        return prompt_template.VALUATOR_PROMPT.format(
             system_prompt=system_prompt,
             input=input_data,
             llm_generated_output=llm_output,
             ground_truth_output=ground_truth
         )
     
+    async def generate_output(self, input_data: str, system_prompt: str) -> str:
+        """
+        Generate the LLM output to valuate, streaming it when an output budget is set.
+        
+        Returns:
+            The generated output, cut at the budget if it was exceeded
+        """
+        messages = [
+            ("system", system_prompt), 
+            ("user", input_data)
+        ]
+        if self.output_char_budget is None and self.output_token_budget is None:
+            return await self.llm_client.generate_async(messages)
+        
+        return await self.llm_client.generate_streaming_async(
+            messages,
+            max_chars=self.output_char_budget,
+            max_stream_tokens=self.output_token_budget,
+            truncation_marker="\n[... output truncated]"
+        )
+    
     async def valuate(self,
                 input_data: str,
                 system_prompt: str,
@@ -54,12 +112,7 @@ class Valuator:
             raise ValueError("No LLM client provided for valuation")
         
         if llm_output == None:
-            llm_output = await self.llm_client.generate_async(
-                [
-                    ("system", system_prompt), 
-                    ("user", input_data)
-                ]
-            )
+            llm_output = await self.generate_output(input_data, system_prompt)
 
         prompt = self.prepare_valuation_prompt(system_prompt=system_prompt, 
                                                input_data=input_data, 
@@ -73,12 +126,118 @@ class Valuator:
             logging.error(f"Error during valuation: {e}")
             raise
     
+    async def valuate_rows(self,
+                           data_chunk: List[Dict[str, Any]],
+                           system_prompt: str,
+                           llm_outputs: Optional[List[str]] = None) -> List[str]:
+        """
+        Valuate multiple input-output pairs concurrently, one suggestion per row.
+        
+        With a result store, rows already valuated against the same prompt are
+        read from the store and only the remaining rows are sent to the LLM.
+        
+        Args:
+            data_chunk: List of data items containing input and ground_truth
+            system_prompt: System prompt being valuated
+            llm_outputs: Optional list of model outputs corresponding to inputs
+            
+        Returns:
+            List of suggestions, in the order of the rows
+        """
+        if self.result_store is None:
+            return await self._valuate_rows(data_chunk, system_prompt, llm_outputs)
+        
+        # Suggestions also depend on the model, its settings and the valuation template
+        valuation_fingerprint = fingerprint_text(f"{self.generation_fingerprint()}:{prompt_template.VALUATOR_PROMPT}")
+        prompt_fingerprint = fingerprint_prompt(system_prompt)
+        keys = []
+        for i, item in enumerate(data_chunk):
+            key = f"{prompt_fingerprint}:{valuation_fingerprint}:{fingerprint_row(item)}"
+            if llm_outputs is not None and llm_outputs[i] is not None:
+                key += f":{fingerprint_text(llm_outputs[i])}"
+            keys.append(key)
+        
+        stored = await asyncio.to_thread(self.result_store.get_many, VALUATIONS_NAMESPACE, keys)
+        missing = [i for i, key in enumerate(keys) if key not in stored]
+        METRICS.increment("valuation.reused_rows", len(keys) - len(missing))
+        if missing:
+            new_suggestions = await self._valuate_rows(
+                [data_chunk[i] for i in missing],
+                system_prompt,
+                None if llm_outputs is None else [llm_outputs[i] for i in missing]
+            )
+            new_items = {keys[i]: suggestion for i, suggestion in zip(missing, new_suggestions)}
+            await asyncio.to_thread(self.result_store.put_many, VALUATIONS_NAMESPACE, new_items)
+            stored.update(new_items)
+        return [stored[key] for key in keys]
+    
+    def settings(self) -> Dict[str, Any]:
+        """Settings that determine how rows are valuated, so another process can build an equivalent Valuator."""
+        return {
+            "llm_client": type(self.llm_client).__name__,
+            "model_name": getattr(self.llm_client, "model_name", None),
+            "temperature": getattr(self.llm_client, "temperature", None),
+            "max_tokens": getattr(self.llm_client, "max_tokens", None),
+            "output_char_budget": self.output_char_budget,
+            "output_token_budget": self.output_token_budget,
+            "incremental": self.result_store is not None,
+            "reuse_outputs": self.output_store is not None,
+        }
+    
+    def generation_fingerprint(self) -> str:
+        """Hex digest identifying the model, its temperature and the output budgets."""
+        return fingerprint_text(f"{getattr(self.llm_client, 'model_name', '')}:{getattr(self.llm_client, 'temperature', '')}"
+                                f":{self.output_char_budget}:{self.output_token_budget}")
+    
+    def output_key(self, prompt_fingerprint: str, input_data: str) -> str:
+        """Result store key of the output generated for an input, which also depends on the model and budgets."""
+        return f"{prompt_fingerprint}:{self.generation_fingerprint()}:{fingerprint_text(str(input_data))}"
+    
+    async def _valuate_rows(self,
+                            data_chunk: List[Dict[str, Any]],
+                            system_prompt: str,
+                            llm_outputs: Optional[List[str]] = None) -> List[str]:
+        llm_outputs = list(llm_outputs) if llm_outputs is not None else [None] * len(data_chunk)
+        
+        output_keys = {}
+        generated = {}
+        if self.output_store is not None:
+            prompt_fingerprint = fingerprint_prompt(system_prompt)
+            output_keys = {
+                i: self.output_key(prompt_fingerprint, item["input"])
+                for i, item in enumerate(data_chunk) if llm_outputs[i] is None
+            }
+            stored = await asyncio.to_thread(self.output_store.get_many, OUTPUTS_NAMESPACE, list(output_keys.values()))
+            METRICS.increment("valuation.reused_outputs", len(stored))
+            for i, key in output_keys.items():
+                llm_outputs[i] = stored.get(key)
+        
+        async def _valuate_row(i: int, item: Dict[str, Any]) -> str:
+            llm_output = llm_outputs[i]
+            if llm_output is None and self.output_store is not None:
+                llm_output = await self.generate_output(item["input"], system_prompt)
+                generated[output_keys[i]] = llm_output
+            return await self.valuate(
+                input_data=item["input"],
+                system_prompt=system_prompt,
+                ground_truth=item["ground_truth"],
+                llm_output=llm_output
+            )
+        
+        # Execute all rows concurrently; one failure cancels the remaining calls
+        try:
+            return await gather_or_cancel(*(_valuate_row(i, item) for i, item in enumerate(data_chunk)))
+        finally:
+            # Keep the outputs generated so far even if a valuation failed
+            if generated:
+                await asyncio.to_thread(self.output_store.put_many, OUTPUTS_NAMESPACE, generated)
+    
     async def valuates(self, 
                        data_chunk: List[Dict[str, Any]],
                        system_prompt: str,
                        llm_outputs: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
-        Valuate multiple input-output pairs concurrently.
+        Valuate multiple input-output pairs concurrently and summarize their suggestions.
         
         Args:
             data_chunk: List of data items containing input, ground_truth, and system_prompt
@@ -90,27 +249,47 @@ class Valuator:
         if not data_chunk:
             return []
         
-        # Create tasks for concurrent evaluation
-        
-        tasks = []
-        for i, item in enumerate(data_chunk):
-            llm_output = None if llm_outputs is None else llm_outputs[i]
-            task = self.valuate(
-                input_data=item["input"],
-                system_prompt=system_prompt,
-                ground_truth=item["ground_truth"],
-                llm_output=llm_output
-            )
-            tasks.append(task)
-        
-        # Execute all tasks concurrently
         try:
-            suggestions = await asyncio.gather(*tasks)
-            final_suggestion = Summarizer(self.llm_client).summarize(suggestions)
+            suggestions = await self.valuate_rows(data_chunk, system_prompt, llm_outputs)
+            suggestions = self._annotate_weights(data_chunk, suggestions)
+            if self.result_store is not None:
+                return await self._summarize_stored(suggestions)
+            final_suggestion = await Summarizer(self.llm_client).summarize_async(suggestions)
             return final_suggestion
         except Exception as e:
             logging.error(f"Error during batch valuation: {e}")
             raise
 
+    async def _summarize_stored(self, suggestions: List[str]) -> str:
+        """
+        Summarize suggestions, reusing the stored summary of identical suggestions.
+        
+        A chunk whose rows were all reused has the same suggestions as before,
+        so it costs no LLM call at all.
+        """
+        key = fingerprint_text(f"{self.generation_fingerprint()}:{prompt_template.SUMMARIZE_SUGGESTIONS_PROMPT}:"
+                               f"{json.dumps(suggestions)}")
+        summary = await asyncio.to_thread(self.result_store.get, SUMMARIES_NAMESPACE, key)
+        if summary is not None:
+            METRICS.increment("valuation.reused_summaries")
+            return summary
+        summary = await Summarizer(self.llm_client).summarize_async(suggestions)
+        await asyncio.to_thread(self.result_store.put, SUMMARIES_NAMESPACE, key, summary)
+        return summary
+
+    def _annotate_weights(self,
+                          data_chunk: List[Dict[str, Any]],
+                          suggestions: List[str]) -> List[str]:
+        """
+        Prefix suggestions of coreset rows with the share of the dataset they represent.
+        """
+        annotated = []
+        for item, suggestion in zip(data_chunk, suggestions):
+            weight = item.get("coreset_weight")
+            if weight is not None:
+                suggestion = f"[Represents {weight:.1%} of the dataset]\n{suggestion}"
+            annotated.append(suggestion)
+        return annotated
+
     def _parse_valuation_response(self, response: Any) -> Dict[str, Any]:
         pass
\ No newline at end of file
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pytest
+
+from prompt_optimizer.model import BaseModel
+
+
+class FakeModel(BaseModel):
+    """
+    In-memory model answering every call with a numbered response.
+
+    With ``hold_after`` set, every call after that many calls waits for
+    ``gate`` to be set, so a test can stop a run at a known point.
+    """
+
+    def __init__(self, model_name: str = "fake-model", hold_after: Optional[int] = None, **kwargs):
+        self.calls = 0
+        self.hold_after = hold_after
+        self.gate = asyncio.Event()
+        super().__init__(model_name, "test-key", retry_delay=0.001, **kwargs)
+
+    def _initialize_client(self) -> None:
+        pass
+
+    async def _initialize_async_client(self) -> None:
+        pass
+
+    def get_provider_name(self) -> str:
+        return "fake"
+
+    def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self.calls += 1
+        return f"response {self.calls}"
+
+    async def generate_async(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self.calls += 1
+        n = self.calls
+        if self.hold_after is not None and n > self.hold_after:
+            await self.gate.wait()
+        await asyncio.sleep(0)
+        return f"response {n}"
+
+
+@pytest.fixture
+def dataset() -> pd.DataFrame:
+    return pd.DataFrame([{"input": f"question {i}", "ground_truth": f"answer {i}"} for i in range(12)])
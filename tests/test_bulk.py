@@ -0,0 +1,59 @@
+import asyncio
+import copy
+import json
+import sys
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer import cli, config
+from prompt_optimizer.bulk import parse_manifest, run_bulk
+
+JOB_CONFIG = {"incremental": False, "memoize": False, "reuse_outputs": False, "deadline_seconds": None}
+
+
+@pytest.fixture
+def records(dataset) -> list:
+    return dataset.to_dict(orient="records")
+
+
+def test_every_job_reports_its_result(records):
+    manifest = parse_manifest({
+        "datasets": {"shared": records},
+        "jobs": [{"id": "a", "prompt": "Be helpful.", "dataset": "shared", "iterations": 1, "config": JOB_CONFIG},
+                 {"id": "b", "prompt": "Be brief.", "dataset": "shared", "iterations": 2, "config": JOB_CONFIG},
+                 {"id": "c", "prompt": "Be kind.", "dataset": "missing", "config": JOB_CONFIG}],
+    })
+
+    async def _run():
+        return [result async for result in run_bulk(FakeModel(), manifest, max_parallel_jobs=2, allow_paths=False)]
+
+    results = {result["id"]: result for result in asyncio.run(_run())}
+    assert results["a"]["status"] == "ok" and results["a"]["iterations_completed"] == 1
+    assert results["b"]["status"] == "ok" and results["b"]["iterations_completed"] == 2
+    assert results["c"]["status"] == "error" and "missing" in results["c"]["error"]
+
+
+def test_manifest_without_prompt_is_rejected():
+    with pytest.raises(ValueError):
+        parse_manifest({"jobs": [{"dataset": "data.csv"}]})
+
+
+def test_bulk_cli_writes_only_json_lines_to_stdout(tmp_path, monkeypatch, capsys, dataset):
+    dataset.to_csv(tmp_path / "data.csv", index=False)
+    manifest = {"datasets": {"data": "data.csv"},
+                "jobs": [{"id": str(i), "prompt": f"Prompt {i}", "dataset": "data", "iterations": 2} for i in range(3)]}
+    (tmp_path / "jobs.json").write_text(json.dumps(manifest))
+
+    # The CLI writes its settings into the shared config objects; keep them for the other tests
+    monkeypatch.setitem(config._configs, "optimizer", copy.copy(config.OPTIMIZER_CONFIG))
+    monkeypatch.setitem(config._configs, "llm", copy.copy(config.LLM_CONFIG))
+    monkeypatch.setattr(cli, "GPTModel", FakeModel)
+    monkeypatch.setattr(sys, "argv", ["prompt_optimizer.cli", "--manifest", str(tmp_path / "jobs.json"),
+                                      "--no-memoize", "--no-incremental", "--no-reuse-outputs", "--verbose"])
+    asyncio.run(cli.main())
+
+    lines = capsys.readouterr().out.splitlines()
+    results = [json.loads(line) for line in lines]
+    assert sorted(result["id"] for result in results) == ["0", "1", "2"]
+    assert all(result["status"] == "ok" for result in results)
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pandas as pd
+
+from conftest import FakeModel
+from prompt_optimizer.helper import dataloader
+from prompt_optimizer.helper.dataloader import DataLoader
+from prompt_optimizer.prompt_optimizer import PromptOptimizer
+
+
+def _loader(lengths) -> DataLoader:
+    frame = pd.DataFrame([{"input": "word " * n, "ground_truth": "a"} for n in lengths])
+    return DataLoader(frame, shuffle=False)
+
+
+def test_fixed_size_chunks():
+    loader = _loader([1] * 7)
+    assert [len(chunk) for chunk in loader.get_chunks(3)] == [3, 3, 1]
+
+
+def test_rows_are_packed_up_to_the_token_budget():
+    loader = _loader([10, 30, 5, 80, 20, 20, 20])
+    tokens = loader.row_tokens()
+    chunks = list(loader.get_chunks(100, token_budget=60))
+
+    assert [item for chunk in chunks for item in chunk] == loader.data
+    position = 0
+    for chunk in chunks:
+        chunk_tokens = tokens[position:position + len(chunk)]
+        position += len(chunk)
+        # A chunk stays within the budget unless it is a single oversized row
+        assert sum(chunk_tokens) <= 60 or len(chunk) == 1
+    # The oversized row forms its own chunk
+    assert [loader.data[3]] in chunks
+
+
+def test_row_tokens_are_counted_off_the_event_loop(monkeypatch, dataset):
+    threads = set()
+    count_tokens = dataloader.count_tokens
+
+    def _count_tokens(text, model_name=None):
+        threads.add(threading.current_thread() is threading.main_thread())
+        return count_tokens(text, model_name)
+
+    monkeypatch.setattr(dataloader, "count_tokens", _count_tokens)
+    optimizer = PromptOptimizer(FakeModel(), {"max_iterations": 2, "chunk_token_budget": 50, "incremental": False,
+                                              "memoize": False, "reuse_outputs": False, "deadline_seconds": None})
+    asyncio.run(optimizer.run(dataset, "Be helpful."))
+    assert threads == {False}
@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer.coordination import GlobalRateLimiter, ShardedExecutor, SQLiteBroker
+from prompt_optimizer.coordination.sharding import VALUATE_CHUNK, run_claimed_task
+from prompt_optimizer.helper.deadline import DeadlineExceededError, deadline_scope
+from prompt_optimizer.model.scheduler import CallScheduler
+from prompt_optimizer.prompt_optimizer import PromptOptimizer
+
+
+class FakeValuator:
+    """Valuates a chunk into the inputs of its rows, after an optional delay."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.chunks = 0
+
+    def settings(self) -> dict:
+        return {}
+
+    async def valuates(self, data_chunk, system_prompt, llm_outputs=None):
+        self.chunks += 1
+        await asyncio.sleep(self.delay)
+        return [f"{system_prompt}: {item['input']}" for item in data_chunk]
+
+
+@pytest.fixture
+def broker(tmp_path) -> SQLiteBroker:
+    return SQLiteBroker(str(tmp_path / "broker.sqlite"))
+
+
+def _submit(broker: SQLiteBroker, n: int = 1) -> str:
+    payloads = [{"type": VALUATE_CHUNK, "system_prompt": "P", "chunk": [{"input": f"q{i}"}]} for i in range(n)]
+    broker.submit_tasks("job", payloads)
+    return "job"
+
+
+def test_rate_budget_is_shared_and_zero_limit_is_rejected(broker):
+    assert broker.acquire_capacity("model", 1, 10, rpm_limit=2, tpm_limit=None) == 0
+    assert broker.acquire_capacity("model", 1, 10, rpm_limit=2, tpm_limit=None) == 0
+    assert 0 < broker.acquire_capacity("model", 1, 10, rpm_limit=2, tpm_limit=None) <= 60
+    with pytest.raises(ValueError):
+        broker.acquire_capacity("other", 1, 10, rpm_limit=0, tpm_limit=None)
+    with pytest.raises(ValueError):
+        GlobalRateLimiter(broker, "model", rpm_limit=0)
+
+
+def test_only_the_lease_holder_reports_the_outcome(broker):
+    _submit(broker)
+    stale = broker.claim_task("stale", lease_seconds=0)
+    time.sleep(0.01)
+    current = broker.claim_task("current", lease_seconds=60)
+    assert current.task_id == stale.task_id and current.attempts == 2
+
+    assert not broker.renew_lease(stale.task_id, "stale", 60)
+    assert not broker.complete_task(stale.task_id, "stale", "stale result")
+    assert not broker.fail_task(stale.task_id, "stale", "stale error")
+    assert broker.complete_task(current.task_id, "current", "result")
+    assert broker.get_job_results("job")[0]["result"] == "result"
+
+
+def test_lease_is_renewed_while_a_task_runs(broker):
+    async def _run():
+        _submit(broker)
+        task = broker.claim_task("worker", lease_seconds=0.1)
+        running = asyncio.ensure_future(run_claimed_task(broker, task, FakeValuator(delay=0.4), lease_seconds=0.1))
+        await asyncio.sleep(0.25)
+        # Past the original lease, the task is still reserved for its worker
+        assert broker.claim_task("thief", lease_seconds=60) is None
+        await running
+        assert broker.get_job_results("job")[0]["status"] == "done"
+
+    asyncio.run(_run())
+
+
+def test_sharded_chunks_keep_their_order(broker):
+    async def _run():
+        valuator = FakeValuator()
+        chunks = [[{"input": f"q{i}"}, {"input": f"r{i}"}] for i in range(5)]
+        results = await ShardedExecutor(broker, poll_interval=0.01).valuate_chunks(valuator, chunks, "P")
+        assert results == [[f"P: q{i}", f"P: r{i}"] for i in range(5)]
+        assert valuator.chunks == 5
+        assert broker.get_job_results("job") == []
+
+    asyncio.run(_run())
+
+
+def test_deadline_does_not_wait_for_the_lease_of_a_dead_worker(tmp_path):
+    class _DeadWorkerBroker(SQLiteBroker):
+        """Broker whose tasks were all claimed by a worker that never reports back."""
+
+        def claim_task(self, worker_id, lease_seconds, job_id=None):
+            return None
+
+    async def _run():
+        executor = ShardedExecutor(_DeadWorkerBroker(str(tmp_path / "broker.sqlite")), poll_interval=60)
+        with deadline_scope(0.1):
+            with pytest.raises(DeadlineExceededError):
+                await executor.valuate_chunks(FakeValuator(), [[{"input": "q"}]], "P")
+
+    start = time.monotonic()
+    asyncio.run(_run())
+    assert time.monotonic() - start < 5
+
+
+class _DeadlineBoundModel(FakeModel):
+    """FakeModel whose calls, like those of the real clients, go through the deadline-bound retry wrapper."""
+
+    async def generate_async(self, messages, **kwargs):
+        return await self.with_retries_async(lambda: FakeModel.generate_async(self, messages, **kwargs))
+
+
+def test_sharded_and_local_runs_return_the_same_partial_result(broker, dataset):
+    config_dict = {"max_iterations": 3, "chunk_size": 4, "incremental": False,
+                   "memoize": False, "reuse_outputs": False, "deadline_seconds": None}
+    model = FakeModel()
+    asyncio.run(PromptOptimizer(model, config_dict).run(dataset, "Be helpful."))
+    per_iteration = model.calls // 3
+
+    def _partial_run(sharded: bool):
+        # Calls of the second iteration never return, so the deadline stops the run there
+        optimizer = PromptOptimizer(_DeadlineBoundModel(hold_after=per_iteration), {**config_dict, "deadline_seconds": 0.3})
+        if sharded:
+            optimizer.sharded_executor = ShardedExecutor(broker, poll_interval=0.01)
+        result = asyncio.run(optimizer.run(dataset, "Be helpful."))
+        return result, optimizer.iterations_completed
+
+    local = _partial_run(sharded=False)
+    assert local[1] == 1
+    assert _partial_run(sharded=True) == local
+
+
+def test_waiting_for_rate_budget_does_not_hold_a_call_slot():
+    class _BlockedLimiter:
+        def __init__(self):
+            self.release = asyncio.Event()
+
+        async def acquire_async(self, tokens):
+            await self.release.wait()
+
+    async def _run():
+        model = FakeModel("slot-model")
+        model.scheduler = CallScheduler(1)
+        model.rate_limiter = _BlockedLimiter()
+        entered = asyncio.Event()
+
+        async def _call():
+            async with model.call_slot([{"role": "user", "content": "hi"}]):
+                entered.set()
+
+        call = asyncio.ensure_future(_call())
+        await asyncio.sleep(0.01)
+        assert model.scheduler.in_flight == 0
+        model.rate_limiter.release.set()
+        await call
+        assert entered.is_set()
+
+    asyncio.run(_run())
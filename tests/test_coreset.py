@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from prompt_optimizer.helper.coreset import select_coreset
+from prompt_optimizer.helper.dataloader import DataLoader
+
+TOPICS = ["roman empire legion senate caesar", "photosynthesis chlorophyll leaf sunlight", "python function loop variable"]
+
+
+def _clustered_texts(per_topic: int = 10) -> list:
+    return [f"{topic} example {i}" for topic in TOPICS for i in range(per_topic)]
+
+
+@pytest.mark.parametrize("method", ["kmeans", "fps"])
+def test_coreset_covers_every_cluster(method):
+    texts = _clustered_texts()
+    indices, weights = select_coreset(texts, 3, method=method)
+    assert len(indices) == 3
+    assert indices == sorted(indices)
+    # One representative per topic, each standing in for a third of the rows
+    assert {index // 10 for index in indices} == {0, 1, 2}
+    assert weights == pytest.approx([1 / 3] * 3)
+
+
+def test_small_dataset_is_kept_whole():
+    indices, weights = select_coreset(["a", "b"], 5)
+    assert indices == [0, 1]
+    assert weights == [0.5, 0.5]
+
+
+def test_selection_is_deterministic():
+    texts = _clustered_texts()
+    assert select_coreset(texts, 4, seed=7) == select_coreset(texts, 4, seed=7)
+
+
+def test_invalid_arguments_are_rejected():
+    with pytest.raises(ValueError):
+        select_coreset(["a", "b"], 1, method="random")
+    with pytest.raises(ValueError):
+        select_coreset(["a", "b"], 0)
+
+
+def test_data_loader_keeps_weighted_coreset_rows():
+    frame = pd.DataFrame([{"input": text, "ground_truth": "answer"} for text in _clustered_texts()])
+    loader = DataLoader(frame, coreset_size=3)
+    assert len(loader) == 3
+    assert sum(item["coreset_weight"] for item in loader.data) == pytest.approx(1.0)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer.evaluator import EvaluationStats, EvaluationWriter, Evaluator, ResumeMismatchError, iter_rows
+from prompt_optimizer.evaluator.evaluator import parse_judgement
+
+
+class Judge(FakeModel):
+    """FakeModel that judges every output with score 8, failing the rows whose judge prompt contains ``fail``."""
+
+    def __init__(self, fail: str = None):
+        self.fail = fail
+        super().__init__()
+
+    async def generate_async(self, messages, **kwargs):
+        response = await super().generate_async(messages, **kwargs)
+        if not isinstance(messages, str):
+            return response
+        if self.fail is not None and self.fail in messages:
+            raise ValueError("judge failed")
+        return 'Verdict: {"score": 8, "reason": "close"}'
+
+
+def _evaluate(path: str, dataset, model: FakeModel, resume: bool = False, prompt: str = "Be helpful."):
+    async def _run():
+        evaluator = Evaluator(model, concurrency=4)
+        writer = EvaluationWriter(path, resume=resume, settings=evaluator.run_settings(prompt))
+        stats = EvaluationStats()
+        kept = writer.open()
+        for result in kept:
+            stats.add(result, resumed=True)
+        async for result in evaluator.evaluate(iter_rows([dataset]), prompt,
+                                               skip_ids={result["row_id"] for result in kept}):
+            stats.add(result)
+            writer.write(result)
+        summary = stats.summary()
+        writer.finish(summary)
+        return summary
+
+    return asyncio.run(_run())
+
+
+def _rows(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        # The first line holds the settings of the run
+        return [json.loads(line) for line in f][1:]
+
+
+@pytest.mark.parametrize("response, judgement", [
+    ('{"score": 8, "reason": "close"}', (8, "close")),
+    ('Sure: {"score": 11, "reason": "perfect"}', (10, "perfect")),
+    ("Score: 0, way off", (1, "Score: 0, way off")),
+    ("no verdict", (None, "no verdict")),
+])
+def test_judgements_are_parsed_and_clamped(response, judgement):
+    assert parse_judgement(response) == judgement
+
+
+def test_resumed_run_only_evaluates_the_missing_and_failed_rows(tmp_path, dataset):
+    path = str(tmp_path / "evaluation.jsonl")
+    summary = _evaluate(path, dataset, Judge(fail="question 3"))
+    assert (summary["rows"], summary["errors"]) == (12, 1)
+
+    judge = Judge()
+    summary = _evaluate(path, dataset, judge, resume=True)
+    # Generating and judging the failed row
+    assert judge.calls == 2
+    assert (summary["rows"], summary["resumed"], summary["errors"]) == (12, 11, 0)
+    assert summary["mean_score"] == 8 and summary["pass_rate"] == 1
+    rows = _rows(path)
+    assert len({row["row_id"] for row in rows}) == len(rows) == 12
+    assert all(row["error"] is None for row in rows)
+
+
+def test_resuming_with_other_settings_is_refused(tmp_path, dataset):
+    path = str(tmp_path / "evaluation.jsonl")
+    _evaluate(path, dataset, Judge())
+    with pytest.raises(ResumeMismatchError, match="prompt"):
+        _evaluate(path, dataset, Judge(), resume=True, prompt="Be brief.")
+    # The earlier results are left untouched
+    assert len(_rows(path)) == 12
+
+
+def test_precomputed_outputs_are_judged_without_generating(tmp_path, dataset):
+    dataset = dataset.assign(llm_output=[f"output {i}" for i in range(len(dataset))])
+    judge = Judge()
+    _evaluate(str(tmp_path / "evaluation.jsonl"), dataset, judge)
+    assert judge.calls == len(dataset)
+    assert {row["output"] for row in _rows(str(tmp_path / "evaluation.jsonl"))} == set(dataset["llm_output"])
+
+
+def test_stats_exclude_errors_and_resumed_rows_from_rates():
+    stats = EvaluationStats()
+    stats.add({"score": 9, "passed": True, "latency": 0.1, "error": None}, resumed=True)
+    stats.add({"score": 5, "passed": False, "latency": 0.3, "error": None})
+    stats.add({"error": "boom"})
+    summary = stats.summary()
+    assert (summary["rows"], summary["resumed"], summary["evaluated"], summary["errors"]) == (3, 1, 2, 1)
+    assert summary["mean_score"] == 7 and summary["pass_rate"] == 0.5
+    assert summary["latency_p50"] == 0.3
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from prompt_optimizer.model.hedging import HedgePolicy
+
+
+async def _warm_up(policy: HedgePolicy, calls: int = 10) -> None:
+    async def _fast() -> str:
+        return "fast"
+
+    for _ in range(calls):
+        await policy.run(_fast)
+
+
+def _attempts(*behaviours):
+    """Factory of attempts: each call starts the next behaviour, a (delay, result or exception) pair."""
+    started = []
+
+    async def _attempt(delay, outcome):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            _attempt.cancelled += 1
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _factory():
+        delay, outcome = behaviours[len(started)]
+        started.append(delay)
+        return _attempt(delay, outcome)
+
+    _attempt.cancelled = 0
+    _factory.started = started
+    _factory.attempt = _attempt
+    return _factory
+
+
+def test_no_hedge_without_enough_latency_samples():
+    async def _run():
+        policy = HedgePolicy(min_samples=5, max_rate=1.0)
+        factory = _attempts((0.05, "primary"), (0, "hedge"))
+        assert await policy.run(factory) == "primary"
+        assert len(factory.started) == 1
+
+    asyncio.run(_run())
+
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    async def _run():
+        policy = HedgePolicy(min_samples=5, max_rate=0.5)
+        await _warm_up(policy)
+        factory = _attempts((10, "primary"), (0, "hedge"))
+        assert await policy.run(factory) == "hedge"
+        assert len(factory.started) == 2
+        await asyncio.sleep(0)
+        assert factory.attempt.cancelled == 1
+
+    asyncio.run(_run())
+
+
+def test_hedge_rate_is_capped():
+    async def _run():
+        policy = HedgePolicy(min_samples=5, max_rate=0.1)
+        await _warm_up(policy, calls=10)
+        # One hedge fits in the 10% budget of the window, a second one does not
+        first = _attempts((0.05, "primary"), (0, "hedge"))
+        second = _attempts((0.05, "primary"), (0, "hedge"))
+        assert await policy.run(first) == "hedge"
+        assert await policy.run(second) == "primary"
+        assert len(second.started) == 1
+
+    asyncio.run(_run())
+
+
+def test_failed_attempt_falls_back_to_the_other():
+    async def _run():
+        policy = HedgePolicy(min_samples=5, max_rate=0.5)
+        await _warm_up(policy)
+        factory = _attempts((0.02, "primary"), (0, RuntimeError("hedge failed")))
+        assert await policy.run(factory) == "primary"
+
+        both_fail = _attempts((0.02, RuntimeError("primary failed")), (0, RuntimeError("hedge failed")))
+        with pytest.raises(RuntimeError):
+            await policy.run(both_fail)
+
+    asyncio.run(_run())
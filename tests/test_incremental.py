@@ -0,0 +1,65 @@
+import asyncio
+
+from conftest import FakeModel
+from prompt_optimizer.helper.result_store import ResultStore
+from prompt_optimizer.prompt_optimizer import PromptOptimizer
+from prompt_optimizer.valuator.valuator import Valuator
+
+
+def _rows(n: int) -> list:
+    return [{"input": f"question {i}", "ground_truth": f"answer {i}"} for i in range(n)]
+
+
+def test_unchanged_chunk_is_not_valuated_or_summarized_again(tmp_path):
+    async def _run():
+        model = FakeModel()
+        valuator = Valuator(model, result_store=ResultStore(str(tmp_path / "store.sqlite")))
+        first = await valuator.valuates(_rows(4), "Be helpful.")
+        # Generation and valuation of each row, then the summary
+        assert model.calls == 4 * 2 + 1
+
+        calls = model.calls
+        assert await valuator.valuates(_rows(4), "Be helpful.") == first
+        assert model.calls == calls
+
+        # Only the new row is valuated; the changed suggestions are summarized again
+        await valuator.valuates(_rows(5), "Be helpful.")
+        assert model.calls == calls + 2 + 1
+
+    asyncio.run(_run())
+
+
+def test_stored_valuations_depend_on_the_prompt_and_model(tmp_path):
+    async def _run():
+        store = ResultStore(str(tmp_path / "store.sqlite"))
+        model = FakeModel()
+        await Valuator(model, result_store=store).valuates(_rows(2), "Be helpful.")
+
+        calls = model.calls
+        await Valuator(model, result_store=store).valuates(_rows(2), "Be brief.")
+        assert model.calls == calls + 2 * 2 + 1
+
+        other_model = FakeModel("other-model")
+        await Valuator(other_model, result_store=store).valuates(_rows(2), "Be helpful.")
+        assert other_model.calls == 2 * 2 + 1
+
+    asyncio.run(_run())
+
+
+def test_rerun_on_a_grown_dataset_only_valuates_the_new_rows(tmp_path, dataset):
+    import pandas as pd
+
+    def _optimizer(model):
+        return PromptOptimizer(model, {"max_iterations": 1, "chunk_size": 100, "incremental": True,
+                                       "memoize": False, "reuse_outputs": False, "deadline_seconds": None,
+                                       "store_path": str(tmp_path / "store.sqlite")})
+
+    first = FakeModel()
+    asyncio.run(_optimizer(first).run(dataset, "Be helpful."))
+
+    grown = pd.concat([dataset, pd.DataFrame([{"input": "question new", "ground_truth": "answer new"}])])
+    second = FakeModel()
+    asyncio.run(_optimizer(second).run(grown, "Be helpful."))
+    # The new row's generation and valuation, the chunk summary, the final summary and the rewrite
+    assert second.calls == 2 + 3
+    assert first.calls == len(dataset) * 2 + 3
@@ -0,0 +1,73 @@
+import gzip
+import io
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer import config
+from prompt_optimizer.helper.ingest import UnsupportedFormatError, UploadTooLargeError, detect_format, iter_dataset
+
+CSV = b"input,ground_truth\n" + b"".join(f"question {i},answer {i}\n".encode() for i in range(25))
+
+
+@pytest.mark.parametrize("filename, content_type, expected", [
+    ("data.csv", None, ("csv", False)),
+    ("data.jsonl.gz", None, ("jsonl", True)),
+    ("data.ndjson", None, ("jsonl", False)),
+    ("upload", "text/csv", ("csv", False)),
+    ("data.parquet", None, ("parquet", False)),
+])
+def test_format_is_detected(filename, content_type, expected):
+    assert detect_format(filename, content_type) == expected
+
+
+@pytest.mark.parametrize("filename", ["data.txt", "data.parquet.gz"])
+def test_unsupported_formats_are_rejected(filename):
+    with pytest.raises(UnsupportedFormatError):
+        detect_format(filename)
+
+
+def test_gzipped_csv_is_parsed_in_blocks():
+    blocks = list(iter_dataset(io.BytesIO(gzip.compress(CSV)), "csv", compressed=True, rows_per_block=10))
+    assert [len(block) for block in blocks] == [10, 10, 5]
+    assert blocks[2].iloc[-1]["input"] == "question 24"
+
+
+def test_jsonl_is_parsed():
+    data = b'{"input": "q", "ground_truth": "a"}\n{"input": "r", "ground_truth": "b"}\n'
+    blocks = list(iter_dataset(io.BytesIO(data), "jsonl"))
+    assert blocks[0]["input"].tolist() == ["q", "r"]
+
+
+def test_stored_size_is_limited():
+    with pytest.raises(UploadTooLargeError):
+        list(iter_dataset(io.BytesIO(CSV), "csv", max_bytes=100))
+
+
+def test_decompressed_size_is_limited():
+    bomb = gzip.compress(b"input,ground_truth\n" + b"q,a\n" * 100000)
+    assert len(bomb) < 10000
+    with pytest.raises(UploadTooLargeError):
+        list(iter_dataset(io.BytesIO(bomb), "csv", compressed=True, max_bytes=10000, max_decompressed_bytes=100000))
+
+
+def test_row_count_is_limited():
+    blocks = iter_dataset(io.BytesIO(CSV), "csv", rows_per_block=10, max_rows=20)
+    assert len(next(blocks)) == 10
+    assert len(next(blocks)) == 10
+    with pytest.raises(UploadTooLargeError):
+        next(blocks)
+
+
+def test_optimize_upload_rejects_too_many_rows(monkeypatch):
+    from fastapi.testclient import TestClient
+    from prompt_optimizer import entrypoint
+
+    monkeypatch.setitem(entrypoint._llm_clients, "gpt", FakeModel())
+    monkeypatch.setattr(config.SERVER_CONFIG, "max_upload_rows", 20)
+    client = TestClient(entrypoint.app)
+    response = client.post("/optimize/upload",
+                           data={"system_prompt": "Be helpful.", "llm_client": "gpt", "memoize": "false", "incremental": "false"},
+                           files={"file": ("data.csv", CSV, "text/csv")})
+    assert response.status_code == 413
+    assert "20 rows" in response.json()["detail"]
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer.helper.deadline import DeadlineExceededError
+from prompt_optimizer.helper.metrics import METRICS
+from prompt_optimizer.prompt_optimizer import _RUNNING_JOBS, PromptOptimizer
+
+
+def _config(tmp_path, **overrides) -> dict:
+    config_dict = {
+        "max_iterations": 2,
+        "chunk_size": 4,
+        "memoize": True,
+        "incremental": False,
+        "reuse_outputs": False,
+        "deadline_seconds": None,
+        "store_path": str(tmp_path / "store.sqlite"),
+    }
+    config_dict.update(overrides)
+    return config_dict
+
+
+def _calls_per_iteration(tmp_path, dataset) -> int:
+    model = FakeModel()
+    asyncio.run(PromptOptimizer(model, _config(tmp_path, max_iterations=1, memoize=False)).run(dataset, "Be helpful."))
+    return model.calls
+
+
+async def _wait_for_calls(model: FakeModel, calls: int) -> None:
+    while model.calls < calls:
+        await asyncio.sleep(0.001)
+
+
+def _counter(name: str) -> float:
+    return METRICS.snapshot()["counters"].get(name, 0)
+
+
+def test_identical_runs_join_and_reuse_one_run(tmp_path, dataset):
+    async def _run():
+        model = FakeModel()
+        first = PromptOptimizer(model, _config(tmp_path))
+        second = PromptOptimizer(model, _config(tmp_path))
+        results = await asyncio.gather(first.run(dataset, "Be helpful."), second.run(dataset, "Be helpful."))
+        calls = model.calls
+        # A later identical run is served from the store without any call
+        third = PromptOptimizer(model, _config(tmp_path))
+        results.append(await third.run(dataset, "Be helpful."))
+        assert model.calls == calls
+        assert third.iterations_completed == 2
+        return results, calls
+
+    joins = _counter("optimizer.memo_joins")
+    results, calls = asyncio.run(_run())
+    assert results[0] == results[1] == results[2]
+    assert calls == 2 * _calls_per_iteration(tmp_path / "single", dataset)
+    assert _counter("optimizer.memo_joins") == joins + 1
+    assert not _RUNNING_JOBS
+
+
+def test_deadline_of_a_joining_caller_returns_the_shared_progress(tmp_path, dataset):
+    per_iteration = _calls_per_iteration(tmp_path / "single", dataset)
+
+    async def _run():
+        # The second iteration is held until the impatient caller gave up
+        model = FakeModel(hold_after=per_iteration)
+        patient = PromptOptimizer(model, _config(tmp_path))
+        impatient = PromptOptimizer(model, _config(tmp_path, deadline_seconds=0.2))
+        patient_run = asyncio.ensure_future(patient.run(dataset, "Be helpful."))
+        await _wait_for_calls(model, per_iteration + 1)
+
+        partial = await impatient.run(dataset, "Be helpful.")
+        assert impatient.iterations_completed == 1
+        assert not patient_run.done()
+
+        model.gate.set()
+        result = await patient_run
+        assert patient.iterations_completed == 2
+        return partial, result
+
+    partial, result = asyncio.run(_run())
+    assert partial != result
+    assert not _RUNNING_JOBS
+
+
+def test_deadline_before_any_progress_does_not_cancel_the_shared_run(tmp_path, dataset):
+    async def _run():
+        model = FakeModel(hold_after=0)
+        patient = PromptOptimizer(model, _config(tmp_path))
+        impatient = PromptOptimizer(model, _config(tmp_path, deadline_seconds=0.1))
+        patient_run = asyncio.ensure_future(patient.run(dataset, "Be helpful."))
+        await _wait_for_calls(model, 1)
+
+        with pytest.raises(DeadlineExceededError):
+            await impatient.run(dataset, "Be helpful.")
+
+        model.gate.set()
+        await patient_run
+        assert patient.iterations_completed == 2
+
+    asyncio.run(_run())
+    assert not _RUNNING_JOBS
+
+
+def test_run_is_cancelled_once_every_caller_left(tmp_path, dataset):
+    async def _run():
+        model = FakeModel(hold_after=0)
+        optimizer = PromptOptimizer(model, _config(tmp_path, deadline_seconds=0.1))
+        with pytest.raises(DeadlineExceededError):
+            await optimizer.run(dataset, "Be helpful.")
+        await asyncio.sleep(0)
+        assert not _RUNNING_JOBS
+        return model.calls
+
+    calls = asyncio.run(_run())
+    # Only the calls started before the deadline were made
+    assert calls <= _calls_per_iteration(tmp_path / "single", dataset)
@@ -0,0 +1,37 @@
+import asyncio
+
+from conftest import FakeModel
+from prompt_optimizer.helper.result_store import ResultStore
+from prompt_optimizer.valuator.valuator import Valuator, get_precomputed_outputs
+
+
+def test_precomputed_outputs_are_picked_per_row():
+    assert get_precomputed_outputs([{"input": "q"}, {"input": "r"}]) is None
+    assert get_precomputed_outputs([{"input": "q", "llm_output": "a"}, {"input": "r"}]) == ["a", None]
+
+
+def test_precomputed_outputs_skip_generation():
+    model = FakeModel()
+    chunk = [{"input": "q", "ground_truth": "a", "llm_output": "a"}, {"input": "r", "ground_truth": "b"}]
+    asyncio.run(Valuator(model).valuates(chunk, "Be helpful.", get_precomputed_outputs(chunk)))
+    # Two valuations, one generation for the row without an output, and the summary
+    assert model.calls == 2 + 1 + 1
+
+
+def test_generated_outputs_are_reused_for_the_same_prompt(tmp_path):
+    async def _run():
+        model = FakeModel()
+        valuator = Valuator(model, output_store=ResultStore(str(tmp_path / "store.sqlite")))
+        chunk = [{"input": "q", "ground_truth": "a"}, {"input": "r", "ground_truth": "b"}]
+        await valuator.valuates(chunk, "Be helpful.")
+        assert model.calls == 2 * 2 + 1
+
+        calls = model.calls
+        await valuator.valuates(chunk, "Be helpful.")
+        assert model.calls == calls + 2 + 1
+
+        calls = model.calls
+        await valuator.valuates(chunk, "Be brief.")
+        assert model.calls == calls + 2 * 2 + 1
+
+    asyncio.run(_run())
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from prompt_optimizer.helper import result_store
+from prompt_optimizer.helper.result_store import EVICT_TO, ResultStore
+
+
+class _Clock:
+    """Stand-in for the time module whose clock advances one second per call, so access times never tie."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(result_store, "time", clock)
+    return clock
+
+
+def _count(store: ResultStore, namespace: str) -> int:
+    with sqlite3.connect(store.path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM results WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+
+def test_least_recently_used_values_are_evicted(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "store.sqlite"), max_entries=10)
+    for i in range(10):
+        store.put("ns", f"key{i}", i)
+    # Reading a value makes it recently used
+    assert store.get("ns", "key0") == 0
+
+    store.put("ns", "key10", 10)
+    assert _count(store, "ns") == int(10 * EVICT_TO)
+    kept = store.get_many("ns", [f"key{i}" for i in range(11)])
+    assert set(kept) == {"key0"} | {f"key{i}" for i in range(3, 11)}
+
+
+def test_bulk_put_is_trimmed_to_the_low_water_mark(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "store.sqlite"), max_entries=10)
+    store.put_many("ns", {f"key{i}": i for i in range(25)})
+    assert _count(store, "ns") == int(10 * EVICT_TO)
+    for i in range(10):
+        store.put("ns", f"more{i}", i)
+        assert _count(store, "ns") <= 10
+
+
+def test_namespace_limits_are_independent(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "store.sqlite"))
+    store.configure_namespace("small", max_entries=2, ttl_seconds=5)
+    for i in range(5):
+        store.put("small", f"key{i}", i)
+        store.put("unbounded", f"key{i}", i)
+    assert _count(store, "small") <= 2
+    assert _count(store, "unbounded") == 5
+
+    clock.now += 10
+    assert store.get("small", "key4") is None
+    assert store.get("unbounded", "key0") == 0
+
+
+def test_eviction_counts_values_written_by_another_store(tmp_path, clock):
+    path = str(tmp_path / "store.sqlite")
+    store = ResultStore(path, max_entries=10)
+    other = ResultStore(path, max_entries=10)
+    store.put("ns", "first", 0)
+    other.put_many("ns", {f"key{i}": i for i in range(9)})
+    store.put_many("ns", {f"new{i}": i for i in range(9)})
+    # Once this store's own estimate passes the limit, the table is counted, including the other store's values
+    store.put("ns", "last", 0)
+    assert _count(store, "ns") == int(10 * EVICT_TO)
+    assert store.get("ns", "last") == 0
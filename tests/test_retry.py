@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer.helper.deadline import DeadlineExceededError
+from prompt_optimizer.model.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, get_retry_after, is_retryable
+
+
+class _Response:
+    def __init__(self, status_code: int, headers: dict):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _Response(status_code, headers or {})
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (ProviderError(429), True),
+    (ProviderError(503), True),
+    (ProviderError(400), False),
+    (ProviderError(401), False),
+    (ConnectionError(), True),
+    (asyncio.TimeoutError(), True),
+    (CircuitOpenError(), False),
+    (DeadlineExceededError(), False),
+    (ValueError(), False),
+])
+def test_errors_are_classified(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_retry_after_is_read_and_capped():
+    assert get_retry_after(ProviderError(429, {"retry-after": "2"})) == 2.0
+    assert get_retry_after(ProviderError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert get_retry_after(ProviderError(429)) is None
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=5)
+    assert 2.0 <= policy.backoff(0, ProviderError(429, {"retry-after": "2"})) <= 2.1
+    assert policy.should_retry(0, ProviderError(429, {"retry-after": "2"}))
+    # Waiting longer than max_delay would park the caller; fail fast instead
+    assert not policy.should_retry(0, ProviderError(429, {"retry-after": "600"}))
+    assert not policy.should_retry(2, ProviderError(503))
+
+
+def test_backoff_is_bounded_by_max_delay():
+    policy = RetryPolicy(max_attempts=10, base_delay=1, max_delay=3)
+    assert all(0 <= policy.backoff(attempt, ProviderError(503)) <= 3 for attempt in range(10))
+
+
+def test_only_transient_errors_are_retried():
+    async def _run():
+        model = FakeModel("retry-model")
+        attempts = []
+
+        async def _flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ProviderError(503)
+            return "ok"
+
+        assert await model.with_retries_async(_flaky) == "ok"
+        assert len(attempts) == 3
+
+        async def _fatal():
+            attempts.append(1)
+            raise ProviderError(400)
+
+        attempts.clear()
+        with pytest.raises(ProviderError):
+            await model.with_retries_async(_fatal)
+        assert len(attempts) == 1
+        # Fatal errors do not count towards the circuit breaker
+        assert model.circuit_breaker.snapshot()["consecutive_failures"] == 0
+
+    asyncio.run(_run())
+
+
+def _open_breaker(reset_timeout: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.snapshot()["rejections"] == 1
+
+
+def test_half_open_circuit_admits_a_single_probe():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.before_call()
+    for _ in range(3):
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_lost_probe_is_replaced_after_the_reset_timeout():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    # The probe never reports back, e.g. it was cancelled
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
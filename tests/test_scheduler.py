@@ -0,0 +1,108 @@
+import asyncio
+
+from prompt_optimizer.model.scheduler import CallScheduler, job_context
+
+
+async def _call(scheduler: CallScheduler, order: list, name: str, job_id: str,
+                priority: str = "interactive", weight: float = 1.0, cost: float = 1.0) -> None:
+    with job_context(job_id, priority, weight):
+        async with scheduler.slot(cost):
+            order.append(name)
+            await asyncio.sleep(0)
+
+
+async def _schedule(scheduler: CallScheduler, calls: list) -> list:
+    """Queue the calls in order behind a call holding every slot, then release it and return the order they ran in."""
+    order = []
+    release = asyncio.Event()
+
+    async def _blocker() -> None:
+        async with scheduler.slot():
+            await release.wait()
+
+    blockers = [asyncio.ensure_future(_blocker()) for _ in range(scheduler.max_concurrency)]
+    await asyncio.sleep(0)
+    tasks = []
+    for call in calls:
+        tasks.append(asyncio.ensure_future(_call(scheduler, order, *call)))
+        # Let the call reach its queue, so calls are queued in list order
+        await asyncio.sleep(0)
+    assert scheduler.waiting == len(calls)
+    release.set()
+    await asyncio.gather(*blockers, *tasks)
+    assert scheduler.in_flight == 0
+    return order
+
+
+def test_interactive_calls_run_before_queued_bulk_calls():
+    scheduler = CallScheduler(1, quantum=1)
+    calls = [("bulk1", "bulk", "bulk"), ("bulk2", "bulk", "bulk"), ("interactive", "ui", "interactive")]
+    order = asyncio.run(_schedule(scheduler, calls))
+    assert order == ["interactive", "bulk1", "bulk2"]
+
+
+def test_jobs_of_one_priority_take_turns():
+    scheduler = CallScheduler(1, quantum=1)
+    calls = [(f"a{i}", "a") for i in range(4)] + [(f"b{i}", "b") for i in range(2)]
+    order = asyncio.run(_schedule(scheduler, calls))
+    assert order == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_job_weight_and_call_cost_set_the_share():
+    scheduler = CallScheduler(1, quantum=1)
+    calls = ([(f"heavy{i}", "heavy", "interactive", 2.0) for i in range(4)]
+             + [(f"costly{i}", "costly", "interactive", 1.0, 2.0) for i in range(2)])
+    order = asyncio.run(_schedule(scheduler, calls))
+    # Two calls of the weight-2 job per turn; the cost-2 job needs two turns of credit per call
+    assert order == ["heavy0", "heavy1", "heavy2", "heavy3", "costly0", "costly1"]
+
+
+def test_reserved_slots_are_kept_for_interactive_calls():
+    async def _run() -> None:
+        scheduler = CallScheduler(2, reserved_slots=1)
+        release = asyncio.Event()
+        started = []
+
+        async def _hold(name: str, priority: str) -> None:
+            with job_context(name, priority):
+                async with scheduler.slot():
+                    started.append(name)
+                    await release.wait()
+
+        bulk = [asyncio.ensure_future(_hold(f"bulk{i}", "bulk")) for i in range(2)]
+        await asyncio.sleep(0)
+        assert started == ["bulk0"]
+        interactive = asyncio.ensure_future(_hold("interactive", "interactive"))
+        await asyncio.sleep(0)
+        assert started == ["bulk0", "interactive"]
+        release.set()
+        await asyncio.gather(*bulk, interactive)
+        assert started[-1] == "bulk1"
+
+    asyncio.run(_run())
+
+
+def test_cancelled_waiter_does_not_hold_up_its_job():
+    async def _run() -> None:
+        scheduler = CallScheduler(1, quantum=1)
+        release = asyncio.Event()
+        order = []
+
+        async def _blocker() -> None:
+            async with scheduler.slot():
+                await release.wait()
+
+        blocker = asyncio.ensure_future(_blocker())
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(_call(scheduler, order, "cancelled", "a"))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(_call(scheduler, order, "waiting", "a"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, waiting)
+        assert order == ["waiting"]
+        assert scheduler.in_flight == 0 and scheduler.waiting == 0
+
+    asyncio.run(_run())
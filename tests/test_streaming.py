@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from conftest import FakeModel
+from prompt_optimizer.helper.deadline import DeadlineExceededError, deadline_scope
+from prompt_optimizer.helper.tokens import count_tokens
+
+
+class StreamingModel(FakeModel):
+    """Streams a long completion piece by piece and records how the stream was requested and closed."""
+
+    def __init__(self, delay: float = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.request = None
+        self.received = 0
+        self.closed = False
+
+    async def stream_async(self, messages, **kwargs):
+        self.request = kwargs
+        try:
+            for _ in range(1000):
+                await asyncio.sleep(self.delay)
+                self.received += 1
+                yield "some words "
+        finally:
+            self.closed = True
+
+
+def test_token_budget_stops_the_stream_and_is_sent_as_max_tokens():
+    model = StreamingModel()
+    text = asyncio.run(model.generate_streaming_async("hi", max_stream_tokens=20, truncation_marker="[cut]"))
+    assert model.request == {"max_tokens": 20}
+    assert text.endswith("[cut]")
+    assert count_tokens(text[:-len("[cut]")], model.model_name) >= 20
+    assert model.received < 20
+    assert model.closed
+
+
+def test_budget_never_raises_the_client_limit():
+    model = StreamingModel(max_tokens=10)
+    asyncio.run(model.generate_streaming_async("hi", max_stream_tokens=20))
+    assert model.request == {"max_tokens": 10}
+
+
+def test_char_budget_truncates_the_completion():
+    model = StreamingModel()
+    text = asyncio.run(model.generate_streaming_async("hi", max_chars=25, truncation_marker="..."))
+    assert text == ("some words " * 3)[:25] + "..."
+    assert model.request == {}
+    assert model.closed
+
+
+def test_stream_is_cancelled_at_the_deadline():
+    async def _run():
+        model = StreamingModel(delay=0.01)
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceededError):
+                await model.generate_streaming_async("hi")
+        assert model.closed
+        assert model.received < 100
+
+    asyncio.run(_run())